@@ -0,0 +1,135 @@
+"""
+Índice de adyacencia usuario-vecino en formato CSR.
+
+Para cada agente con celda (usuarios, BOTs y NewsReels) guarda los índices de los
+usuarios (Skeptic/Susceptible) de su vecindad de Moore en dos arreglos enteros
+(indptr, indices). En el modo de red la vecindad sale de un grafo CSR (ver
+topology.py) en lugar de la grilla; en la construcción masiva (ver bulk.py) las
+celdas de los agentes vienen de un arreglo de índices planos en lugar de sus celdas
+de Mesa. Los emisores leen un segmento del índice en lugar de recorrer
+cell.neighborhood comparando nombres de clase.
+"""
+import numpy as np
+
+# Desplazamientos (fila, columna) de la vecindad de Moore de radio 1
+MOORE_OFFSETS = np.array([(dr, dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1) if (dr, dc) != (0, 0)])
+
+
+def grid_neighbours(cells, occupant, width, height):
+    """
+    Construye la adyacencia CSR (indptr, indices) desde las celdas `cells` hacia los
+    usuarios vecinos. `occupant[c]` es el índice del usuario en la celda c o -1.
+    """
+    cells = np.asarray(cells, dtype=np.int64)
+    rows, cols = np.divmod(cells, width)
+    nb_cells = ((rows[:, None] + MOORE_OFFSETS[:, 0]) % height) * width + (cols[:, None] + MOORE_OFFSETS[:, 1]) % width
+    nb = occupant[nb_cells]
+    # En grillas de alto o ancho menor a 3 una celda puede aparecer repetida o ser la propia
+    mask = (nb >= 0) & (nb_cells != cells[:, None])
+    src = np.repeat(np.arange(len(cells)), mask.sum(axis=1))
+    dst = nb[mask]
+    if height < 3 or width < 3:
+        n = max(len(occupant), 1)
+        key = np.unique(src * n + dst)
+        src, dst = np.divmod(key, n)
+
+    indptr = np.zeros(len(cells) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=len(cells)), out=indptr[1:])
+    return indptr, dst.astype(np.int64)
+
+
+def graph_neighbours(indptr, indices, nodes, occupant):
+    """
+    Como grid_neighbours, pero sobre un grafo CSR (indptr, indices): adyacencia desde
+    los nodos `nodes` hacia los usuarios vecinos. `occupant[v]` es el índice del
+    usuario en el nodo v del grafo o -1.
+    """
+    pos, neighbours = expand_neighbours(indptr, indices, np.asarray(nodes, dtype=np.int64))
+    users = occupant[neighbours]
+    keep = users >= 0
+    out = np.zeros(len(nodes) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(pos[keep], minlength=len(nodes)), out=out[1:])
+    return out, users[keep]
+
+
+def expand_neighbours(indptr, indices, rows):
+    """
+    Expande las filas `rows` de una adyacencia CSR.
+    Devuelve (pos, vecino): `pos` indica la posición en `rows` de la que proviene cada vecino.
+    """
+    starts = indptr[rows]
+    counts = indptr[rows + 1] - starts
+    pos = np.repeat(np.arange(len(rows)), counts)
+    offsets = np.arange(len(pos)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return pos, indices[np.repeat(starts, counts) + offsets]
+
+
+class UserAdjacency:
+    """
+    Adyacencia CSR de usuarios vecinos para los agentes del modelo.
+
+    Los nodos 0..n_users-1 son los usuarios y el resto las fuentes (BOTs y NewsReels);
+    cada agente guarda su número de nodo en `agent.node`. El índice se construye una vez
+    y solo se reconstruye si un agente cambia de celda. Una conversión entre Skeptic y
+    Susceptible no lo modifica, porque ambos tipos siguen siendo usuarios.
+    """
+
+    def __init__(self, model, users, sources, graph=None, graph_nodes=None, grid_cells=None):
+        self.model = model
+        # Modo de red: grafo CSR (indptr, indices) y nodo del grafo que ocupa cada agente
+        self.graph = graph
+        self.graph_nodes = graph_nodes
+        # Construcción masiva: celda plana de cada agente (None: se leen sus celdas de Mesa)
+        self.grid_cells = grid_cells
+        self.agents = list(users) + list(sources)
+        self.n_users = len(users)
+        for node, agent in enumerate(self.agents):
+            agent.node = node
+        self.indptr = None
+        self.indices = None
+        self.version = 0  # aumenta cada vez que cambian las posiciones (lo usa el renderizador)
+        self.rebuild()
+
+    def rebuild(self):
+        """Recalcula el índice a partir de las coordenadas actuales de los agentes."""
+        if self.graph is not None:
+            indptr, indices = self.graph
+            occupant = np.full(len(indptr) - 1, -1, dtype=np.int64)
+            occupant[self.graph_nodes[: self.n_users]] = np.arange(self.n_users)
+            self.indptr, self.indices = graph_neighbours(indptr, indices, self.graph_nodes, occupant)
+            self._dirty = False
+            return
+
+        width, height = self.model.width, self.model.height
+        # Los agentes sin celda (retirados del modelo) quedan sin vecinos
+        if self.grid_cells is not None:
+            cells = np.asarray(self.grid_cells, dtype=np.int64)
+        else:
+            cells = np.array([-1 if agent.cell is None else agent.cell.coordinate[0] * width + agent.cell.coordinate[1] for agent in self.agents], dtype=np.int64)
+        placed = cells >= 0
+        users = np.flatnonzero(placed[: self.n_users])
+        occupant = np.full(width * height, -1, dtype=np.int64)
+        occupant[cells[users]] = users
+
+        indptr, self.indices = grid_neighbours(cells[placed], occupant, width, height)
+        counts = np.zeros(len(self.agents), dtype=np.int64)
+        counts[placed] = np.diff(indptr)
+        self.indptr = np.zeros(len(self.agents) + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.indptr[1:])
+        self._dirty = False
+
+    def invalidate(self):
+        """Marca el índice como desactualizado (un agente se movió); se reconstruye en la próxima consulta."""
+        self._dirty = True
+        self.version += 1
+
+    def neighbour_nodes(self, agent):
+        """Segmento del índice con los nodos de los usuarios vecinos del agente."""
+        if self._dirty:
+            self.rebuild()
+        return self.indices[self.indptr[agent.node] : self.indptr[agent.node + 1]]
+
+    def neighbours(self, agent):
+        """Usuarios vecinos del agente."""
+        agents = self.agents
+        return [agents[node] for node in self.neighbour_nodes(agent).tolist()]
@@ -1,5 +1,8 @@
 from mesa.discrete_space import CellAgent
 from commons.commons import *
+from newsstore import ExposureCountView, NewsIdsView
+from propagation import FLAG_PARTY_A, FLAG_RECEIVER_SUSCEPTIBLE, FLAG_SENDER_SUSCEPTIBLE, FLAG_TRUE
+from conversions import KIND_NAMES, SKEPTIC, SUSCEPTIBLE
 
 import random
 from typing import Optional, List
@@ -14,27 +17,46 @@ ALPHA = 0.1
 THRESHOLD_TO_SKEPTIC = -0.3  # Si percepción hacia partido contrario es muy negativa
 THRESHOLD_TO_SUSCEPTIBLE = 0.3  # Si percepción hacia partido contrario es muy positiva
 
+# Pesos (w_m, w_f, w_c) de la probabilidad de compartir según el tipo de agente
+SHARE_WEIGHTS_SUSCEPTIBLE = (0.1, 0.3, 0.6)
+SHARE_WEIGHTS_SKEPTIC = (0.3, 0.6, 0.1)
+
 
 class News:
-    count = 0
+    __slots__ = ("id", "party", "polarity", "veracity", "credibility")
 
-    def __init__(self, id=None, party=None, polarity=None, veracity=None, credibility=None):  # f_k: credibilidad de la noticia
+    def __init__(self, id=None, party=None, polarity=None, veracity=None, credibility=None, rng: Optional[random.Random] = None):  # f_k: credibilidad de la noticia
         super().__init__()  # Initialize News
-        if id is None:
-            id = News.count
+        # Sin id, lo asigna la tabla de noticias del modelo al registrarla (no hay contador global)
         self.id = id
-        News.count += 1
-        self.party = party if party is not None else random.choice(PARTY)
-        self.polarity = polarity if polarity is not None else random.choice(POLARITYNEWS)
-        self.veracity = veracity if veracity is not None else random.choice(VERACITYNEWS)
+        # Los sorteos usan el generador del modelo (rng); sin él, el módulo random global
+        rng = rng if rng is not None else random
+        self.party = party if party is not None else rng.choice(PARTY)
+        self.polarity = polarity if polarity is not None else rng.choice(POLARITYNEWS)
+        self.veracity = veracity if veracity is not None else rng.choice(VERACITYNEWS)
         # Credibilidad de la noticia: alta si es verdadera, baja si es falsa
         if credibility is None:
-            self.credibility = random.uniform(0.7, 0.9) if self.veracity else random.uniform(0.1, 0.3)
+            self.credibility = rng.uniform(0.7, 0.9) if self.veracity else rng.uniform(0.1, 0.3)
         else:
             self.credibility = credibility
 
 
-class BOT(CellAgent):
+class NetworkAgent(CellAgent):
+    """CellAgent que avisa al índice de adyacencia del modelo cuando cambia de celda."""
+
+    @property
+    def cell(self):
+        return self._mesa_cell
+
+    @cell.setter
+    def cell(self, cell):
+        CellAgent.cell.fset(self, cell)
+        adjacency = getattr(self.model, "adjacency", None)
+        if adjacency is not None:
+            adjacency.invalidate()
+
+
+class BOT(NetworkAgent):
     count = 0
 
     def __init__(self, model, id=None, initialnews=None, cell=None):
@@ -47,23 +69,27 @@ class BOT(CellAgent):
         self.cell = cell
 
     def create_news(self):
-        news = News(veracity=False)
+        news = self.model.news_table.add(News(veracity=False, rng=self.random), born=self.model.steps)
         self.initialnews.append(news)
 
     def sendNews(self, news: News, radius: int = 1):
-        # recorrer celdas vecinas
-        for cell in self.cell.neighborhood:
-            # recorrer agentes dentro de cada celda vecina
-            for agent in cell.agents:
-                # Solo enviar a Skeptic o Susceptible, NO a BOTs ni NewsReels
-                agent_type = type(agent).__name__
-                if agent_type not in ["Skeptic", "Susceptible"]:
-                    continue
-                if agent is not self:
-                    agent.receiveNews(news)
-
-
-class NewsReel(CellAgent):
+        # La cascada se procesa de forma iterativa en el modelo
+        self.model.cascade.send(self, news)
+
+    def deliverNews(self, news: News, sender: int = None) -> int:
+        """Entrega la noticia a los usuarios vecinos (un salto). Retorna el número de entregas."""
+        delivered = 0
+        tree = self.model.cascade_index
+        # El índice de adyacencia solo contiene usuarios (Skeptic o Susceptible) vecinos
+        for agent in self.model.adjacency.neighbours(self):
+            if tree is not None and not self.model.exposure.has_received(agent.slot, news.id):
+                tree.add(news.id, news.veracity, agent.node, -1, self.model.steps, agent.kind == SUSCEPTIBLE)
+            agent.receiveNews(news)
+            delivered += 1
+        return delivered
+
+
+class NewsReel(NetworkAgent):
     count = 0
 
     def __init__(self, model, id=None, initialnews=None, cell=None):
@@ -76,40 +102,74 @@ class NewsReel(CellAgent):
         self.cell = cell
 
     def create_news(self):
-        news = News(veracity=True)
+        news = self.model.news_table.add(News(veracity=True, rng=self.random), born=self.model.steps)
         self.initialnews.append(news)
 
     def sendNews(self, news: News, radius: int = 1):
-        # recorrer celdas vecinas
-        for cell in self.cell.neighborhood:
-            # recorrer agentes dentro de cada celda vecina
-            for agent in cell.agents:
-                # Solo enviar a Skeptic o Susceptible, NO a BOTs ni NewsReels
-                agent_type = type(agent).__name__
-                if agent_type not in ["Skeptic", "Susceptible"]:
-                    continue
-                if agent is not self:
-                    agent.receiveNews(news)
-
-
-class User(CellAgent):
+        # La cascada se procesa de forma iterativa en el modelo
+        self.model.cascade.send(self, news)
+
+    def deliverNews(self, news: News, sender: int = None) -> int:
+        """Entrega la noticia a los usuarios vecinos (un salto). Retorna el número de entregas."""
+        delivered = 0
+        tree = self.model.cascade_index
+        # El índice de adyacencia solo contiene usuarios (Skeptic o Susceptible) vecinos
+        for agent in self.model.adjacency.neighbours(self):
+            if tree is not None and not self.model.exposure.has_received(agent.slot, news.id):
+                tree.add(news.id, news.veracity, agent.node, -1, self.model.steps, agent.kind == SUSCEPTIBLE)
+            agent.receiveNews(news)
+            delivered += 1
+        return delivered
+
+
+class User(NetworkAgent):
+    # Tipo actual (SKEPTIC o SUSCEPTIBLE): cada subclase fija el de creación y convertTo lo cambia en la instancia
+    kind = None
 
     def __init__(self, model, id, partido: Optional[str] = None, credibility: Optional[float] = None, perception: Optional[dict[str, float]] = None, newsShared: Optional[List[News]] = None, newsReceived: Optional[List[News]] = None, cell=None):  # Partido político del agente (A o B)
         super().__init__(model)  # Initialize Agent
 
         self.id = id
-        self.partido = partido if partido is not None else random.choice(PARTY)
+        self.partido = partido if partido is not None else self.random.choice(PARTY)
+        self.other_party = "B" if self.partido == "A" else "A"
+        self.kind = type(self).kind
         self.credibility = credibility
         self.perception = perception if perception is not None else {"A": 0.0, "B": 0.0}
-        self.newsShared = newsShared if newsShared is not None else []
-        self.newsReceived = newsReceived if newsReceived is not None else []
 
-        self.newsReceivedIds = {n.id for n in self.newsReceived}
-        self.newsSharedIds = {n.id for n in self.newsShared}
-        self.newsExposureCount = {}
+        # Noticias recibidas/compartidas y exposiciones viven en el estado compacto del modelo
+        self.slot = self.model.exposure.add_user()
+        for news in newsReceived or []:
+            self.model.exposure.mark_received(self.slot, self.model.news_table.add(news, born=self.model.steps).id)
+        for news in newsShared or []:
+            self.model.exposure.mark_shared(self.slot, self.model.news_table.add(news, born=self.model.steps).id)
 
         self.cell = cell
 
+        # Registrar la percepción inicial en las estadísticas incrementales del modelo
+        self.model.perception_stats.add(USER_TYPES[self.kind], self.perception)
+
+    @property
+    def newsReceived(self) -> tuple:
+        """Noticias recibidas (vista de solo lectura, ordenadas por id)."""
+        return self.model.exposure.news(self.model.exposure.received, self.slot)
+
+    @property
+    def newsShared(self) -> tuple:
+        """Noticias compartidas (vista de solo lectura, ordenadas por id)."""
+        return self.model.exposure.news(self.model.exposure.shared, self.slot)
+
+    @property
+    def newsReceivedIds(self) -> NewsIdsView:
+        return NewsIdsView(self.model.exposure, "received", self.slot)
+
+    @property
+    def newsSharedIds(self) -> NewsIdsView:
+        return NewsIdsView(self.model.exposure, "shared", self.slot)
+
+    @property
+    def newsExposureCount(self) -> ExposureCountView:
+        return ExposureCountView(self.model.exposure, self.slot)
+
     def computeShareProbability(self, news: News, w_m, w_f, w_c):
         """
         Calcula P_C según la propuesta:
@@ -137,108 +197,142 @@ class User(CellAgent):
         return P_C
 
     def receiveNews(self, news: News, sender: int = None):
+        exposure = self.model.exposure
         # Si ya vio la noticia: contabiliza exposición y no procesa de nuevo
-        if news.id in self.newsReceivedIds:
+        if exposure.has_received(self.slot, news.id):
             # opcional: contar exposiciones repetidas
-            self.newsExposureCount[news.id] = self.newsExposureCount.get(news.id, 1) + 1
+            exposure.add_exposure(self.slot, news.id)
             return
 
         # primera vez que la ve
-        self.newsReceived.append(news)
-        self.newsReceivedIds.add(news.id)
-        self.newsExposureCount[news.id] = 1
+        exposure.mark_received(self.slot, news.id)
 
         # actualizar percepción la primera vez
         self.updatePerception(news)
 
         # verificar si debe convertirse a otro tipo
+        inst = self.model.instrumentation
         new_type = self.checkConversion()
         if new_type is not None:
-            self.convertTo(new_type)
+            if inst is None:
+                self.convertTo(new_type)
+            else:
+                start = inst.clock()
+                self.convertTo(new_type)
+                inst.add_time("convertTo", inst.clock() - start)
+                inst.count("conversions")
 
         # decidir compartir: si decide, la envía (y registra que la compartió)
-        try:
+        if inst is None:
             share = self.shareDecision(news)
-        except NotImplementedError:
-            share = False
+        else:
+            start = inst.clock()
+            share = self.shareDecision(news)
+            inst.add_time("shareDecision", inst.clock() - start)
 
         if share:
             self.sendNews(news, sender=self.id)
-            self.newsShared.append(news)
-            self.newsSharedIds.add(news.id)
+            exposure.mark_shared(self.slot, news.id)
+        elif self.model.active is not None:
+            # modo por eventos: queda pendiente para la activación del próximo step
+            self.model.active.add(self, news)
 
     def sendNews(self, news: News, sender: int = None, radius: int = 1):
-        for cell in self.cell.neighborhood:
-            for agent in cell.agents:
-                # Solo enviar a Skeptic o Susceptible, NO a BOTs ni NewsReels
-                agent_type = type(agent).__name__
-                if agent_type not in ["Skeptic", "Susceptible"]:
-                    continue
-
-                if agent is not self:
-                    # evita devolverla al emisor inmediato
-                    if sender is not None and agent.id == sender:
-                        continue
-                    # evita enviar si el receptor ya vio la noticia
-                    if hasattr(agent, "newsReceivedIds") and news.id in agent.newsReceivedIds:
-                        continue
-
-                    # enviar
-                    agent.receiveNews(news, sender=self.id)
-
-                    # Registrar la propagación SOLO después de envío exitoso
-                    if hasattr(self.model, "news_propagation"):
-                        self.model.news_propagation.append({"sender_id": self.id, "sender_type": self.__class__.__name__, "receiver_id": agent.id, "receiver_type": agent.__class__.__name__, "news_id": news.id, "news_party": news.party, "news_veracity": news.veracity})
+        # Se encola en la frontera del modelo en lugar de llamar recursivamente a receiveNews
+        self.model.cascade.send(self, news, sender)
+
+    def deliverNews(self, news: News, sender: int = None) -> int:
+        """Entrega la noticia a los usuarios vecinos que aún no la vieron (un salto). Retorna el número de entregas."""
+        delivered = 0
+        exposure = self.model.exposure
+        log = self.model.propagation_log
+        # Nodo con que este usuario recibió la noticia: padre de sus entregas en el árbol de la cascada
+        tree = self.model.cascade_index
+        parent = tree.node_of(news.id, self.node) if tree is not None else -1
+        # Bits de la noticia y del emisor para el registro de propagación
+        flags = (FLAG_TRUE if news.veracity else 0) | (FLAG_PARTY_A if news.party == "A" else 0) | (FLAG_SENDER_SUSCEPTIBLE if self.kind == SUSCEPTIBLE else 0)
+        # El índice de adyacencia solo contiene usuarios vecinos (nunca al propio agente)
+        for agent in self.model.adjacency.neighbours(self):
+            # evita devolverla al emisor inmediato
+            if sender is not None and agent.id == sender:
+                continue
+            # evita enviar si el receptor ya vio la noticia
+            if exposure.has_received(agent.slot, news.id):
+                if self.model.instrumentation is not None:
+                    self.model.instrumentation.count("duplicates_rejected")
+                continue
+
+            # enviar (el tipo del receptor en el árbol es el previo a una posible conversión)
+            if tree is not None:
+                tree.add(news.id, news.veracity, agent.node, parent, self.model.steps, agent.kind == SUSCEPTIBLE)
+            agent.receiveNews(news, sender=self.id)
+            delivered += 1
+
+            # Registrar la propagación SOLO después de envío exitoso
+            log.append(self.node, agent.node, news.id, flags | (FLAG_RECEIVER_SUSCEPTIBLE if agent.kind == SUSCEPTIBLE else 0))
+
+        return delivered
 
     def convertTo(self, new_type):
         """
-        Convierte el agente al nuevo tipo especificado.
-        Mantiene todos los atributos (percepción, credibilidad, noticias) pero cambia el comportamiento.
+        Convierte el agente al nuevo tipo (SKEPTIC/SUSCEPTIBLE, o la clase Skeptic/Susceptible).
+        Mantiene todos los atributos (percepción, credibilidad, noticias) y la clase del objeto:
+        el comportamiento depende de `kind`.
         """
-        old_type_name = self.__class__.__name__
-        new_type_name = new_type.__name__
+        kind = KIND_OF.get(new_type, new_type)
+        old_kind = self.kind
+        model = self.model
 
-        # Ajustar credibilidad según el nuevo tipo
-        if new_type == Skeptic:
+        # Ajustar credibilidad según el nuevo tipo e incrementar su contador en el modelo
+        if kind == SKEPTIC:
             # Al volverse escéptico, reduce su credibilidad
             self.credibility = clamp(self.credibility * 0.5, 0.1, 0.3)
-            # Incrementar contador en el modelo
-            if hasattr(self.model, "conversions_to_skeptic"):
-                self.model.conversions_to_skeptic += 1
-        elif new_type == Susceptible:
+            model.conversions_to_skeptic += 1
+        else:
             # Al volverse susceptible, aumenta su credibilidad
             self.credibility = clamp(self.credibility * 2.0, 0.6, 0.9)
-            # Incrementar contador en el modelo
-            if hasattr(self.model, "conversions_to_susceptible"):
-                self.model.conversions_to_susceptible += 1
-
-        # Obtener posición en el grid
-        cell_pos = self.cell.coordinate if hasattr(self.cell, "coordinate") else "desconocida"
+            model.conversions_to_susceptible += 1
 
-        # Obtener percepción actual
-        other_party = "B" if self.partido == "A" else "A"
-        perception = self.perception[other_party]
+        # Cambiar el tipo en el agente, en las estadísticas y en el índice por tipo
+        model.perception_stats.move(USER_TYPES[old_kind], USER_TYPES[kind], self.perception)
+        self.kind = kind
+        model.kinds.move(self.node, kind)
 
-        # Cambiar la clase del objeto
-        self.__class__ = new_type
+        # Registrar la conversión en el modelo para mostrar después (model.converted_agents)
+        model.conversions.append(model.steps, self.node, kind, self.perception[self.other_party], self.credibility)
 
-        # Registrar la conversión en el modelo para mostrar después
-        if hasattr(self.model, "converted_agents"):
-            self.model.converted_agents.append({"id": self.id, "old_type": old_type_name, "new_type": new_type_name, "partido": self.partido, "position": cell_pos, "perception": perception, "new_credibility": self.credibility})
+        # Evento de nivel debug: no se formatea ni se escribe si el nivel no está habilitado
+        if model.events.enabled("debug"):
+            old_type_name, new_type_name = KIND_NAMES[old_kind], KIND_NAMES[kind]
+            model.events.emit("debug", f"  >> CONVERSION: {old_type_name} {self.id} (Partido {self.partido}) -> {new_type_name} (nueva credibilidad: {self.credibility:.3f})", id=self.id, old_type=old_type_name, new_type=new_type_name)
 
-        print(f"  >> CONVERSION: {old_type_name} {self.id} (Partido {self.partido}) -> {new_type_name} (nueva credibilidad: {self.credibility:.3f})")
+    def setPerception(self, party: str, value: float):
+        """Fija la percepción hacia un partido manteniendo al día las estadísticas del modelo."""
+        self.model.perception_stats.update(USER_TYPES[self.kind], party, self.perception[party], value)
+        self.perception[party] = value
 
     def shareDecision(self, news: News) -> bool:
-        """Abstracto: devolver True si decide compartir (según la noticia)."""
-        raise NotImplementedError
+        """True si decide compartir la noticia. Un Skeptic nunca comparte noticias falsas."""
+        if self.kind == SKEPTIC:
+            if not news.veracity:
+                return False
+            w1, w2, w3 = SHARE_WEIGHTS_SKEPTIC
+        else:
+            w1, w2, w3 = SHARE_WEIGHTS_SUSCEPTIBLE
+        pc = self.computeShareProbability(news, w1, w2, w3)
+        return self.random.random() < pc
 
     def updatePerception(self, news: News):
         """
         Actualiza la percepción según la propuesta:
         P_{i,t} = clamp(P_{i,t-1} + x_j·α·polarity·c_i, -1, 1)
 
-        Donde x_j = 1 si la noticia es del partido contrario, 0 si es del mismo
+        Donde x_j = 1 si la noticia es del partido contrario, 0 si es del mismo.
+        Susceptible actualiza con TODAS las noticias; Skeptic SOLO con las VERDADERAS.
         """
+        if self.kind == SKEPTIC and not news.veracity:
+            return
+
         # Determinar si la noticia es del partido contrario
         x_j = 1 if news.party != self.partido else 0
 
@@ -248,97 +342,50 @@ class User(CellAgent):
         # Actualizar percepción del partido de la noticia
         old_perception = self.perception[news.party]
         new_perception = clamp(old_perception + delta, -1.0, 1.0)
-        self.perception[news.party] = roundto(new_perception)
+        self.setPerception(news.party, roundto(new_perception))
 
     def checkConversion(self):
         """
         Verifica si el agente debe convertirse a otro tipo basándose en su percepción.
-        Retorna el tipo al que debe convertirse o None si no debe cambiar.
+        Retorna el tipo (SKEPTIC/SUSCEPTIBLE) al que debe convertirse o None si no debe cambiar.
         """
-        # Obtener percepción hacia el partido contrario
-        other_party = "B" if self.partido == "A" else "A"
-        perception_to_other = self.perception[other_party]
+        # Percepción hacia el partido contrario
+        perception_to_other = self.perception[self.other_party]
 
         # Determinar si debe convertirse
-        if isinstance(self, Susceptible):
+        if self.kind == SUSCEPTIBLE:
             # Susceptible se vuelve Skeptic si tiene percepción muy negativa hacia el partido contrario
             if perception_to_other <= THRESHOLD_TO_SKEPTIC:
-                return Skeptic
-        elif isinstance(self, Skeptic):
+                return SKEPTIC
+        elif perception_to_other >= THRESHOLD_TO_SUSCEPTIBLE:
             # Skeptic se vuelve Susceptible si tiene percepción muy positiva hacia el partido contrario
-            if perception_to_other >= THRESHOLD_TO_SUSCEPTIBLE:
-                return Susceptible
+            return SUSCEPTIBLE
 
         return None
 
 
 class Susceptible(User):
+    kind = SUSCEPTIBLE
+
     def __init__(self, model, id=None, credibility=None, **kwargs):
         if id is None:
             id = len(model.agents_by_type[Susceptible]) if Susceptible in model.agents_by_type else 0
         super().__init__(model, id, credibility=credibility, **kwargs)
         if self.credibility is None:
-            self.credibility = random.uniform(0.6, 0.9)
-
-    def shareDecision(self, news: News) -> bool:
-        w1 = 0.1
-        w2 = 0.3
-        w3 = 0.6
-        pc = self.computeShareProbability(news, w1, w2, w3)
-        return random.random() < pc
-
-    def updatePerception(self, news: News):
-        """
-        Susceptible actualiza percepción con TODAS las noticias.
-        Usa la fórmula: P_{i,t} = clamp(P_{i,t-1} + x_j·α·polarity·c_i, -1, 1)
-        """
-        # Determinar si la noticia es del partido contrario
-        x_j = 1 if news.party != self.partido else 0
-
-        # Calcular incremento de percepción
-        delta = x_j * ALPHA * news.polarity * self.credibility
-
-        # Actualizar percepción del partido de la noticia
-        old_perception = self.perception[news.party]
-        new_perception = clamp(old_perception + delta, -1.0, 1.0)
-        self.perception[news.party] = roundto(new_perception)
+            self.credibility = self.random.uniform(0.6, 0.9)
 
 
 class Skeptic(User):
+    kind = SKEPTIC
+
     def __init__(self, model, id=None, credibility=None, **kwargs):
         if id is None:
             id = len(model.agents_by_type[Skeptic]) if Skeptic in model.agents_by_type else 0
         super().__init__(model, id, credibility=credibility, **kwargs)
         if self.credibility is None:
-            self.credibility = random.uniform(0.1, 0.3)
-
-    def shareDecision(self, news: News) -> bool:
-        w1 = 0.3
-        w2 = 0.6
-        w3 = 0.1
-        if news.veracity == False:
-            return False
-        else:
-            pc = self.computeShareProbability(news, w1, w2, w3)
-            return random.random() < pc
-
-    def updatePerception(self, news: News):
-        """
-        Skeptic SOLO actualiza percepción con noticias VERDADERAS.
-        Usa la fórmula: P_{i,t} = clamp(P_{i,t-1} + x_j·α·polarity·c_i, -1, 1)
-        pero con factor=0 si la noticia es falsa.
-        """
-        # Solo actualiza si la noticia es verdadera
-        if not news.veracity:
-            return
-
-        # Determinar si la noticia es del partido contrario
-        x_j = 1 if news.party != self.partido else 0
+            self.credibility = self.random.uniform(0.1, 0.3)
 
-        # Calcular incremento de percepción
-        delta = x_j * ALPHA * news.polarity * self.credibility
 
-        # Actualizar percepción del partido de la noticia
-        old_perception = self.perception[news.party]
-        new_perception = clamp(old_perception + delta, -1.0, 1.0)
-        self.perception[news.party] = roundto(new_perception)
+# Clase de cada tipo de usuario (estadísticas de percepción por clase) y tipo de cada clase
+USER_TYPES = (Skeptic, Susceptible)
+KIND_OF = {Skeptic: SKEPTIC, Susceptible: SUSCEPTIBLE}
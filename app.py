@@ -1,16 +1,25 @@
 from model import SocialNetworkModel
-from agents import Susceptible, Skeptic, BOT, NewsReel
+from agents import BOT, NewsReel, User
+from conversions import SUSCEPTIBLE
+from render import NetworkRenderer
+from sessions import ModelPool
 from mesa.experimental.devs import ABMSimulator
 from mesa.visualization import (
     CommandConsole,
     Slider,
-    SolaraViz,
-    SpaceRenderer,
     make_plot_component,
 )
 from mesa.visualization.components import AgentPortrayalStyle
+from mesa.visualization.solara_viz import ComponentsView, ModelCreator, ShowSteps
+from mesa.visualization.utils import force_update
 import solara
-from matplotlib.figure import Figure
+
+# Flechas dibujadas por step como máximo (por encima se agrupan y muestrean)
+MAX_ARROWS = 500
+# Cuadros por segundo como máximo que cada sesión envía a la interfaz mientras avanza
+MAX_FPS = 5
+# Sesiones (pestañas) con modelo propio a la vez en el servidor
+MAX_SESSIONS = 8
 
 
 def social_network_portrayal(agent):
@@ -19,10 +28,9 @@ def social_network_portrayal(agent):
 
     portrayal = AgentPortrayalStyle(size=50, marker="o", zorder=2, edgecolors="black")
 
-    if isinstance(agent, Susceptible):
-        portrayal.update(("color", "red"))
-    elif isinstance(agent, Skeptic):
-        portrayal.update(("color", "blue"))
+    # El tipo actual del usuario es su `kind` (la clase es la de su creación)
+    if isinstance(agent, User):
+        portrayal.update(("color", "red" if agent.kind == SUSCEPTIBLE else "blue"))
     elif isinstance(agent, BOT):
         portrayal.update(("color", "black"))
     elif isinstance(agent, NewsReel):
@@ -63,80 +71,99 @@ def SpaceWithArrows(model):
     # Usar model.steps como dependencia para forzar re-render
     steps = model.steps
 
-    fig = Figure(figsize=(8, 8))
-    ax = fig.add_subplot(111)
-
-    # Dibujar grid
-    ax.set_aspect("equal")
-    ax.set_xlim(-0.5, model.width - 0.5)
-    ax.set_ylim(-0.5, model.height - 0.5)
-    ax.set_xticks([x + 0.5 for x in range(model.width)])
-    ax.set_yticks([y + 0.5 for y in range(model.height)])
-    ax.grid(True, which="both", color="lightgray", linewidth=0.5)
-    ax.tick_params(left=False, bottom=False, labelleft=False, labelbottom=False)
-
-    # Dibujar agentes
-    for agent in model.agents:
-        if hasattr(agent, "cell") and hasattr(agent.cell, "coordinate"):
-            portrayal = social_network_portrayal(agent)
-            if portrayal:
-                x, y = agent.cell.coordinate
-                ax.scatter(
-                    x,
-                    y,
-                    s=portrayal.size if hasattr(portrayal, "size") else 50,
-                    c=portrayal.color if hasattr(portrayal, "color") else "gray",
-                    marker=portrayal.marker if hasattr(portrayal, "marker") else "o",
-                    edgecolors=portrayal.edgecolors if hasattr(portrayal, "edgecolors") else "black",
-                    zorder=portrayal.zorder if hasattr(portrayal, "zorder") else 2,
-                )
-
-    # Dibujar flechas de propagación
-    if hasattr(model, "news_propagation") and model.news_propagation:
-        agent_positions = {}
-        for agent in model.agents:
-            if hasattr(agent, "cell") and hasattr(agent.cell, "coordinate"):
-                agent_positions[agent.id] = agent.cell.coordinate
-
-        for prop in model.news_propagation:
-            sender_id = prop["sender_id"]
-            receiver_id = prop["receiver_id"]
-
-            if sender_id in agent_positions and receiver_id in agent_positions:
-                sender_pos = agent_positions[sender_id]
-                receiver_pos = agent_positions[receiver_id]
-
-                arrow_color = "green" if prop["news_veracity"] else "red"
-
-                ax.annotate(
-                    "",
-                    xy=receiver_pos,
-                    xytext=sender_pos,
-                    arrowprops=dict(
-                        arrowstyle="->",
-                        color=arrow_color,
-                        alpha=0.7,
-                        lw=2.5,
-                        shrinkA=8,
-                        shrinkB=8,
-                    ),
-                )
+    # Figura y artistas persistentes por modelo; cada step solo actualiza colores, flechas y leyenda
+    renderer = solara.use_memo(lambda: NetworkRenderer(model, social_network_portrayal, max_arrows=MAX_ARROWS), dependencies=[id(model)])
+    fig = renderer.update()
 
     solara.FigureMatplotlib(fig, dependencies=[steps, id(model)])
 
 
-simulator = ABMSimulator()
-model = SocialNetworkModel(simulator=simulator)
+def make_model(**params):
+    """Modelo y simulador de una sesión (sin el registro de eventos por consola de cada step)."""
+    simulator = ABMSimulator()
+    model = SocialNetworkModel(simulator=simulator, log_level="warning", **params)
+    return model, simulator
+
+
+# Un modelo por kernel de Solara (pestaña del navegador), avanzado en segundo plano
+pool = ModelPool(make_model, max_sessions=MAX_SESSIONS, max_fps=MAX_FPS)
+
+
+def _open_session():
+    kernel_id = solara.get_kernel_id()
+    return lambda: pool.release(kernel_id)
+
+
+solara.lab.on_kernel_start(_open_session)
 
 
 @solara.component
 def Page():
-    return SolaraViz(
-        model,
-        components=[SpaceWithArrows, perception_plot, shared_news_plot, CommandConsole],
-        model_params=model_params,
-        name="Social Network Simulation",
-    )
+    session = pool.acquire(solara.get_kernel_id())
+    if session is None:
+        # Pool lleno: no se cierra la sesión de otra pestaña para abrir esta
+        return solara.Error(label=f"Hay {MAX_SESSIONS} sesiones abiertas; vuelva a intentarlo cuando se cierre alguna.")
+    return SessionPage(session)
+
+
+@solara.component
+def SessionPage(session):
+    frame = solara.use_reactive(session.frame)
+    playing = solara.use_reactive(session.playing)
+    play_interval = solara.use_reactive(0)
+    model_parameters = solara.use_reactive({})
+    model = solara.use_reactive(session.model)
+
+    def watch_frames():
+        # Trae a la interfaz los cuadros que publica el hilo de la sesión (a lo sumo MAX_FPS por segundo)
+        last = frame.value
+        while not session.closed:
+            current = session.wait_frame(last, timeout=1.0)
+            if current != last:
+                last = current
+                model.set(session.model)
+                playing.set(session.playing)
+                frame.set(current)
+                force_update()
+
+    solara.use_thread(watch_frames, dependencies=[id(session)])
+    # El cuadro ya está dibujado: el hilo de la sesión puede seguir avanzando
+    solara.use_effect(session.frame_rendered, [frame.value])
+
+    def do_play_pause():
+        if session.playing:
+            session.pause()
+        else:
+            session.play()
+        playing.set(session.playing)
+
+    def on_play_interval(value):
+        play_interval.set(value)
+        session.play_interval = value / 1000
+
+    with solara.AppBar():
+        solara.AppBarTitle("Social Network Simulation")
+        solara.lab.ThemeToggle()
+
+    with solara.Sidebar(), solara.Column():
+        with solara.Card("Controls"):
+            solara.SliderInt(label="Play Interval (ms)", value=play_interval.value, on_value=on_play_interval, min=0, max=500, step=10)
+            with solara.Row(justify="space-between"):
+                solara.Button(label="Reset", color="primary", on_click=lambda: session.reset(model_parameters.value))
+                solara.Button(label="❚❚" if playing.value else "▶", color="primary", on_click=do_play_pause, disabled=not model.value.running)
+                solara.Button(label="Step", color="primary", on_click=lambda: session.step(), disabled=playing.value or not model.value.running)
+            if session.error:
+                solara.Error(label=session.error)
+            if session.closed:
+                solara.Warning(label="La sesión se cerró por inactividad; recargue la página para empezar una nueva.")
+        with solara.Card("Model Parameters"):
+            ModelCreator(model, model_params, model_parameters=model_parameters)
+        with solara.Card("Information"):
+            ShowSteps(model.value)
+        with solara.Card("Command Console"):
+            CommandConsole(model.value)
+
+    ComponentsView([SpaceWithArrows, perception_plot, shared_news_plot], model.value)
 
 
 page = Page
@@ -0,0 +1,181 @@
+"""
+Barridos de parámetros en paralelo para SocialNetworkModel.
+
+Cada combinación (parámetros, semilla) es un trabajo independiente que se ejecuta en
+un pool de procesos, sin la salida por consola del modelo. El trabajador escribe el
+DataFrame del DataCollector de su corrida en un archivo columnar propio (.npz) dentro
+del directorio de salida, de modo que la memoria del proceso principal no crece con
+el tamaño del barrido y un barrido interrumpido se reanuda omitiendo las corridas
+que ya tienen archivo.
+
+Uso:
+    python batch.py --param width=20,40 --param n_susceptible=70,140 --seeds 0-9 --steps 50 --out resultados
+"""
+import argparse
+import contextlib
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cache import RunCache, read_frame, save_frame
+
+# Motores disponibles, por nombre para que los trabajos sean serializables
+ENGINES = {
+    "abm": ("model", "SocialNetworkModel"),
+    "vectorized": ("vectorized", "VectorizedSocialNetworkModel"),
+    "tiled": ("tiles", "TiledVectorizedModel"),
+    "meanfield": ("meanfield", "MeanFieldSocialNetworkModel"),
+}
+
+
+def expand_grid(param_grid: dict, seeds) -> list:
+    """Producto cartesiano de los valores de `param_grid` por cada semilla: lista de (params, seed)."""
+    names = sorted(param_grid)
+    combos = itertools.product(*(param_grid[name] for name in names))
+    return [(dict(zip(names, values)), seed) for values in combos for seed in seeds]
+
+
+def run_key(params: dict, seed, steps: int, engine: str) -> str:
+    """Identificador estable de una corrida."""
+    payload = json.dumps({"params": params, "seed": seed, "steps": steps, "engine": engine}, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+def run_path(output_dir: str, params: dict, seed, steps: int, engine: str) -> str:
+    return os.path.join(output_dir, f"run_{run_key(params, seed, steps, engine)}.npz")
+
+
+def make_model(engine: str, **kwargs):
+    module_name, class_name = ENGINES[engine]
+    module = __import__(module_name)
+    return getattr(module, class_name)(**kwargs)
+
+
+def run_model(params: dict, seed, steps: int, engine: str = "abm") -> pd.DataFrame:
+    """Ejecuta una corrida sin salida por consola y devuelve el DataFrame del DataCollector."""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        model = make_model(engine, seed=seed, **params)
+        for _ in range(steps):
+            if not model.running:
+                break
+            model.step()
+        # Si convergió antes del presupuesto (ver convergence.py), se completan las filas restantes
+        if getattr(model, "converged_at", None) is not None:
+            model.fast_forward(steps)
+    return model.datacollector.get_model_vars_dataframe()
+
+
+def cached_run(params: dict, seed, steps: int, engine: str = "abm", cache: RunCache = None) -> pd.DataFrame:
+    """Como run_model, pero devuelve el resultado guardado en `cache` si la corrida ya se hizo."""
+    if cache is None:
+        return run_model(params, seed, steps, engine)
+    frame = cache.get(params, seed, steps, engine)
+    if frame is None:
+        frame = run_model(params, seed, steps, engine)
+        cache.put(frame, params, seed, steps, engine)
+    return frame
+
+
+def _run_job(job) -> str:
+    params, seed, steps, engine, output_dir, cache_dir, cache_bytes = job
+    path = run_path(output_dir, params, seed, steps, engine)
+    cache = RunCache(cache_dir, cache_bytes) if cache_dir is not None else None
+    frame = cached_run(params, seed, steps, engine, cache)
+    save_frame(path, frame, params, seed, steps, engine)
+    return path
+
+
+def iter_batch_run(param_grid: dict, seeds, output_dir: str, steps: int = 100, engine: str = "abm", workers=None, chunksize: int = 1, resume: bool = True, cache_dir: str = None, cache_bytes: int = 512 * 1024 * 1024):
+    """
+    Ejecuta el barrido en un pool de `workers` procesos (por defecto os.cpu_count()).
+    Los trabajos se reparten en bloques de `chunksize`. Con `resume=True` se omiten las
+    corridas que ya tienen archivo en `output_dir`. Si se indica `cache_dir`, las corridas
+    ya simuladas con el mismo código se toman de la caché (ver cache.RunCache).
+    Genera las rutas de los archivos a medida que las corridas terminan.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = []
+    for params, seed in expand_grid(param_grid, seeds):
+        if resume and os.path.exists(run_path(output_dir, params, seed, steps, engine)):
+            continue
+        jobs.append((params, seed, steps, engine, output_dir, cache_dir, cache_bytes))
+
+    if workers == 1:
+        for job in jobs:
+            yield _run_job(job)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(_run_job, jobs, chunksize=chunksize)
+
+
+def batch_run(param_grid: dict, seeds, output_dir: str, **kwargs) -> list:
+    """Ejecuta el barrido completo (ver iter_batch_run) y retorna las rutas de las corridas nuevas."""
+    return list(iter_batch_run(param_grid, seeds, output_dir, **kwargs))
+
+
+def load_run(path: str) -> pd.DataFrame:
+    """Lee una corrida: columnas del DataCollector más Step, seed, motor y los parámetros."""
+    frame, metadata = read_frame(path)
+    frame.insert(0, "Step", np.arange(len(frame)))
+    frame.insert(0, "seed", metadata["seed"])
+    frame.insert(0, "engine", metadata["engine"])
+    for name, value in sorted(metadata["params"].items(), reverse=True):
+        frame.insert(0, name, value)
+    return frame
+
+
+def load_results(output_dir: str) -> pd.DataFrame:
+    """Concatena todas las corridas guardadas en `output_dir`."""
+    paths = sorted(os.path.join(output_dir, name) for name in os.listdir(output_dir) if name.startswith("run_") and name.endswith(".npz"))
+    if not paths:
+        return pd.DataFrame()
+    return pd.concat([load_run(path) for path in paths], ignore_index=True)
+
+
+def _parse_values(text: str) -> list:
+    values = []
+    for item in text.split(","):
+        try:
+            values.append(json.loads(item))
+        except json.JSONDecodeError:
+            values.append(item)
+    return values
+
+
+def _parse_seeds(text: str) -> list:
+    if "-" in text:
+        start, end = text.split("-")
+        return list(range(int(start), int(end) + 1))
+    return [int(seed) for seed in text.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Barrido de parámetros en paralelo de SocialNetworkModel")
+    parser.add_argument("--param", action="append", default=[], help="nombre=v1,v2,... (se puede repetir)")
+    parser.add_argument("--seeds", default="0", help="lista '0,1,2' o rango '0-9'")
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="abm")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunksize", type=int, default=1)
+    parser.add_argument("--out", default="results")
+    parser.add_argument("--no-resume", action="store_true")
+    parser.add_argument("--cache", default=None, help="directorio de la caché de corridas")
+    args = parser.parse_args(argv)
+
+    param_grid = {}
+    for item in args.param:
+        name, values = item.split("=", 1)
+        param_grid[name] = _parse_values(values)
+
+    for path in iter_batch_run(param_grid, _parse_seeds(args.seeds), args.out, steps=args.steps, engine=args.engine, workers=args.workers, chunksize=args.chunksize, resume=not args.no_resume, cache_dir=args.cache):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Benchmarks de construcción, throughput de step y costo de cascadas.
+
+Cada escenario se ejecuta en un proceso nuevo (para medir la memoria pico de forma
+aislada) y sin la salida por consola del modelo. Los escenarios combinan tamaño de
+grilla, densidad de agentes y composición de la población (mayoría Susceptible,
+con cascadas grandes, o mayoría Skeptic).
+
+Uso:
+    python benchmark.py --sizes 20 50 100 --save baseline.json
+    python benchmark.py --sizes 20 50 100 --compare baseline.json --tolerance 0.2
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+# Fracción de usuarios Susceptible según la composición
+MIXES = {"susceptible": 0.9, "skeptic": 0.1}
+
+# Métricas donde un valor mayor es peor
+TIME_METRICS = ("init_seconds", "step_seconds")
+
+
+def scenario_params(size: int, density: float, mix: str, sources: float = 0.01) -> dict:
+    """Parámetros del modelo para una grilla size x size con la densidad y composición dadas."""
+    cells = size * size
+    n_sources = max(1, int(cells * sources))
+    n_users = max(2, int(cells * density) - 2 * n_sources)
+    n_susceptible = int(n_users * MIXES[mix])
+    return {
+        "width": size,
+        "height": size,
+        "n_susceptible": n_susceptible,
+        "n_skeptic": n_users - n_susceptible,
+        "n_bots": n_sources,
+        "n_newsreel": n_sources,
+    }
+
+
+def scenario_name(engine: str, size: int, density: float, mix: str) -> str:
+    return f"{engine}-{size}x{size}-d{density:g}-{mix}"
+
+
+def run_scenario(engine: str, params: dict, steps: int, seed: int) -> dict:
+    """Mide una corrida (se ejecuta dentro del proceso hijo)."""
+    from batch import ENGINES, make_model
+
+    # Importar el motor antes de medir para no contar el tiempo de importación de mesa
+    __import__(ENGINES[engine][0])
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        model = make_model(engine, seed=seed, **params)
+        init_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(steps):
+            model.step()
+        step_seconds = time.perf_counter() - start
+
+    frame = model.datacollector.get_model_vars_dataframe()
+    deliveries = int(frame["CascadeSize"].iloc[1:].sum())
+    n_users = params["n_susceptible"] + params["n_skeptic"]
+    return {
+        "params": params,
+        "steps": steps,
+        "init_seconds": init_seconds,
+        "step_seconds": step_seconds,
+        "agents_per_second": n_users * steps / step_seconds if step_seconds else 0.0,
+        "deliveries_per_second": deliveries / step_seconds if step_seconds else 0.0,
+        "deliveries": deliveries,
+        # ru_maxrss está en KiB en Linux y en bytes en macOS
+        "peak_memory_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024),
+    }
+
+
+def _run_isolated(args) -> dict:
+    return run_scenario(*args)
+
+
+def run_benchmarks(engines, sizes, densities, mixes, steps: int = 10, seed: int = 0) -> dict:
+    """Ejecuta todos los escenarios, cada uno en un proceso nuevo. Retorna {nombre: resultado}."""
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes=1, maxtasksperchild=1) as pool:
+        for engine in engines:
+            for size in sizes:
+                for density in densities:
+                    for mix in mixes:
+                        name = scenario_name(engine, size, density, mix)
+                        params = scenario_params(size, density, mix)
+                        results[name] = pool.apply(_run_isolated, ((engine, params, steps, seed),))
+                        print(format_result(name, results[name]), flush=True)
+    return results
+
+
+def format_result(name: str, result: dict) -> str:
+    return (
+        f"{name:<40} init {result['init_seconds']:8.3f}s  step {result['step_seconds']:8.3f}s  "
+        f"{result['agents_per_second']:12.0f} agentes/s  {result['deliveries_per_second']:12.0f} entregas/s  "
+        f"{result['peak_memory_mb']:8.1f} MB"
+    )
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Escenarios cuyo tiempo empeora más de `tolerance` (fracción) respecto a la línea base."""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        for metric in TIME_METRICS:
+            if reference[metric] > 0 and result[metric] > reference[metric] * (1 + tolerance):
+                regressions.append((name, metric, reference[metric], result[metric]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de SocialNetworkModel")
+    parser.add_argument("--engines", nargs="+", default=["abm", "vectorized"])
+    parser.add_argument("--sizes", nargs="+", type=int, default=[20, 50, 100, 200, 500])
+    parser.add_argument("--densities", nargs="+", type=float, default=[0.35, 0.7])
+    parser.add_argument("--mixes", nargs="+", choices=sorted(MIXES), default=sorted(MIXES))
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="guardar los resultados como línea base JSON")
+    parser.add_argument("--compare", help="línea base JSON contra la cual comparar")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.engines, args.sizes, args.densities, args.mixes, steps=args.steps, seed=args.seed)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for name, metric, before, after in regressions:
+            print(f"REGRESIÓN {name} {metric}: {before:.3f}s -> {after:.3f}s")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Construcción masiva de SocialNetworkModel para poblaciones grandes (bulk=True).
+
+La construcción por defecto mezcla la lista de todas las celdas de la grilla de Mesa
+y crea cada tipo de agente con create_agents: cada constructor calcula su id con
+len(agents_by_type[...]) y sortea partido y credibilidad de a uno. Con bulk=True:
+
+- Las celdas de los agentes se sortean de una vez como índices planos
+  (fila * width + columna) sin construir la grilla de Mesa. Los agentes no ocupan
+  celdas; el índice de adyacencia se arma desde model.grid_cells (en orden de nodo).
+- Ids, partidos y credibilidades iniciales se sortean en lotes de NumPy y se pasan a
+  los constructores, que ya no sortean ni cuentan agentes.
+
+La grilla de Mesa solo se construye si alguien accede a model.grid (por ejemplo la
+visualización) y en ese momento los agentes se ubican en sus celdas. Los sorteos
+salen de model.rng y no de model.random: una corrida con bulk=True no reproduce la
+misma semilla construida sin bulk.
+"""
+import numpy as np
+
+from agents import BOT, PARTY, NewsReel, Skeptic, Susceptible
+
+# Rango de la credibilidad inicial de cada tipo de usuario (el mismo de sus constructores)
+CREDIBILITY = {Skeptic: (0.1, 0.3), Susceptible: (0.6, 0.9)}
+
+
+def place(rng: np.random.Generator, n_cells: int, n_agents: int) -> np.ndarray:
+    """Celdas distintas (índices planos) para `n_agents` agentes, en orden de creación."""
+    if n_agents > n_cells:
+        raise ValueError(f"No hay suficientes celdas ({n_cells}) para {n_agents} agentes")
+    return rng.choice(n_cells, size=n_agents, replace=False)
+
+
+def populate(model, n_skeptic: int, n_susceptible: int, n_bots: int, n_newsreel: int):
+    """Crea los agentes en el orden de nodo del índice de adyacencia, con sorteos en lote."""
+    rng = model.rng
+    parties = np.array(PARTY)
+    for cls, n in ((Skeptic, n_skeptic), (Susceptible, n_susceptible)):
+        low, high = CREDIBILITY[cls]
+        partido = parties[rng.integers(0, len(PARTY), n)].tolist()
+        credibility = rng.uniform(low, high, n).tolist()
+        for i in range(n):
+            cls(model, id=i, partido=partido[i], credibility=credibility[i])
+    for cls, n in ((BOT, n_bots), (NewsReel, n_newsreel)):
+        for i in range(n):
+            cls(model, id=i)
@@ -0,0 +1,103 @@
+"""
+Caché en disco de corridas, direccionada por contenido.
+
+La clave de una corrida es un hash de sus parámetros, semilla, número de steps,
+motor y de la versión del código (hash de los fuentes .py del proyecto), así que un
+cambio en agents.py o model.py invalida automáticamente los resultados anteriores.
+Cada entrada es un archivo columnar .npz; cuando el tamaño total supera `max_bytes`
+se eliminan primero las entradas usadas hace más tiempo.
+"""
+import functools
+import glob
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+PARAMS_KEY = "__params__"
+
+
+def save_frame(path: str, frame: pd.DataFrame, params: dict, seed, steps: int, engine: str):
+    """Escribe el DataFrame como columnas NumPy en `path` (escritura atómica)."""
+    columns = {name: frame[name].to_numpy() for name in frame.columns}
+    metadata = json.dumps({"params": params, "seed": seed, "steps": steps, "engine": engine}, default=str)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **columns, **{PARAMS_KEY: np.array(metadata)})
+    os.replace(tmp_path, path)
+
+
+def read_frame(path: str):
+    """Lee un archivo escrito por save_frame. Retorna (DataFrame, metadatos)."""
+    with np.load(path) as data:
+        metadata = json.loads(str(data[PARAMS_KEY]))
+        frame = pd.DataFrame({name: data[name] for name in data.files if name != PARAMS_KEY})
+    return frame, metadata
+
+
+@functools.lru_cache(maxsize=None)
+def code_version() -> str:
+    """Hash de los archivos fuente del proyecto."""
+    base = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(base, "*.py")) + glob.glob(os.path.join(base, "commons", "*.py"))):
+        digest.update(os.path.relpath(path, base).encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class RunCache:
+    """Caché de DataFrames de corridas en `directory`, acotada a `max_bytes` en disco."""
+
+    def __init__(self, directory: str, max_bytes: int = 512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, params: dict, seed, steps: int, engine: str) -> str:
+        payload = json.dumps({"params": params, "seed": seed, "steps": steps, "engine": engine, "code": code_version()}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npz")
+
+    def get(self, params: dict, seed, steps: int, engine: str):
+        """DataFrame guardado para la corrida o None si no está en la caché."""
+        path = self.path(self.key(params, seed, steps, engine))
+        try:
+            frame, _ = read_frame(path)
+        except FileNotFoundError:
+            return None
+        # Marcar el uso para la política de desalojo
+        os.utime(path)
+        return frame
+
+    def put(self, frame: pd.DataFrame, params: dict, seed, steps: int, engine: str):
+        save_frame(self.path(self.key(params, seed, steps, engine)), frame, params, seed, steps, engine)
+        self.evict()
+
+    def evict(self):
+        """Elimina las entradas usadas hace más tiempo hasta quedar bajo `max_bytes`."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".npz"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
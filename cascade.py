@@ -0,0 +1,76 @@
+from collections import deque
+from typing import Optional
+
+
+class NewsCascade:
+    """
+    Propagación iterativa de noticias por frontera (BFS).
+
+    En lugar de que receiveNews llame a sendNews recursivamente, cada envío se agrega a
+    una lista de trabajo explícita y se procesa en orden de anchura. La profundidad de
+    un envío es el número de saltos desde la fuente del step (BOT, NewsReel o usuario
+    que compartió en step()). Si `max_hops` está definido, los envíos que lo superan se
+    postergan al próximo step, acotando el costo de la cascada por tick.
+    """
+
+    def __init__(self, max_hops: Optional[int] = None, instrumentation=None):
+        self.max_hops = max_hops
+        self.instrumentation = instrumentation
+        self.queue = deque()  # (emisor, noticia, sender, profundidad)
+        self.deferred = deque()  # envíos postergados por el límite de saltos
+        self.depth = 0  # profundidad máxima alcanzada en el step
+        self.size = 0  # entregas realizadas en el step
+        self._current_depth = 0
+        self._draining = False
+
+    def begin_step(self):
+        """Reinicia las métricas del step y reanuda los envíos postergados en el step anterior."""
+        self.depth = 0
+        self.size = 0
+        pending = self.deferred
+        self.deferred = deque()
+        for agent, news, sender in pending:
+            self.send(agent, news, sender)
+
+    def send(self, agent, news, sender: int = None):
+        """Agrega un envío a la frontera y, si no hay una cascada en curso, la procesa completa."""
+        depth = self._current_depth + 1
+        if self.max_hops is not None and depth > self.max_hops:
+            self.deferred.append((agent, news, sender))
+            return
+
+        self.queue.append((agent, news, sender, depth))
+        if not self._draining:
+            self._drain()
+
+    def send_batch(self, sends):
+        """Agrega varios envíos (agente, noticia) desde sus fuentes y procesa la cascada una sola vez."""
+        draining, self._draining = self._draining, True
+        try:
+            for agent, news in sends:
+                self.send(agent, news)
+        finally:
+            self._draining = draining
+        if not draining:
+            self._drain()
+
+    def _drain(self):
+        inst = self.instrumentation
+        start = inst.clock() if inst is not None else 0.0
+        size = self.size
+        self._draining = True
+        try:
+            while self.queue:
+                agent, news, sender, depth = self.queue.popleft()
+                self._current_depth = depth
+                delivered = agent.deliverNews(news, sender=sender)
+                if delivered:
+                    self.size += delivered
+                    self.depth = max(self.depth, depth)
+        finally:
+            self._current_depth = 0
+            self._draining = False
+            if inst is not None:
+                inst.add_time("cascade", inst.clock() - start)
+                inst.count("deliveries", self.size - size)
+                inst.max_depth = max(inst.max_depth, self.depth)
@@ -0,0 +1,118 @@
+"""
+Detección de quiescencia y de estado estacionario para terminar las corridas antes.
+
+El criterio se evalúa al final de cada step, después de la colecta. Cuando se cumple,
+el modelo pone `running = False` (los lotes y SolaraViz dejan de pedir steps) y guarda
+el step en `converged_at`. Si después se siguen pidiendo steps (por ejemplo desde el
+ABMSimulator, que no mira `running`), el modelo ya no simula: repite la última fila
+del DataCollector. `model.fast_forward(steps)` completa la salida hasta un presupuesto
+de steps de la misma forma. Los motores heredan esos métodos de ConvergenceMixin.
+
+- Quiescence: criterio exacto. Se cumple en un step en que nadie compartió, la
+  percepción no se movió, las conversiones siguieron iguales (previous_conversions)
+  y no queda ninguna decisión pendiente que pueda terminar en un envío. Desde ahí
+  todos los steps son idénticos, así que repetir la última fila es exacto. En el modo
+  por barrido los usuarios vuelven a decidir sobre todo lo que recibieron, así que
+  rara vez se cumple: para ese caso está SteadyState.
+- SteadyState: criterio estadístico sobre los reporters. Se cumple cuando, en las
+  últimas `window` filas, el rango de cada métrica es a lo sumo `tolerance` veces su
+  magnitud (con piso 1). Repetir la última fila aproxima los steps restantes.
+"""
+import numpy as np
+
+from recorder import Recorder
+
+# Reporters que por defecto deben estabilizarse (los contadores de noticias compartidas
+# crecen mientras haya re-envíos, aunque ya no lleguen a nadie)
+STEADY_METRICS = (
+    "AvgPerception_Skeptic",
+    "AvgPerception_Susceptible",
+    "NumSkeptics",
+    "NumSusceptibles",
+    "ConversionsToSkeptic",
+    "ConversionsToSusceptible",
+)
+
+
+class Quiescence:
+    """Nada cambió en el step y no quedan envíos posibles."""
+
+    name = "quiescence"
+
+    def __init__(self):
+        self.previous = None  # (compartidas, conversiones, percepción) al cierre del step anterior
+
+    def check(self, model) -> bool:
+        current = (
+            float(np.sum(model.true_news_shared) + np.sum(model.false_news_shared)),
+            float(np.sum(model.previous_conversions)),
+            tuple(np.ravel(model.perception_totals()).tolist()),
+        )
+        previous, self.previous = self.previous, current
+        # Las decisiones pendientes solo se cuentan si el step no cambió nada
+        return current == previous and model.pending_shares() == 0
+
+
+class SteadyState:
+    """Las métricas del DataCollector dejaron de moverse en una ventana de steps."""
+
+    name = "steady_state"
+
+    def __init__(self, metrics=STEADY_METRICS, window: int = 10, tolerance: float = 1e-3):
+        self.metrics = tuple(metrics)
+        self.window = max(window, 2)
+        self.tolerance = tolerance
+
+    def check(self, model) -> bool:
+        model_vars = model.datacollector.model_vars
+        for name in self.metrics:
+            recent = model_vars[name][-self.window :]
+            if len(recent) < self.window:
+                return False
+            if max(recent) - min(recent) > self.tolerance * max(1.0, abs(recent[-1])):
+                return False
+        return True
+
+
+class ConvergenceMixin:
+    """
+    Cierre de las corridas de los motores (SocialNetworkModel, VectorizedSocialNetworkModel,
+    MeanFieldSocialNetworkModel): requiere `convergence`, `converged_at`, `events` y
+    `datacollector` (DataCollector o Recorder).
+    """
+
+    def _check_convergence(self):
+        if self.convergence is not None and self.convergence.check(self):
+            self.running = False
+            self.converged_at = self.steps
+            self.events.emit("info", f"Convergencia ({self.convergence.name}) en el step {self.steps}", step=self.steps)
+
+    def _repeat_collect(self):
+        if isinstance(self.datacollector, Recorder):
+            self.datacollector.repeat_last(self)
+            return
+        for values in self.datacollector.model_vars.values():
+            values.append(values[-1])
+
+    def fast_forward(self, steps: int):
+        """Completa la salida del DataCollector hasta `steps` steps repitiendo la última fila (tras converger)."""
+        while self.steps < steps:
+            self.steps += 1
+            self._repeat_collect()
+
+
+CRITERIA = {"quiescence": Quiescence, "steady_state": SteadyState}
+
+
+def make_criterion(convergence):
+    """
+    Resuelve el parámetro `convergence` de los modelos: None, "quiescence",
+    "steady_state", un dict de parámetros de SteadyState o un objeto con check(model).
+    """
+    if convergence is None or hasattr(convergence, "check"):
+        return convergence
+    if isinstance(convergence, dict):
+        return SteadyState(**convergence)
+    if convergence not in CRITERIA:
+        raise ValueError(f"Criterio de convergencia desconocido: {convergence!r}")
+    return CRITERIA[convergence]()
@@ -0,0 +1,125 @@
+"""
+Tipo de usuario como estado, índice de usuarios por tipo y registro de conversiones.
+
+El tipo actual de un usuario (SKEPTIC o SUSCEPTIBLE) es el atributo `kind` del
+agente: convertTo lo cambia en lugar de reasignar __class__, así que la clase del
+agente (y su entrada en model.agents_by_type de Mesa) es la de su creación. Para
+las consultas por tipo, KindIndex guarda el tipo de cada usuario por nodo del índice
+de adyacencia y, por tipo, el conjunto de sus nodos en un arreglo denso con la
+posición de cada nodo: alta, baja, cambio de tipo y pertenencia en O(1).
+
+ConversionLog registra cada conversión (step, nodo, tipo nuevo, percepción hacia el
+partido contrario y credibilidad nueva) en columnas tipadas preasignadas, en lugar de
+un dict por conversión. model.step lo vacía cuando detecta conversiones (como antes
+vaciaba model.converted_agents) y las columnas se reutilizan; solo crecen, al doble,
+si en un step hay más conversiones que su capacidad.
+"""
+from array import array
+
+import numpy as np
+
+SKEPTIC = 0
+SUSCEPTIBLE = 1
+KIND_NAMES = ("Skeptic", "Susceptible")
+
+# Columnas del registro de conversiones y su tipo (códigos de array)
+COLUMNS = {"step": "i", "node": "i", "kind": "b", "perception": "d", "credibility": "d"}
+
+
+class KindIndex:
+    """Tipo actual de cada usuario (por nodo) y nodos de cada tipo, con cambios en O(1)."""
+
+    def __init__(self, kinds):
+        self.kind = array("b", kinds)
+        self.position = array("i", bytes(4 * len(self.kind)))  # posición del nodo en members[kind]
+        self.members = [array("i") for _ in KIND_NAMES]
+        for node, kind in enumerate(self.kind):
+            self.position[node] = len(self.members[kind])
+            self.members[kind].append(node)
+
+    def move(self, node: int, kind: int):
+        """Pasa el nodo a `kind`: sale de su conjunto (el último ocupa su lugar) y entra al final del otro."""
+        old = self.kind[node]
+        if old == kind:
+            return
+        members = self.members[old]
+        position = self.position[node]
+        last = members.pop()
+        if last != node:
+            members[position] = last
+            self.position[last] = position
+        self.position[node] = len(self.members[kind])
+        self.members[kind].append(node)
+        self.kind[node] = kind
+
+    def count(self, kind: int) -> int:
+        return len(self.members[kind])
+
+    def contains(self, kind: int, node: int) -> bool:
+        return self.kind[node] == kind
+
+    def nodes(self, kind: int) -> np.ndarray:
+        """Nodos del tipo dado (copia, en orden arbitrario)."""
+        return np.array(self.members[kind], dtype=np.int64)
+
+    def kinds(self) -> np.ndarray:
+        """Tipo de cada usuario, en orden de nodo (copia)."""
+        return np.array(self.kind, dtype=np.int8)
+
+
+class ConversionLog:
+    """Conversiones desde el último clear(), en columnas tipadas preasignadas."""
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = max(capacity, 1)
+        self.columns = {name: array(code, bytes(array(code).itemsize * self.capacity)) for name, code in COLUMNS.items()}
+        self.size = 0
+
+    def clear(self):
+        self.size = 0
+
+    def append(self, step: int, node: int, kind: int, perception: float, credibility: float):
+        if self.size == self.capacity:
+            self._grow(2 * self.capacity)
+        i = self.size
+        columns = self.columns
+        columns["step"][i] = step
+        columns["node"][i] = node
+        columns["kind"][i] = kind
+        columns["perception"][i] = perception
+        columns["credibility"][i] = credibility
+        self.size += 1
+
+    def view(self, start: int = 0) -> dict:
+        """Columnas de las conversiones desde `start` (copias)."""
+        return {name: np.array(column[start : self.size]) for name, column in self.columns.items()}
+
+    def records(self, agents, start: int = 0) -> list:
+        """
+        Conversiones desde `start` como lista de dicts con las claves del antiguo
+        model.converted_agents. `agents` es la lista de agentes por nodo.
+        """
+        columns = self.view(start)
+        result = []
+        for node, kind, perception, credibility in zip(columns["node"].tolist(), columns["kind"].tolist(), columns["perception"].tolist(), columns["credibility"].tolist()):
+            agent = agents[node]
+            result.append(
+                {
+                    "id": agent.id,
+                    "old_type": KIND_NAMES[1 - kind],
+                    "new_type": KIND_NAMES[kind],
+                    "partido": agent.partido,
+                    "position": agent.cell.coordinate if agent.cell is not None else "desconocida",
+                    "perception": perception,
+                    "new_credibility": credibility,
+                }
+            )
+        return result
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self, capacity: int):
+        for column in self.columns.values():
+            column.frombytes(bytes(column.itemsize * (capacity - self.capacity)))
+        self.capacity = capacity
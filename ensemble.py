@@ -0,0 +1,197 @@
+"""
+Ensamble Monte Carlo: K réplicas independientes del motor vectorizado en un solo lote.
+
+Las réplicas se apilan en los mismos arreglos de VectorizedSocialNetworkModel: los
+usuarios de la réplica k ocupan las filas k*U .. (k+1)*U-1, su adyacencia es un
+bloque de la adyacencia CSR (las réplicas no se conectan entre sí) y sus noticias
+tienen ids k*N .. (k+1)*N-1, aunque comparten las N columnas de las matrices de
+exposición. Cada réplica tiene su propio generador aleatorio: sus sorteos se hacen
+en el mismo orden que en una corrida individual, así que la réplica creada con la
+semilla s reproduce VectorizedSocialNetworkModel(seed=s).
+
+Después de cada step se guardan las métricas del DataCollector por réplica;
+summary() devuelve por step la media, la varianza y cuantiles de cada métrica.
+Con `convergence` el criterio se evalúa sobre el ensamble completo: quiescencia de
+todas las réplicas a la vez, o estabilidad de las medias.
+"""
+import numpy as np
+import pandas as pd
+from mesa import Model
+from mesa.datacollection import DataCollector
+
+from vectorized import PERCEPTION_A, SKEPTIC, SUSCEPTIBLE, VectorizedSocialNetworkModel, draw_population
+
+# Métricas del DataCollector que se registran por réplica
+METRICS = (
+    "AvgPerception_Skeptic",
+    "AvgPerception_Susceptible",
+    "TrueNewsShared",
+    "FalseNewsShared",
+    "NumSkeptics",
+    "NumSusceptibles",
+    "ConversionsToSkeptic",
+    "ConversionsToSusceptible",
+    "CascadeDepth",
+    "CascadeSize",
+)
+
+
+def stack_csr(blocks, column_offsets):
+    """Une adyacencias CSR (indptr, indices) en una diagonal por bloques, desplazando sus columnas."""
+    indptr = [np.zeros(1, dtype=np.int64)]
+    indices = []
+    edges = 0
+    for (block_indptr, block_indices), offset in zip(blocks, column_offsets):
+        indptr.append(block_indptr[1:] + edges)
+        indices.append(block_indices + offset)
+        edges += len(block_indices)
+    return np.concatenate(indptr), np.concatenate(indices)
+
+
+class VectorizedEnsemble(VectorizedSocialNetworkModel):
+    """
+    K réplicas de VectorizedSocialNetworkModel con los mismos parámetros. Con `seeds`
+    cada réplica usa esa semilla; si no, las semillas salen de SeedSequence(seed).spawn.
+    El DataCollector del ensamble reporta la media entre réplicas de cada métrica.
+    """
+
+    def __init__(
+        self,
+        replicates=10,
+        width=20,
+        height=20,
+        n_susceptible=70,
+        n_skeptic=70,
+        n_bots=5,
+        n_newsreel=5,
+        seed=None,
+        seeds=None,
+        simulator=None,
+        max_hops=None,
+        log_level="info",
+        topology=None,
+        degree=8,
+        rewire=0.1,
+        record_deliveries=False,
+        convergence=None,
+    ):
+        Model.__init__(self, seed=seed)
+        self._setup(simulator, width, height, max_hops, log_level, record_deliveries, convergence)
+
+        if seeds is None:
+            seeds = np.random.SeedSequence(seed).spawn(replicates)
+        self.generators = [np.random.default_rng(replicate_seed) for replicate_seed in seeds]
+        self.replicates = len(self.generators)
+
+        populations = [draw_population(rng, width, height, n_susceptible, n_skeptic, n_bots, n_newsreel, topology, degree, rewire) for rng in self.generators]
+        self.users_per_replicate = n_users = n_skeptic + n_susceptible
+        self.news_per_replicate = n_news = n_bots + n_newsreel
+        user_offsets = [k * n_users for k in range(self.replicates)]
+        stacked = {name: np.concatenate([population[name] for population in populations]) for name in ("kind", "party", "credibility", "news_veracity", "news_party", "news_polarity", "news_credibility")}
+        stacked["indptr"], stacked["indices"] = stack_csr([(p["indptr"], p["indices"]) for p in populations], user_offsets)
+        stacked["source_indptr"], stacked["source_indices"] = stack_csr([(p["source_indptr"], p["source_indices"]) for p in populations], user_offsets)
+        stacked["news_columns"] = n_news
+        self._load(stacked)
+        self.replicate = np.repeat(np.arange(self.replicates), n_users)
+
+        # Contadores y métricas de cascada por réplica
+        zeros = np.zeros(self.replicates, dtype=np.int64)
+        self.true_news_shared, self.false_news_shared = zeros.copy(), zeros.copy()
+        self.conversions_to_skeptic, self.conversions_to_susceptible = zeros.copy(), zeros.copy()
+        self.previous_conversions = zeros.copy()
+        self.cascade_depth, self.cascade_size = zeros.copy(), zeros.copy()
+
+        self.replicate_vars = {name: [] for name in METRICS}
+        self._setup_collector()
+
+        self.events.emit("info", f"\n{'='*60}")
+        self.events.emit("info", f"INICIALIZACIÓN DEL ENSAMBLE ({self.replicates} réplicas, motor vectorizado)")
+        self.events.emit("info", f"{'='*60}")
+        self.events.emit("info", populations[0]["layout"])
+        self.events.emit("info", f"Skeptics: {n_skeptic}")
+        self.events.emit("info", f"Susceptibles: {n_susceptible}")
+        self.events.emit("info", f"BOTs: {n_bots}")
+        self.events.emit("info", f"NewsReels: {n_newsreel}")
+
+        self._seed_sources()
+
+        # Colecta inicial
+        self.collect()
+
+    def _setup_collector(self):
+        # La última fila de replicate_vars es la del step actual
+        self.datacollector = DataCollector(model_reporters={name: (lambda m, name=name: float(np.mean(m.replicate_vars[name][-1]))) for name in METRICS})
+
+    def collect(self):
+        for name, values in self.replicate_metrics().items():
+            self.replicate_vars[name].append(values)
+        self.datacollector.collect(self)
+
+    def _repeat_collect(self):
+        for values in self.replicate_vars.values():
+            values.append(values[-1])
+        super()._repeat_collect()
+
+    def replicate_metrics(self) -> dict:
+        """Valor actual de cada métrica del DataCollector en cada réplica."""
+        return {
+            "AvgPerception_Skeptic": self.avg_perception(SKEPTIC, PERCEPTION_A),
+            "AvgPerception_Susceptible": self.avg_perception(SUSCEPTIBLE, PERCEPTION_A),
+            "TrueNewsShared": self.true_news_shared.copy(),
+            "FalseNewsShared": self.false_news_shared.copy(),
+            "NumSkeptics": np.bincount(self.replicate[self.kind == SKEPTIC], minlength=self.replicates),
+            "NumSusceptibles": np.bincount(self.replicate[self.kind == SUSCEPTIBLE], minlength=self.replicates),
+            "ConversionsToSkeptic": self.conversions_to_skeptic.copy(),
+            "ConversionsToSusceptible": self.conversions_to_susceptible.copy(),
+            "CascadeDepth": np.asarray(self.cascade_depth).copy(),
+            "CascadeSize": np.asarray(self.cascade_size).copy(),
+        }
+
+    def avg_perception(self, kind, column):
+        """Promedio de percepción de los usuarios del tipo dado, por réplica (0.0 si no hay ninguno)."""
+        mask = self.kind == kind
+        counts = np.bincount(self.replicate[mask], minlength=self.replicates)
+        sums = np.bincount(self.replicate[mask], weights=self.perception[mask, column], minlength=self.replicates)
+        return np.where(counts > 0, sums / np.maximum(counts, 1), 0.0)
+
+    def replicate_frame(self, metric: str) -> pd.DataFrame:
+        """Métrica por step (filas) y réplica (columnas)."""
+        frame = pd.DataFrame(np.vstack(self.replicate_vars[metric]))
+        frame.index.name = "Step"
+        return frame
+
+    def summary(self, quantiles=(0.05, 0.5, 0.95)) -> pd.DataFrame:
+        """Media, varianza y cuantiles entre réplicas de cada métrica, por step (columnas métrica x estadístico)."""
+        columns = {}
+        for metric in METRICS:
+            values = np.vstack(self.replicate_vars[metric]).astype(float)
+            columns[(metric, "mean")] = values.mean(axis=1)
+            columns[(metric, "var")] = values.var(axis=1, ddof=1) if self.replicates > 1 else np.zeros(len(values))
+            for q in quantiles:
+                columns[(metric, f"q{q:g}")] = np.quantile(values, q, axis=1)
+        frame = pd.DataFrame(columns)
+        frame.index.name = "Step"
+        return frame
+
+    # Réplicas apiladas: filas de usuario k*U.., ids de noticia k*N.. sobre N columnas compartidas
+
+    def _column(self, news):
+        return news % self.news_per_replicate
+
+    def _news_ids(self, users, columns):
+        return columns + (users // self.users_per_replicate) * self.news_per_replicate
+
+    def _tally(self, users):
+        return np.bincount(users // self.users_per_replicate, minlength=self.replicates)
+
+    def _random(self, users, news):
+        """Sorteos de cada réplica con su propio generador, en el orden en que aparecen sus usuarios."""
+        replicate = users // self.users_per_replicate
+        counts = np.bincount(replicate, minlength=self.replicates)
+        draws = [rng.random(count) for rng, count in zip(self.generators, counts.tolist()) if count]
+        draws = np.concatenate(draws) if draws else np.empty(0)
+        if len(replicate) > 1 and np.any(replicate[1:] < replicate[:-1]):
+            ordered = np.empty(len(draws))
+            ordered[np.argsort(replicate, kind="stable")] = draws
+            return ordered
+        return draws
@@ -0,0 +1,181 @@
+"""
+Inyección continua de noticias desde BOTs y NewsReels (parámetro `injection` del modelo).
+
+Por defecto cada fuente crea y envía una sola noticia en la inicialización. Con un
+NewsInjector las fuentes siguen emitiendo según un calendario por fuente:
+
+- "poisson": cada fuente emite Poisson(rate) noticias por step.
+- "fixed": cada fuente emite `rate` noticias por step en promedio, de forma
+  determinista (rate=0.25 es una cada 4 steps); la fase de cada fuente se sortea al
+  inicio para que no emitan todas en el mismo step.
+
+`rate` puede ser un escalar o una secuencia con un valor por fuente del grupo, y
+`start`/`stop` acotan los steps en que el calendario está activo. Las emisiones se
+procesan en lote una vez por tick, dentro de SocialNetworkModel.step (después de las
+decisiones de los usuarios y antes de la colecta, así la cascada inyectada cuenta en
+el mismo step y los usuarios deciden compartirla desde el siguiente, como con las
+noticias iniciales): los conteos de todas las fuentes y los atributos de todas las
+noticias se sortean con model.rng en llamadas vectorizadas, y los envíos de todas las
+fuentes entran juntos a la frontera de la cascada. Las filas de la tabla de
+noticias se escriben en bloque (NewsTable.add_batch) y los objetos News salen de un
+conjunto de registros preasignados (NewsTable.spare), al que el vencimiento
+(retention.py) devuelve los de las noticias vencidas junto con sus ids. Al inicio se
+reservan filas, bitsets de exposición y registros para las noticias vivas esperadas:
+con news_ttl, las de ttl steps; sin news_ttl (las noticias no se liberan), filas y
+registros para los primeros RESERVE_STEPS steps del calendario, y los bitsets crecen
+a demanda. Si los registros se agotan, se preasigna otro bloque del mismo tamaño.
+"""
+import numpy as np
+
+from agents import BOT, News, NewsReel
+
+SCHEDULE_KINDS = ("poisson", "fixed")
+
+# Steps de emisión para los que se preasignan registros sin news_ttl
+RESERVE_STEPS = 100
+
+
+class Schedule:
+    """Calendario de emisión de un grupo de fuentes."""
+
+    def __init__(self, kind: str = "poisson", rate=1.0, start: int = 1, stop: int = None):
+        if kind not in SCHEDULE_KINDS:
+            raise ValueError(f"Calendario desconocido: {kind!r} (opciones: {', '.join(SCHEDULE_KINDS)})")
+        self.kind = kind
+        self.rate = rate
+        self.start = start
+        self.stop = stop  # último step con emisiones (None: sin fin)
+
+
+class NewsInjector:
+    """
+    Emisión por tick de las fuentes según sus calendarios (Schedule, dict de sus
+    argumentos o None para que el grupo no emita). `reserve` fija cuántas noticias
+    reservar en la tabla; por defecto se estima con news_ttl.
+    """
+
+    def __init__(self, bots=None, newsreels=None, reserve: int = None):
+        self.schedules = {BOT: _make_schedule(bots), NewsReel: _make_schedule(newsreels)}
+        self.reserve = reserve
+        self.chunk = 1  # registros News que se preasignan cada vez que se agotan
+        self.emitted = 0
+        # Por fuente (se completan en attach): nodo en el índice de adyacencia, veracidad y calendario
+        self.nodes = None
+        self.veracity = None
+        self.rate = None
+        self.poisson = None
+        self.start = None
+        self.stop = None
+        self.phase = None  # acumulador de los calendarios "fixed"
+
+    def attach(self, model):
+        """Arma los arreglos por fuente y reserva espacio para las noticias vivas esperadas."""
+        nodes, veracity, rate, poisson, start, stop = [], [], [], [], [], []
+        for cls, schedule in self.schedules.items():
+            if schedule is None:
+                continue
+            sources = [agent.node for agent in model.agents_by_type[cls]]
+            rates = np.broadcast_to(np.asarray(schedule.rate, dtype=np.float64), (len(sources),))
+            nodes += sources
+            veracity += [cls is NewsReel] * len(sources)
+            rate += rates.tolist()
+            poisson += [schedule.kind == "poisson"] * len(sources)
+            start += [schedule.start] * len(sources)
+            stop += [schedule.stop if schedule.stop is not None else np.iinfo(np.int64).max] * len(sources)
+        self.nodes = np.array(nodes, dtype=np.int64)
+        self.veracity = np.array(veracity, dtype=bool)
+        self.rate = np.array(rate, dtype=np.float64)
+        self.poisson = np.array(poisson, dtype=bool)
+        self.start = np.array(start, dtype=np.int64)
+        self.stop = np.array(stop, dtype=np.int64)
+        self.phase = model.rng.random(len(nodes))
+
+        table = model.news_table
+        reserve = self.reserve
+        retention = model.retention
+        expiring = retention is not None and retention.ttl is not None
+        if reserve is None and expiring:
+            reserve = table.live + int(np.ceil(self.rate.sum() * (retention.ttl + retention.compact_every)))
+        elif reserve is None:
+            # Sin vencimiento: emisiones esperadas en los primeros RESERVE_STEPS steps activos de cada fuente
+            steps = np.clip(np.minimum(self.stop, model.steps + RESERVE_STEPS) - np.maximum(self.start, model.steps + 1) + 1, 0, None)
+            reserve = table.live + int(np.ceil((self.rate * steps).sum()))
+        if reserve:
+            table.reserve(reserve)
+            # Los bitsets solo se ensanchan por adelantado si las noticias vencen: cada columna
+            # de más alarga las filas que recorre el barrido
+            if expiring or self.reserve is not None:
+                model.exposure.reserve_news(reserve)
+        self.chunk = max(reserve - table.live, 1)
+        table.spare.extend(_blank_news(self.chunk))
+
+    def counts(self, step: int, rng: np.random.Generator) -> np.ndarray:
+        """Noticias que emite cada fuente en el step."""
+        active = (self.start <= step) & (step <= self.stop)
+        counts = np.zeros(len(self.nodes), dtype=np.int64)
+        poisson = active & self.poisson
+        if poisson.any():
+            counts[poisson] = rng.poisson(self.rate[poisson])
+        fixed = active & ~self.poisson
+        if fixed.any():
+            self.phase[fixed] += self.rate[fixed]
+            emitted = np.floor(self.phase[fixed])
+            self.phase[fixed] -= emitted
+            counts[fixed] = emitted.astype(np.int64)
+        return counts
+
+    def inject(self, model) -> int:
+        """Crea las noticias del tick y las envía desde sus fuentes en una sola cascada. Retorna cuántas."""
+        rng = model.rng
+        sources = np.repeat(np.arange(len(self.nodes)), self.counts(model.steps, rng))
+        n = len(sources)
+        if not n:
+            return 0
+
+        # Atributos en lote, con los mismos rangos que News (credibilidad alta si es verdadera)
+        veracity = self.veracity[sources]
+        party = np.where(rng.random(n) < 0.5, 1, -1)  # A=+1, B=-1 como en la tabla
+        polarity = np.where(rng.random(n) < 0.5, -1, 1)
+        credibility = np.where(veracity, 0.7, 0.1) + 0.2 * rng.random(n)
+
+        # Registros News preasignados (otro bloque si se agotaron) y filas de la tabla en bloque
+        table = model.news_table
+        spare = table.spare
+        if len(spare) < n:
+            spare.extend(_blank_news(max(n - len(spare), self.chunk)))
+        items = spare[-n:]
+        del spare[-n:]
+        for news, p, pol, ver, cred in zip(items, party.tolist(), polarity.tolist(), veracity.tolist(), credibility.tolist()):
+            news.party, news.polarity, news.veracity, news.credibility = "A" if p > 0 else "B", pol, ver, cred
+        table.add_batch(items, party, polarity, veracity, credibility, born=model.steps)
+
+        agents = model.adjacency.agents
+        model.cascade.send_batch([(agents[node], news) for node, news in zip(self.nodes[sources].tolist(), items)])
+        self.emitted += n
+        return n
+
+    def pending(self, step: int) -> int:
+        """Fuentes que todavía emitirán después de `step` (el modelo no está quieto mientras queden)."""
+        return int(((self.stop > step) & (self.rate > 0)).sum())
+
+
+def _blank_news(n: int) -> list:
+    """Registros News sin atributos (los completa inject, sin sorteos)."""
+    return [News.__new__(News) for _ in range(n)]
+
+
+def _make_schedule(spec):
+    if spec is None or isinstance(spec, Schedule):
+        return spec
+    if not isinstance(spec, dict):
+        raise ValueError(f"Calendario inválido: {spec!r} (se espera None, Schedule o dict de sus argumentos)")
+    return Schedule(**spec)
+
+
+def make_injector(injection):
+    """NewsInjector según el parámetro `injection` del modelo (None, NewsInjector o dict de sus argumentos)."""
+    if injection is None or isinstance(injection, NewsInjector):
+        return injection
+    if not isinstance(injection, dict):
+        raise ValueError(f"Parámetro injection inválido: {injection!r} (se espera None, NewsInjector o dict con bots, newsreels y reserve)")
+    return NewsInjector(**injection)
@@ -0,0 +1,91 @@
+"""
+Instrumentación opcional del camino caliente y sumidero de eventos por nivel.
+
+Instrumentation acumula por step el tiempo de pared de shareDecision, de la
+cascada (receiveNews/sendNews), de convertTo y de datacollector.collect, además de
+los conteos de entregas, exposiciones duplicadas rechazadas y conversiones, y la
+profundidad máxima de cascada. Cuando el modelo no tiene instrumentación
+(model.instrumentation es None) el costo es una comparación con None por llamada.
+
+Los tiempos son inclusivos: el de la cascada contiene los de shareDecision y
+convertTo que ocurren dentro de ella.
+
+EventSink reemplaza los print del modelo: solo formatea y escribe los eventos cuyo
+nivel está habilitado.
+"""
+import json
+import sys
+import time
+
+LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40, "quiet": 100}
+
+PHASES = ("shareDecision", "cascade", "convertTo", "collect")
+COUNTERS = ("deliveries", "duplicates_rejected", "conversions")
+
+
+class EventSink:
+    """Sumidero de eventos con nivel mínimo. Con `keep=True` además guarda los eventos emitidos."""
+
+    def __init__(self, level: str = "info", stream=None, keep: bool = False):
+        self.level = LEVELS[level]
+        self.stream = stream
+        self.events = [] if keep else None
+
+    def enabled(self, level: str) -> bool:
+        return LEVELS[level] >= self.level
+
+    def emit(self, level: str, message: str, **fields):
+        if LEVELS[level] < self.level:
+            return
+        if self.events is not None:
+            self.events.append({"level": level, "message": message, **fields})
+        print(message, file=self.stream if self.stream is not None else sys.stdout)
+
+
+class Instrumentation:
+    """Tiempos y conteos por step del modelo, exportables como reporters y como traza."""
+
+    def __init__(self):
+        self.step = 0
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.max_depth = 0
+        self.records = []  # un registro por step terminado
+        self.clock = time.perf_counter
+
+    def begin_step(self, step: int):
+        self.step = step
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.max_depth = 0
+
+    def add_time(self, phase: str, seconds: float):
+        self.times[phase] += seconds
+
+    def count(self, counter: str, n: int = 1):
+        self.counts[counter] += n
+
+    def end_step(self):
+        """Cierra el step actual y guarda su registro en la traza."""
+        self.records.append({"step": self.step, **{f"time_{phase}": value for phase, value in self.times.items()}, **self.counts, "max_cascade_depth": self.max_depth})
+
+    def reporters(self) -> dict:
+        """
+        Reporters adicionales para el DataCollector. El tiempo de collect del step se
+        conoce recién después de la colecta, así que solo aparece en la traza.
+        """
+        return {
+            "Time_shareDecision": lambda m: m.instrumentation.times["shareDecision"],
+            "Time_cascade": lambda m: m.instrumentation.times["cascade"],
+            "Time_convertTo": lambda m: m.instrumentation.times["convertTo"],
+            "Deliveries": lambda m: m.instrumentation.counts["deliveries"],
+            "DuplicatesRejected": lambda m: m.instrumentation.counts["duplicates_rejected"],
+            "Conversions": lambda m: m.instrumentation.counts["conversions"],
+            "MaxCascadeDepth": lambda m: m.instrumentation.max_depth,
+        }
+
+    def export_trace(self, path: str):
+        """Escribe la traza como JSON lines (un objeto por step)."""
+        with open(path, "w") as f:
+            for record in self.records:
+                f.write(json.dumps(record) + "\n")
@@ -0,0 +1,223 @@
+"""
+Índice incremental de cascadas por noticia (SocialNetworkModel con cascade_index=True).
+
+Cada primera entrega de una noticia a un usuario (User/BOT/NewsReel.deliverNews)
+agrega un nodo al árbol de esa noticia con un puntero al nodo de quien la envió y su
+profundidad, en columnas planas (array) que crecen por anexado. El padre de una
+entrega es el nodo con que el emisor recibió la noticia, o -1 si el emisor es su
+fuente (BOT o NewsReel, o un usuario que la tenía desde su construcción). Cada
+entrega actualiza en O(1) los contadores de su noticia: tamaño, profundidad máxima,
+raíces, alcance por tipo del receptor al recibirla (antes de una posible conversión)
+y el step con más entregas (pico). Así tamaño, profundidad, factor de ramificación,
+alcance por tipo y tiempo al pico de cada noticia son lecturas directas, sin
+reconstruirlos desde el registro de propagaciones, que solo guarda una ventana.
+
+Los ids de noticias vencidas (retention.py) se reutilizan: release() reinicia los
+contadores de esas noticias y sus nodos dejan de estar indexados. Si un usuario
+olvida una noticia por el tope de memoria y le vuelve a llegar, la nueva entrega es
+otro nodo del árbol pero no cuenta de nuevo en el alcance.
+"""
+from array import array
+
+import numpy as np
+import pandas as pd
+
+# Columnas de cada noticia (contadores y steps)
+NEWS_FIELDS = ("size", "depth", "roots", "skeptic", "susceptible", "first_step", "peak", "peak_step", "current", "current_step")
+
+
+class CascadeIndex:
+    """Árboles de propagación de todas las noticias: un nodo por entrega, con padre y profundidad."""
+
+    def __init__(self):
+        # Nodos (una fila por entrega)
+        self.receiver = array("i")  # nodo del índice de adyacencia del receptor
+        self.news_id = array("i")
+        self.parent = array("i")  # fila del nodo padre, -1 si viene de la fuente
+        self.depth = array("i")  # saltos desde la fuente (1 = entrega directa)
+        self.step = array("i")
+        self.susceptible = array("b")  # el receptor era Susceptible al recibirla
+        self.children = array("i")
+
+        # Contadores por id de noticia
+        self.news = {name: array("q") for name in NEWS_FIELDS}
+        self.false = array("b")  # la noticia es falsa
+        self.start = array("q")  # primera fila posible de la noticia (las anteriores son de un id ya liberado)
+        self.nodes = []  # id de noticia -> {receptor: fila de su última entrega}
+
+        # Usuarios alcanzados por al menos una noticia falsa
+        self.false_seen = {}  # receptor -> noticias falsas recibidas
+        self.false_reached = 0
+
+    def add(self, news_id: int, veracity: bool, receiver: int, parent: int, step: int, susceptible: bool) -> int:
+        """Registra la entrega de la noticia a `receiver` desde el nodo `parent` (-1: la fuente). Retorna su fila."""
+        if news_id >= len(self.nodes):
+            self._grow(news_id + 1)
+        news = self.news
+        row = len(self.receiver)
+        depth = self.depth[parent] + 1 if parent >= 0 else 1
+        self.receiver.append(receiver)
+        self.news_id.append(news_id)
+        self.parent.append(parent)
+        self.depth.append(depth)
+        self.step.append(step)
+        self.susceptible.append(susceptible)
+        self.children.append(0)
+
+        size = news["size"][news_id]
+        if not size:
+            news["first_step"][news_id] = step
+            self.false[news_id] = not veracity
+        news["size"][news_id] = size + 1
+        if depth > news["depth"][news_id]:
+            news["depth"][news_id] = depth
+        if parent >= 0:
+            self.children[parent] += 1
+        else:
+            news["roots"][news_id] += 1
+
+        # Alcance: usuarios distintos (un usuario que olvidó la noticia y la vuelve a recibir no cuenta de nuevo)
+        nodes = self.nodes[news_id]
+        if receiver not in nodes:
+            news["susceptible" if susceptible else "skeptic"][news_id] += 1
+            if not veracity:
+                seen = self.false_seen.get(receiver, 0)
+                if not seen:
+                    self.false_reached += 1
+                self.false_seen[receiver] = seen + 1
+        nodes[receiver] = row
+
+        # Pico: step con más entregas de la noticia
+        if news["current_step"][news_id] != step:
+            news["current_step"][news_id] = step
+            news["current"][news_id] = 0
+        current = news["current"][news_id] + 1
+        news["current"][news_id] = current
+        if current > news["peak"][news_id]:
+            news["peak"][news_id] = current
+            news["peak_step"][news_id] = step
+        return row
+
+    def node_of(self, news_id: int, receiver: int) -> int:
+        """Fila con que `receiver` recibió la noticia, o -1 (nunca la recibió o es su fuente)."""
+        if news_id >= len(self.nodes):
+            return -1
+        return self.nodes[news_id].get(receiver, -1)
+
+    def release(self, news_ids):
+        """Reinicia los contadores de noticias cuyos ids se liberan (sus nodos quedan fuera del índice)."""
+        for news_id in news_ids:
+            news_id = int(news_id)
+            if news_id >= len(self.nodes):
+                continue
+            if self.false[news_id]:
+                for receiver in self.nodes[news_id]:
+                    seen = self.false_seen[receiver] - 1
+                    if seen:
+                        self.false_seen[receiver] = seen
+                    else:
+                        del self.false_seen[receiver]
+                        self.false_reached -= 1
+            self.nodes[news_id] = {}
+            self.false[news_id] = 0
+            self.start[news_id] = len(self.receiver)
+            for column in self.news.values():
+                column[news_id] = 0
+
+    # Consultas por noticia
+
+    def size(self, news_id: int) -> int:
+        return self.news["size"][news_id] if news_id < len(self.nodes) else 0
+
+    def max_depth(self, news_id: int) -> int:
+        return self.news["depth"][news_id] if news_id < len(self.nodes) else 0
+
+    def branching(self, news_id: int) -> float:
+        """Factor de ramificación: entregas hechas por usuarios (no por la fuente) por nodo del árbol."""
+        size = self.size(news_id)
+        return (size - self.news["roots"][news_id]) / size if size else 0.0
+
+    def reach(self, news_id: int) -> dict:
+        """Usuarios distintos alcanzados, por tipo al recibirla."""
+        if news_id >= len(self.nodes):
+            return {"Skeptic": 0, "Susceptible": 0}
+        return {"Skeptic": self.news["skeptic"][news_id], "Susceptible": self.news["susceptible"][news_id]}
+
+    def time_to_peak(self, news_id: int) -> int:
+        """Steps desde la primera entrega hasta el step con más entregas."""
+        if not self.size(news_id):
+            return 0
+        return self.news["peak_step"][news_id] - self.news["first_step"][news_id]
+
+    def tree(self, news_id: int) -> pd.DataFrame:
+        """Nodos del árbol de la noticia (receptor, padre, profundidad, step, tipo), indexados por fila."""
+        if news_id < len(self.nodes) and self.nodes[news_id]:
+            start = self.start[news_id]
+            rows = start + np.flatnonzero(np.frombuffer(self.news_id, dtype=np.int32)[start:] == news_id)
+        else:
+            rows = np.zeros(0, dtype=np.int64)
+        return pd.DataFrame(
+            {
+                "receiver": np.frombuffer(self.receiver, dtype=np.int32)[rows],
+                "parent": np.frombuffer(self.parent, dtype=np.int32)[rows],
+                "depth": np.frombuffer(self.depth, dtype=np.int32)[rows],
+                "step": np.frombuffer(self.step, dtype=np.int32)[rows],
+                "susceptible": np.frombuffer(self.susceptible, dtype=np.int8)[rows].astype(bool),
+                "children": np.frombuffer(self.children, dtype=np.int32)[rows],
+            },
+            index=pd.Index(rows, name="row"),
+        )
+
+    def path(self, news_id: int, receiver: int) -> list:
+        """Receptores desde la primera entrega de la fuente hasta `receiver`, siguiendo los punteros al padre."""
+        row = self.node_of(news_id, receiver)
+        path = []
+        while row >= 0:
+            path.append(self.receiver[row])
+            row = self.parent[row]
+        return path[::-1]
+
+    # Consultas sobre todas las noticias
+
+    def sizes(self) -> np.ndarray:
+        """Tamaño de la cascada de cada noticia con al menos una entrega."""
+        sizes = np.array(self.news["size"], dtype=np.int64)
+        return sizes[sizes > 0]
+
+    def size_quantile(self, q: float) -> float:
+        """Percentil `q` (0-100) de los tamaños de las cascadas (0 si ninguna noticia tuvo entregas)."""
+        sizes = self.sizes()
+        return float(np.percentile(sizes, q)) if len(sizes) else 0.0
+
+    def false_reach(self, n_users: int) -> float:
+        """Fracción de los `n_users` usuarios alcanzada por al menos una noticia falsa."""
+        return self.false_reached / n_users if n_users else 0.0
+
+    def summary(self) -> pd.DataFrame:
+        """Métricas de cada noticia con al menos una entrega, indexadas por id de noticia."""
+        columns = {name: np.array(column, dtype=np.int64) for name, column in self.news.items()}
+        ids = np.flatnonzero(columns["size"] > 0)
+        size = columns["size"][ids]
+        return pd.DataFrame(
+            {
+                "size": size,
+                "depth": columns["depth"][ids],
+                "branching": (size - columns["roots"][ids]) / size,
+                "reach_skeptic": columns["skeptic"][ids],
+                "reach_susceptible": columns["susceptible"][ids],
+                "false": np.array(self.false, dtype=bool)[ids],
+                "time_to_peak": columns["peak_step"][ids] - columns["first_step"][ids],
+            },
+            index=pd.Index(ids, name="news_id"),
+        )
+
+    def __len__(self):
+        return len(self.receiver)
+
+    def _grow(self, n_news: int):
+        extra = n_news - len(self.nodes)
+        for column in self.news.values():
+            column.extend([0] * extra)
+        self.false.extend([0] * extra)
+        self.start.extend([0] * extra)
+        self.nodes.extend({} for _ in range(extra))
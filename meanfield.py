@@ -0,0 +1,471 @@
+"""
+Motor de campo medio: trayectorias aproximadas de los agregados del modelo.
+
+Pensado para barridos de sensibilidad sobre ALPHA, los umbrales de conversión y los
+pesos de compartir, donde basta una trayectoria aproximada y no el detalle por
+agente. No hay agentes ni adyacencia: la población se resume en cohortes
+(tipo, partido, credibilidad), con la credibilidad inicial de cada tipo discretizada
+en `resolution` puntos de su rango y las credibilidades a las que lleva una
+conversión. Por cohorte se guardan:
+
+- la masa de usuarios,
+- la distribución de la percepción hacia el partido contrario, sobre la misma grilla
+  de redondeo del modelo (pasos de 0.01 en [-1, 1]); la percepción hacia el propio
+  partido no cambia nunca (x_j = 0),
+- por noticia, la masa que la recibió y la que ya la compartió alguna vez.
+
+Las reglas son las de agents.py evaluadas sobre esas masas: computeShareProbability
+y shareDecision dan la fracción de cada cohorte que comparte; cada noticia que llega
+desplaza la percepción de la fracción de la cohorte que la recibe (updatePerception),
+de a una noticia por vez y para todas las cohortes a la vez (dentro de una cohorte,
+haber recibido una noticia se supone independiente de la percepción), y después de
+las llegadas del step la masa que cruzó un umbral pasa a la cohorte del otro tipo con
+su nueva credibilidad y con lo que recibió (checkConversion/convertTo). Esa
+independencia reparte la exposición entre todos: en la grilla, los vecinos de las
+fuentes reciben muchas noticias y se convierten más, así que las conversiones quedan
+por debajo de las de los motores exactos cuando las cascadas son chicas y llegan
+antes cuando casi todos reciben casi todo.
+
+La propagación sale de la percolación de sitios en la vecindad de Moore. En la
+grilla, una noticia llega al cluster de usuarios que la compartieron alrededor de su
+fuente y a los usuarios del borde de ese cluster; el alcance esperado, en función
+de la densidad de quienes la comparten, está medido en CLUSTERS (Monte Carlo en toros
+de 500x500: clusters finitos por debajo del umbral de percolación y el cluster
+infinito por encima). Esa densidad es la de los portadores (los usuarios que pueden
+compartirla: un Skeptic no porta noticias falsas) por la fracción de los portadores
+alcanzados que ya la compartió: al empezar, la probabilidad de compartir; con los
+steps, los que no la compartieron al recibirla la comparten en el barrido y el
+cluster crece hasta el de todos los portadores. Cada step resuelve ese alcance como
+punto fijo (los nuevos receptores comparten con su probabilidad) y los limita en
+grillas chicas por el número de usuarios. Los recorridos cerca del umbral
+(densidades de portadores entre 0.37 y 0.41) dependen mucho del tamaño de la grilla
+y el alcance es el menos preciso; lejos del umbral, TrueNewsShared y FalseNewsShared
+siguen a los motores exactos (ver tests/test_meanfield.py). Cuando la primera ola
+queda debajo del umbral y lo acumulado lo supera (las noticias falsas con densidad
+0.7, por ejemplo), el alcance crece más rápido que en la grilla, donde solo avanza
+desde el borde de lo ya alcanzado.
+
+El costo de un step depende del número de cohortes y de noticias, no del número de
+usuarios ni del tamaño de la grilla. CascadeDepth se estima con el radio del área
+que cubre la cascada media (con muchas fuentes, la más profunda llega más lejos), y
+max_hops acota cuánto crece ese radio por step.
+
+Se reportan las mismas columnas del DataCollector que SocialNetworkModel, como
+valores esperados (números reales). Las noticias iniciales se sortean igual que en
+el motor vectorizado. PHI no interviene en las reglas, así que no es parámetro.
+"""
+import numpy as np
+from mesa import Model
+from mesa.experimental.devs import ABMSimulator
+
+from agents import ALPHA, SHARE_WEIGHTS_SKEPTIC, SHARE_WEIGHTS_SUSCEPTIBLE, THRESHOLD_TO_SKEPTIC, THRESHOLD_TO_SUSCEPTIBLE
+from convergence import ConvergenceMixin, make_criterion
+from instrumentation import EventSink
+from recorder import make_collector
+from vectorized import SKEPTIC, SUSCEPTIBLE, draw_news
+
+# Grilla de percepción (2 decimales, como roundto en agents.py)
+BINS = np.round(np.linspace(-1.0, 1.0, 201), 2)
+
+# Percolación de sitios de Moore alrededor de una fuente, por densidad de sitios que comparten:
+# (densidad, sitios de los clusters finitos vecinos a la fuente, sitios sin compartir en su borde,
+# fracción de las celdas en el cluster infinito alcanzado, fracción de las celdas en su borde)
+CLUSTERS = np.array(
+    [
+        (0.00, 0.0, 8.0, 0.0, 0.0),
+        (0.02, 0.18, 8.54, 0.0, 0.0),
+        (0.05, 0.49, 9.41, 0.0, 0.0),
+        (0.10, 1.31, 11.6, 0.0, 0.0),
+        (0.15, 2.67, 14.9, 0.0, 0.0),
+        (0.20, 5.01, 20.2, 0.0, 0.0),
+        (0.25, 10.9, 32.5, 0.0, 0.0),
+        (0.28, 18.7, 47.9, 0.0, 0.0),
+        (0.30, 27.4, 63.9, 0.0, 0.0),
+        (0.32, 44.5, 94.3, 0.0, 0.0),
+        (0.34, 81.7, 159.0, 0.0, 0.0),
+        (0.36, 183.0, 326.0, 0.0, 0.0),
+        (0.37, 316.0, 538.0, 0.0, 0.0),
+        (0.38, 597.0, 981.0, 0.0, 0.0),
+        (0.39, 2930.0, 4570.0, 0.0, 0.0),
+        (0.40, 7850.0, 11800.0, 0.0, 0.0),
+        (0.41, 311.0, 467.0, 0.149, 0.215),
+        (0.42, 33.2, 56.1, 0.243, 0.336),
+        (0.43, 7.24, 16.9, 0.305, 0.404),
+        (0.45, 1.64, 7.59, 0.386, 0.470),
+        (0.47, 0.57, 5.54, 0.433, 0.488),
+        (0.50, 0.33, 4.74, 0.479, 0.479),
+        (0.55, 0.07, 3.82, 0.541, 0.443),
+        (0.60, 0.02, 3.25, 0.597, 0.397),
+        (0.70, 0.0, 2.38, 0.700, 0.300),
+        (0.80, 0.0, 1.57, 0.800, 0.200),
+        (0.90, 0.0, 0.81, 0.900, 0.100),
+        (1.00, 0.0, 0.0, 1.0, 0.0),
+    ]
+)
+
+# Masa (en usuarios) por debajo de la cual no se sigue una noticia en la cascada
+EPSILON = 1e-6
+# Iteraciones máximas y tolerancia (en usuarios) del punto fijo del alcance de cada step
+SOLVER_ITERATIONS = 50
+SOLVER_TOLERANCE = 1e-3
+# Puntos de la tabla de cluster_reach de cada modelo, uniformes en la densidad de los que comparten
+REACH_POINTS = 2001
+
+# Saltos por unidad de radio de Moore de los caminos de una cascada dentro de los clusters (calibrado con
+# CascadeDepth del motor vectorizado en la grilla por defecto y en 50x50 con densidad 0.7)
+TORTUOSITY = 2.8
+
+# Rango de la credibilidad inicial y credibilidad tras convertirse (factor y rango de convertTo), por tipo
+CREDIBILITY = {SKEPTIC: (0.1, 0.3), SUSCEPTIBLE: (0.6, 0.9)}
+CONVERSION = {SKEPTIC: (0.5, 0.1, 0.3), SUSCEPTIBLE: (2.0, 0.6, 0.9)}
+
+
+def cluster_reach(density, user_density, n_users, n_cells):
+    """
+    Usuarios que alcanza una noticia desde su fuente si la comparte una fracción
+    `density` de las celdas y hay usuarios en `user_density` de ellas (arreglos por
+    noticia). Los clusters finitos se acotan por los usuarios que quedan fuera del
+    cluster infinito.
+    """
+    density = np.clip(density, 0.0, 1.0)
+    # Probabilidad de que una celda del borde (sin nadie que la comparta) tenga un usuario
+    border = np.clip((user_density - density) / np.maximum(1.0 - density, EPSILON), 0.0, 1.0)
+    rho = CLUSTERS[:, 0]
+    finite = np.expm1(np.interp(density, rho, np.log1p(CLUSTERS[:, 1]))) + border * np.expm1(np.interp(density, rho, np.log1p(CLUSTERS[:, 2])))
+    giant = np.minimum((np.interp(density, rho, CLUSTERS[:, 3]) + border * np.interp(density, rho, CLUSTERS[:, 4])) * n_cells, n_users)
+    rest = n_users - giant
+    return giant + finite * rest / np.maximum(finite + rest, EPSILON)
+
+
+class MeanFieldSocialNetworkModel(ConvergenceMixin, Model):
+    def __init__(
+        self,
+        width=20,
+        height=20,
+        n_susceptible=70,
+        n_skeptic=70,
+        n_bots=5,
+        n_newsreel=5,
+        seed=None,
+        simulator: ABMSimulator = None,
+        max_hops=None,
+        log_level="info",
+        convergence=None,
+        recorder=None,
+        alpha=ALPHA,
+        threshold_to_skeptic=THRESHOLD_TO_SKEPTIC,
+        threshold_to_susceptible=THRESHOLD_TO_SUSCEPTIBLE,
+        share_weights_susceptible=SHARE_WEIGHTS_SUSCEPTIBLE,
+        share_weights_skeptic=SHARE_WEIGHTS_SKEPTIC,
+        resolution=8,
+    ):
+        super().__init__(seed=seed)
+        # Si no se proporciona simulador, crear uno nuevo
+        if simulator is None:
+            simulator = ABMSimulator()
+        self.simulator = simulator
+        self.simulator.setup(self)
+
+        self.height = height
+        self.width = width
+        self.running = True
+        self.true_news_shared = 0.0
+        self.false_news_shared = 0.0
+        self.conversions_to_skeptic = 0.0
+        self.conversions_to_susceptible = 0.0
+        self.previous_conversions = 0.0
+        self.events = EventSink(log_level)
+        self.convergence = make_criterion(convergence)
+        self.converged_at = None
+        self._recorder_options = recorder
+        self.max_hops = max_hops
+        self.cascade_depth = 0
+        self.cascade_size = 0.0
+
+        # Parámetros de las reglas (por defecto, las constantes de agents.py)
+        self.alpha = alpha
+        self.threshold_to_skeptic = threshold_to_skeptic
+        self.threshold_to_susceptible = threshold_to_susceptible
+        self.share_weights = {SUSCEPTIBLE: tuple(share_weights_susceptible), SKEPTIC: tuple(share_weights_skeptic)}
+
+        n_users = n_skeptic + n_susceptible
+        n_cells = width * height
+        if n_users + n_bots + n_newsreel > n_cells:
+            raise ValueError(f"No hay suficientes celdas ({n_cells}) para {n_users + n_bots + n_newsreel} agentes")
+        self.n_users = n_users
+        self.n_cells = n_cells
+        # Alcance por densidad de los que comparten, tabulado para esta grilla y esta población
+        self._reach = cluster_reach(np.linspace(0.0, 1.0, REACH_POINTS), n_users / n_cells, n_users, n_cells)
+        self._rise = np.diff(self._reach)
+
+        news = draw_news(self.rng, n_bots, n_newsreel)
+        self.news_veracity = news["news_veracity"]
+        self.news_party = news["news_party"]
+        self.news_polarity = news["news_polarity"]
+        self.news_credibility = news["news_credibility"]
+
+        self._build_cohorts({SKEPTIC: n_skeptic, SUSCEPTIBLE: n_susceptible}, resolution)
+        # Masa de cada cohorte que recibió cada noticia y la que ya la compartió alguna vez: (cohorte, noticia)
+        self.received = np.zeros((len(self.mass), len(self.news_veracity)))
+        self.transmitted = np.zeros_like(self.received)
+        self._setup_collector()
+
+        self.events.emit("info", f"\n{'='*60}")
+        self.events.emit("info", "INICIALIZACIÓN DEL MODELO (campo medio)")
+        self.events.emit("info", f"{'='*60}")
+        self.events.emit("info", f"Grid: {width}x{height} ({len(self.mass)} cohortes)")
+        self.events.emit("info", f"Skeptics: {n_skeptic}")
+        self.events.emit("info", f"Susceptibles: {n_susceptible}")
+        self.events.emit("info", f"BOTs: {n_bots}")
+        self.events.emit("info", f"NewsReels: {n_newsreel}")
+
+        # Inicialización: cada fuente entrega su noticia a sus vecinos y la cascada sigue desde ahí
+        self._cascade()
+
+        # Colecta inicial
+        self.collect()
+
+    def _build_cohorts(self, counts: dict, resolution: int):
+        """Cohortes iniciales (puntos medios del rango de credibilidad) y las que se alcanzan por conversiones."""
+        cohorts = {}
+        pending = []
+        for kind, n in counts.items():
+            low, high = CREDIBILITY[kind]
+            points = low + (high - low) * (np.arange(resolution) + 0.5) / resolution
+            for party in (1, -1):
+                for credibility in points.tolist():
+                    key = (kind, party, round(credibility, 12))
+                    cohorts[key] = cohorts.get(key, 0.0) + n / (2 * resolution)
+                    pending.append(key)
+        # Clausura bajo convertTo: cada cohorte tiene su cohorte destino (del otro tipo)
+        self._target = {}
+        while pending:
+            kind, party, credibility = key = pending.pop()
+            other = SUSCEPTIBLE if kind == SKEPTIC else SKEPTIC
+            factor, low, high = CONVERSION[other]
+            target = (other, party, round(min(max(credibility * factor, low), high), 12))
+            if target not in cohorts:
+                cohorts[target] = 0.0
+                pending.append(target)
+            self._target[key] = target
+
+        # Ordenadas por partido y, dentro de cada partido, los Susceptibles primero: las cohortes que desplaza
+        # una noticia quedan contiguas
+        keys = sorted(cohorts, key=lambda key: (key[1], key[0] != SUSCEPTIBLE, key[2]))
+        index = {key: i for i, key in enumerate(keys)}
+        self.kind = np.array([key[0] for key in keys], dtype=np.int8)
+        self.party = np.array([key[1] for key in keys], dtype=np.int8)
+        self.credibility = np.array([key[2] for key in keys])
+        self.mass = np.array([cohorts[key] for key in keys])
+        self.target = np.array([index[self._target[key]] for key in keys])
+        # Distribución de percepción hacia el partido contrario: todos empiezan en 0
+        self.perception = np.zeros((len(keys), len(BINS)))
+        self.perception[:, np.searchsorted(BINS, 0.0)] = self.mass
+
+        # Probabilidad de compartir de cada (cohorte, noticia)
+        susceptible = self.kind == SUSCEPTIBLE
+        weights = np.array([self.share_weights[kind] for kind in self.kind.tolist()])
+        m_ij = (1 + self.news_polarity[None, :] * self.news_party[None, :] * self.party[:, None]) / 2.0
+        self.share = np.clip(weights[:, :1] * m_ij + weights[:, 1:2] * self.news_credibility[None, :] + weights[:, 2:] * self.credibility[:, None], 0.0, 1.0)
+        self.share[~susceptible[:, None] & ~self.news_veracity[None, :]] = 0.0
+        # Quiénes pueden compartirla (un Skeptic no comparte noticias falsas)
+        self.carrier = (self.share > 0).astype(float)
+
+        # updatePerception: cada cohorte se desplaza ±alpha·c; bin destino de cada bin, por sentido (+1/-1) y cohorte
+        delta = self.alpha * self.credibility[:, None]
+        destination = np.stack([np.rint((np.round(np.clip(BINS + sign * delta, -1.0, 1.0), 2) + 1.0) * 100).astype(np.int64) for sign in (1, -1)])
+        # checkConversion: Susceptibles con la percepción en los primeros bins (hasta THRESHOLD_TO_SKEPTIC) y
+        # Skeptics con la percepción en los últimos (desde THRESHOLD_TO_SUSCEPTIBLE)
+        self._crossings = [
+            (np.flatnonzero(susceptible), slice(0, int(np.searchsorted(BINS, self.threshold_to_skeptic, side="right")))),
+            (np.flatnonzero(~susceptible), slice(int(np.searchsorted(BINS, self.threshold_to_susceptible)), None)),
+        ]
+
+        # Las noticias del partido contrario mueven la percepción (a los Skeptics, solo las verdaderas). Por clase
+        # de noticia (partido, polaridad, veracidad): el rango de cohortes que desplaza y los bins destino como
+        # índice plano en ese bloque
+        self._moves = {}
+        for news in range(len(self.news_party)):
+            key = (int(self.news_party[news]), int(self.news_polarity[news]), bool(self.news_veracity[news]))
+            if key in self._moves:
+                continue
+            party, polarity, veracity = key
+            moved = np.flatnonzero((self.party != party) & (susceptible | veracity))
+            rows = slice(int(moved[0]), int(moved[-1]) + 1) if len(moved) else slice(0, 0)
+            block = (np.arange(len(moved)) * len(BINS))[:, None] + destination[0 if polarity > 0 else 1, rows]
+            self._moves[key] = (rows, block.ravel())
+        self._news_moves = [self._moves[(int(p), int(s), bool(v))] for p, s, v in zip(self.news_party, self.news_polarity, self.news_veracity)]
+
+    def _setup_collector(self):
+        self.datacollector = make_collector(
+            {
+                "AvgPerception_Skeptic": lambda m: m.avg_perception(SKEPTIC),
+                "AvgPerception_Susceptible": lambda m: m.avg_perception(SUSCEPTIBLE),
+                "TrueNewsShared": lambda m: m.true_news_shared,
+                "FalseNewsShared": lambda m: m.false_news_shared,
+                "NumSkeptics": lambda m: float(m.mass[m.kind == SKEPTIC].sum()),
+                "NumSusceptibles": lambda m: float(m.mass[m.kind == SUSCEPTIBLE].sum()),
+                "ConversionsToSkeptic": lambda m: m.conversions_to_skeptic,
+                "ConversionsToSusceptible": lambda m: m.conversions_to_susceptible,
+                "CascadeDepth": lambda m: m.cascade_depth,
+                "CascadeSize": lambda m: m.cascade_size,
+            },
+            self._recorder_options,
+        )
+
+    def collect(self):
+        self.datacollector.collect(self)
+
+    def step(self):
+        """Un paso: cada cohorte vuelve a decidir si comparte lo que recibió y la cascada crece hasta su nuevo alcance."""
+        if self.converged_at is not None:
+            # Ya convergió: se repite la última fila en lugar de simular
+            self._repeat_collect()
+            return
+
+        self.cascade_depth = 0
+        self.cascade_size = 0.0
+        # Barrido: toda la masa que recibió cada noticia vuelve a decidir si la comparte
+        senders = (self.received * self.share).sum(axis=0)
+        n_true = float(senders[self.news_veracity].sum())
+        self.true_news_shared += n_true
+        self.false_news_shared += float(senders.sum()) - n_true
+        # Los que no la habían compartido nunca y ahora sí la envían a vecinos que quizá no la tienen
+        self.transmitted += (self.received - self.transmitted) * self.share
+        self._cascade()
+
+        self.previous_conversions = max(self.previous_conversions, self.conversions_to_skeptic + self.conversions_to_susceptible)
+        self.collect()
+        self._check_convergence()
+
+    def _cascade(self):
+        """
+        Nuevo alcance de cada noticia: el punto fijo de cluster_reach con la densidad de los que
+        la compartieron, contando a los nuevos receptores que la comparten al recibirla.
+        """
+        unreceived = np.maximum(self.mass[:, None] - self.received, 0.0)
+        pool = unreceived.sum(axis=0)
+        limit = pool
+        if self.max_hops is not None:
+            # Lo que cubre una cascada de max_hops saltos (ver _hops)
+            limit = np.minimum(pool, self.n_users / self.n_cells * ((2 * self.max_hops / TORTUOSITY + 1) ** 2 - 1))
+        news = np.flatnonzero(limit > EPSILON)
+        if not len(news):
+            return
+
+        # Los nuevos receptores salen de la masa que no la recibió, en proporción a cada cohorte
+        weights = unreceived[:, news] / pool[news]
+        share, carrier, received = self.share[:, news], self.carrier[:, news], self.received[:, news]
+        rate, grow = (weights * share).sum(axis=0), (weights * carrier).sum(axis=0)
+        base, known = self.transmitted[:, news].sum(axis=0), (received * carrier).sum(axis=0)
+        offset = received.sum(axis=0)
+        # Densidad de portadores en la grilla, en unidades de la tabla de alcance
+        scale = self.mass @ carrier * ((REACH_POINTS - 1) / self.n_cells)
+
+        def excess(x):
+            # Alcance con la fracción de los portadores alcanzados que la compartió si hay x receptores más,
+            # menos el que se supone (lo ya recibido más x), y su derivada en x
+            total = np.maximum(known + grow * x, EPSILON)
+            fraction = np.minimum((base + rate * x) / total, 1.0)
+            position = scale * fraction
+            cell = np.minimum(position.astype(np.int64), REACH_POINTS - 2)
+            rise = self._rise[cell]
+            slope = rise * scale * (rate - fraction * grow) / total
+            return self._reach[cell] + (position - cell) * rise - offset - x, np.where(fraction < 1.0, slope, 0.0) - 1.0
+
+        # Newton desde la primera ola (el alcance con lo que ya hay), dentro del intervalo que encierra la raíz
+        # y con bisección cuando el paso sale de él
+        low, high = np.zeros(len(news)), limit[news]
+        x = np.minimum(excess(low)[0], high)
+        done = x <= EPSILON
+        for _ in range(SOLVER_ITERATIONS):
+            value, derivative = excess(x)
+            done |= (np.abs(value) <= SOLVER_TOLERANCE) | ((value > 0) & (x >= high))
+            if done.all():
+                break
+            above = value > 0
+            low, high = np.where(above, x, low), np.where(above, high, x)
+            step = x - value / np.minimum(derivative, -EPSILON)
+            x = np.where(done, x, np.where((step > low) & (step < high), step, (low + high) / 2))
+        new = np.maximum(x, 0.0)
+        arriving = new > EPSILON
+        if not arriving.any():
+            return
+        news, new, weights, share = news[arriving], new[arriving], weights[:, arriving], share[:, arriving]
+
+        arrived = weights * new
+        self.received[:, news] += arrived
+        self.transmitted[:, news] += arrived * share
+        self.cascade_size += float(new.sum())
+        # Profundidad: la de la cascada de la noticia que más creció, si alcanzó al menos medio usuario
+        if new.max() >= 0.5:
+            hops = int(np.ceil(self._hops(new.max())))
+            self.cascade_depth = max(self.cascade_depth, hops if self.max_hops is None else min(hops, self.max_hops))
+
+        # Fracción de cada cohorte que la recibe (las cohortes vacías no reciben nada)
+        fraction = arrived / np.maximum(self.mass, EPSILON)[:, None]
+        for column, n in enumerate(news.tolist()):
+            self._receive(n, fraction[:, column])
+        self._convert()
+
+    def _hops(self, reached):
+        """Saltos de una cascada que alcanza `reached` usuarios: el radio de Moore del área que ocupan, por TORTUOSITY."""
+        return TORTUOSITY * (np.sqrt(reached * self.n_cells / self.n_users + 1.0) - 1.0) / 2.0
+
+    def _receive(self, news, fraction):
+        """updatePerception de la fracción `fraction` de cada cohorte que recibió la noticia."""
+        rows, destination = self._news_moves[news]
+        block = self.perception[rows]
+        if not len(block):
+            return
+        moved = block * fraction[rows, None]
+        block -= moved
+        block += np.bincount(destination, weights=moved.ravel(), minlength=moved.size).reshape(moved.shape)
+
+    def _convert(self):
+        """checkConversion/convertTo: la masa que cruza un umbral pasa a su cohorte destino con lo que recibió."""
+        for rows, crossed in self._crossings:
+            amount = self.perception[rows, crossed].sum(axis=1)
+            crossing = amount > EPSILON
+            if crossing.any():
+                self._move(rows[crossing], crossed, amount[crossing])
+
+    def _move(self, sources, crossed, amount):
+        targets = self.target[sources]
+        # Lo recibido y lo compartido se van en proporción a la masa que cruza
+        part = (amount / self.mass[sources])[:, None]
+        for state in (self.received, self.transmitted):
+            carried = state[sources] * part
+            state[sources] -= carried
+            np.add.at(state, targets, carried)
+        moving = self.perception[sources, crossed]
+        self.perception[sources, crossed] = 0.0
+        self.mass[sources] -= amount
+        np.add.at(self.perception[:, crossed], targets, moving)
+        np.add.at(self.mass, targets, amount)
+
+        to_skeptic = self.kind[sources] == SUSCEPTIBLE
+        self.conversions_to_skeptic += float(amount[to_skeptic].sum())
+        self.conversions_to_susceptible += float(amount[~to_skeptic].sum())
+
+    def avg_perception(self, kind) -> float:
+        """Percepción media hacia A de los usuarios del tipo dado (los de partido A la tienen en 0)."""
+        mask = self.kind == kind
+        total = self.mass[mask].sum()
+        if total <= EPSILON:
+            return 0.0
+        to_a = mask & (self.party < 0)
+        return float((self.perception[to_a] @ BINS).sum() / total)
+
+    def reach(self) -> np.ndarray:
+        """Fracción de los usuarios que ya recibió cada noticia."""
+        return self.received.sum(axis=0) / self.n_users
+
+    def pending_shares(self) -> int:
+        """Masa esperada que compartiría en el próximo step."""
+        return int(round(float((self.received * self.share).sum())))
+
+    def perception_totals(self):
+        """Suma de la percepción hacia A (usuarios de B) y hacia B (usuarios de A)."""
+        totals = self.perception @ BINS
+        return np.array([totals[self.party < 0].sum(), totals[self.party > 0].sum()])
@@ -1,14 +1,27 @@
-import math
-import random
+import numpy as np
 from mesa import Model
 from mesa.discrete_space import OrthogonalMooreGrid
-from mesa.datacollection import DataCollector
 from mesa.experimental.devs import ABMSimulator
 
+from adjacency import UserAdjacency
 from agents import BOT, Skeptic, Susceptible, NewsReel
-
-
-class SocialNetworkModel(Model):
+from bulk import place, populate
+from cascade import NewsCascade
+from conversions import SKEPTIC, ConversionLog, KindIndex
+from convergence import ConvergenceMixin, make_criterion
+from injection import make_injector
+from instrumentation import EventSink, Instrumentation
+from lineage import CascadeIndex
+from newsstore import ExposureState, NewsTable
+from propagation import PropagationLog
+from recorder import make_collector
+from retention import NewsRetention
+from scheduling import ActiveSet
+from stats import PerceptionStats
+from topology import make_topology
+
+
+class SocialNetworkModel(ConvergenceMixin, Model):
     def __init__(
         self,
         width=20,
@@ -19,43 +32,107 @@ class SocialNetworkModel(Model):
         n_newsreel=5,
         seed=None,
         simulator: ABMSimulator = None,
+        max_hops=None,
+        propagation_window=100_000,
+        propagation_spill=None,
+        instrument=False,
+        log_level="info",
+        event_driven=False,
+        topology=None,
+        degree=8,
+        rewire=0.1,
+        convergence=None,
+        news_ttl=None,
+        news_memory=None,
+        eviction="oldest",
+        compact_every=1,
+        recorder=None,
+        bulk=False,
+        cascade_index=False,
+        injection=None,
     ):
         super().__init__(seed=seed)
-        
-        # Si no se proporciona simulador, crear uno nuevo
-        if simulator is None:
-            simulator = ABMSimulator()
-        
-        self.simulator = simulator
-        self.simulator.setup(self)
-
-        self.height = height
-        self.width = width
-        self.running = True
-        self.true_news_shared = 0
-        self.false_news_shared = 0
-        self.conversions_to_skeptic = 0
-        self.conversions_to_susceptible = 0
-        self.previous_conversions = 0  # Rastrear conversiones previas para detectar cambios
-        self.converted_agents = []  # Lista para almacenar detalles de agentes convertidos
-        self.news_propagation = []  # Lista para rastrear quién comparte a quién en cada step
-
-        self.grid = OrthogonalMooreGrid(
-            [self.height, self.width],
-            torus=True,
-            capacity=1,  # Máximo 1 agente por celda
-            random=self.random,
+        retention = NewsRetention(news_ttl, news_memory, eviction, compact_every) if news_ttl is not None or news_memory is not None else None
+        self._setup(
+            simulator,
+            width,
+            height,
+            n_skeptic + n_susceptible,
+            n_bots + n_newsreel,
+            max_hops,
+            propagation_window,
+            propagation_spill,
+            instrument,
+            log_level,
+            event_driven,
+            convergence=convergence,
+            retention=retention,
+            recorder=recorder,
+            cascade_index=CascadeIndex() if cascade_index else None,
+            injector=make_injector(injection),
         )
 
-        # Obtener todas las celdas disponibles y mezclarlas
-        available_cells = list(self.grid.all_cells.cells)
-        self.random.shuffle(available_cells)
-
-        # Verificar que hay suficientes celdas
         total_agents = n_skeptic + n_susceptible + n_bots + n_newsreel
-        if total_agents > len(available_cells):
-            raise ValueError(f"No hay suficientes celdas ({len(available_cells)}) para {total_agents} agentes")
+        if topology is None and bulk:
+            # Construcción masiva: celdas sorteadas en lote, sin construir la grilla de Mesa (ver bulk.py)
+            self.grid_cells = place(self.rng, self.width * self.height, total_agents)
+        elif topology is None:
+            # Obtener todas las celdas disponibles y mezclarlas
+            available_cells = list(self.grid.all_cells.cells)
+            self.random.shuffle(available_cells)
+
+            # Verificar que hay suficientes celdas
+            if total_agents > len(available_cells):
+                raise ValueError(f"No hay suficientes celdas ({len(available_cells)}) para {total_agents} agentes")
+        else:
+            # Modo de red: los agentes no ocupan celdas sino nodos al azar de un grafo CSR
+            self.graph = make_topology(topology, total_agents, self.rng, degree, rewire)
+            n_nodes = len(self.graph[0]) - 1
+            if total_agents > n_nodes:
+                raise ValueError(f"No hay suficientes nodos ({n_nodes}) para {total_agents} agentes")
+            # En el orden de creación de los agentes (= orden de nodos del índice de adyacencia)
+            self.graph_nodes = self.rng.permutation(n_nodes)[:total_agents]
+            available_cells = [None] * total_agents
+
+        if bulk:
+            populate(self, n_skeptic, n_susceptible, n_bots, n_newsreel)
+        else:
+            self._create_agents(n_skeptic, n_susceptible, n_bots, n_newsreel, available_cells)
+
+        self._index_agents()
+        self._setup_collector()
+
+        # Inicialización: bots crean y envían noticias
+        self.events.emit("info", f"\n{'='*60}")
+        self.events.emit("info", "INICIALIZACIÓN DEL MODELO")
+        self.events.emit("info", f"{'='*60}")
+        if self.graph is None:
+            self.events.emit("info", f"Grid: {self.width}x{self.height}")
+        else:
+            self.events.emit("info", f"Red: {len(self.graph[0]) - 1} nodos, {len(self.graph[1]) // 2} aristas")
+        self.events.emit("info", f"Skeptics: {n_skeptic}")
+        self.events.emit("info", f"Susceptibles: {n_susceptible}")
+        self.events.emit("info", f"BOTs: {n_bots}")
+        self.events.emit("info", f"NewsReels: {n_newsreel}")
 
+        for bot in self.agents_by_type[BOT]:
+            bot.create_news()
+            for news in list(bot.initialnews):
+                bot.sendNews(news, radius=1)
+
+        for newsreel in self.agents_by_type[NewsReel]:
+            newsreel.create_news()
+            for news in list(newsreel.initialnews):
+                newsreel.sendNews(news, radius=1)
+
+        if self.injector is not None:
+            self.injector.attach(self)
+
+        # Colecta inicial
+        self.collect()
+
+    def _create_agents(self, n_skeptic, n_susceptible, n_bots, n_newsreel, available_cells):
+        """Construcción por defecto: cada tipo con create_agents, en celdas únicas."""
         cell_index = 0
 
         # Crear agentes asignando celdas únicas
@@ -86,93 +163,233 @@ class SocialNetworkModel(Model):
             cell=available_cells[cell_index : cell_index + n_newsreel],
         )
 
-        # Guardar todos los agentes en una sola lista
-        self.total_agents = list(self.agents_by_type[BOT]) + list(self.agents_by_type[NewsReel]) + list(self.agents_by_type[Skeptic]) + list(self.agents_by_type[Susceptible])
+    def step(self):
+        """Ejecuta un paso de la simulación: cada usuario decide si compartir sus noticias."""
+        if self.converged_at is not None:
+            # Ya convergió: se repite la última fila en lugar de simular (p. ej. si el simulador sigue llamando a step)
+            self._repeat_collect()
+            return
+
+        # Vencimiento y tope de memoria de noticias: se compactan antes de reanudar envíos postergados y pendientes
+        if self.retention is not None and self.retention.due(self.steps):
+            self.retention.compact(self)
+
+        # Abrir el tramo de propagaciones del nuevo step (el anterior queda en la ventana del registro)
+        self.propagation_log.begin_step(self.steps)
+        self.cascade.begin_step()
+        inst = self.instrumentation
+        if inst is not None:
+            inst.begin_step(self.steps)
+
+        if self.active is None:
+            # Barrido: cada usuario reevalúa todas las noticias que recibió alguna vez
+            # (usuarios en orden de nodo: los creados como Skeptic y luego los creados como Susceptible)
+            user_agents = self.adjacency.agents[: self.adjacency.n_users]
+            # (generador: las noticias de cada usuario se leen al llegar su turno, como en el original)
+            activations = ((agent, agent.newsReceived) for agent in user_agents)
+        else:
+            # Por eventos: solo los usuarios con noticias pendientes, una decisión por noticia
+            activations = self.active.pop_all()
+
+        for agent, pending in activations:
+            for news in pending:
+                if inst is None:
+                    share = agent.shareDecision(news)
+                else:
+                    start = inst.clock()
+                    share = agent.shareDecision(news)
+                    inst.add_time("shareDecision", inst.clock() - start)
+                if share:
+                    self.countNewsbyType(news)
+                    agent.sendNews(news, radius=1)
 
-        # NUEVA FUNCIÓN
-        def avg_perception_by_agent(m, party: str):
-            """Calcula el promedio de percepción hacia un partido,
-            separado por tipo de agente (Skeptic y Susceptible)."""
-            user_agents = [a for a in m.total_agents if hasattr(a, "perception") and isinstance(a.perception, dict)]
+        # Noticias nuevas de las fuentes, en lote; los usuarios las reevalúan desde el próximo step
+        if self.injector is not None:
+            self.injector.inject(self)
 
-            if not user_agents:
-                return {"Skeptic": 0.0, "Susceptible": 0.0}
+        # Verificar si hubo conversiones en este step
+        total_conversions = self.conversions_to_skeptic + self.conversions_to_susceptible
+        if total_conversions > self.previous_conversions:
+            self.conversions.clear()
+            self.previous_conversions = total_conversions
 
-            skeptics = [a for a in user_agents if isinstance(a, Skeptic)]
-            susceptibles = [a for a in user_agents if isinstance(a, Susceptible)]
+        self.collect()
+        self._check_convergence()
 
-            def mean(values):
-                return sum(values) / len(values) if values else 0.0
+        # Las propagaciones del step siguen disponibles para visualización hasta el próximo begin_step
 
-            avg_skeptic = mean([a.perception[party] for a in skeptics])
-            avg_susceptible = mean([a.perception[party] for a in susceptibles])
+    def _setup(self, simulator, width, height, n_users, n_news, max_hops, propagation_window, propagation_spill, instrument, log_level, event_driven, *, convergence=None, retention=None, recorder=None, cascade_index=None, injector=None):
+        """Estructuras del modelo previas a la creación de agentes (también las usa snapshot.build); las opciones van solo por nombre."""
+        # Si no se proporciona simulador, crear uno nuevo
+        if simulator is None:
+            simulator = ABMSimulator()
 
-            return {"Skeptic": avg_skeptic, "Susceptible": avg_susceptible}
+        self.simulator = simulator
+        self.simulator.setup(self)
 
-        #  DATA COLLECTOR
-        self.datacollector = DataCollector(
-            model_reporters={
-                "AvgPerception_Skeptic": lambda m: avg_perception_by_agent(m, "A")["Skeptic"],
-                "AvgPerception_Susceptible": lambda m: avg_perception_by_agent(m, "A")["Susceptible"],
-                "TrueNewsShared": lambda m: m.true_news_shared,
-                "FalseNewsShared": lambda m: m.false_news_shared,
-                "NumSkeptics": lambda m: len(m.agents_by_type[Skeptic]),
-                "NumSusceptibles": lambda m: len(m.agents_by_type[Susceptible]),
-                "ConversionsToSkeptic": lambda m: m.conversions_to_skeptic,
-                "ConversionsToSusceptible": lambda m: m.conversions_to_susceptible,
-            }
+        self.height = height
+        self.width = width
+        self.running = True
+        self.true_news_shared = 0
+        self.false_news_shared = 0
+        self.conversions_to_skeptic = 0
+        self.conversions_to_susceptible = 0
+        self.previous_conversions = 0  # Rastrear conversiones previas para detectar cambios
+        # Detalles de los agentes convertidos en columnas preasignadas (vista model.converted_agents)
+        self.conversions = ConversionLog(capacity=max(n_users, 1))
+        # Eventos por nivel (reemplaza los print) e instrumentación opcional del camino caliente
+        self.events = EventSink(log_level)
+        self.instrumentation = Instrumentation() if instrument else None
+        # Modo por eventos: solo se activan usuarios con noticias recibidas sin decidir
+        self.active = ActiveSet() if event_driven else None
+        # Criterio de terminación anticipada (quiescencia o estado estacionario) y step en que se cumplió
+        self.convergence = make_criterion(convergence)
+        self.converged_at = None
+        # Vencimiento y tope de memoria de noticias por usuario (None: las noticias se recuerdan siempre)
+        self.retention = retention
+        # Opciones del registro columnar (recorder.py); None: DataCollector de Mesa
+        self._recorder_options = recorder
+        # Registro columnar de quién comparte a quién (ventana en memoria y volcado opcional a disco)
+        self.propagation_log = PropagationLog(capacity=propagation_window, spill_path=propagation_spill)
+        self.cascade = NewsCascade(max_hops=max_hops, instrumentation=self.instrumentation)  # Frontera de propagación (saltos máximos por step)
+        # Árbol de propagación de cada noticia con sus métricas (lineage.py); None: no se indexan las entregas
+        self.cascade_index = cascade_index
+        # Emisión continua de noticias de BOTs y NewsReels (injection.py); None: solo la ráfaga inicial
+        self.injector = injector
+
+        # La grilla de Mesa se construye al primer acceso a self.grid (el modo de red y la construcción masiva no la usan)
+        self._grid = None
+
+        # Tabla de noticias y estado de exposición (bitsets) de los usuarios
+        self.news_table = NewsTable(capacity=n_news)
+        self.exposure = ExposureState(self.news_table, users=n_users, news=n_news)
+
+        # Sumas y conteos de percepción por tipo, actualizados en updatePerception y convertTo
+        self.perception_stats = PerceptionStats([Skeptic, Susceptible])
+
+        # Modo de red (topology): grafo CSR y nodo del grafo de cada agente; None en la grilla
+        self.graph = None
+        self.graph_nodes = None
+        # Construcción masiva (bulk.py): celda plana de cada agente mientras no exista la grilla de Mesa
+        self.grid_cells = None
+
+    @property
+    def grid(self) -> OrthogonalMooreGrid:
+        """Grilla de Mesa (torus, una celda por agente), construida al primer acceso."""
+        if self._grid is None:
+            self._grid = OrthogonalMooreGrid(
+                [self.height, self.width],
+                torus=True,
+                capacity=1,  # Máximo 1 agente por celda
+                random=self.random,
+            )
+            if self.grid_cells is not None and hasattr(self, "adjacency"):
+                # Construcción masiva: los agentes pasan a ocupar sus celdas, que desde ahora mandan en el índice
+                cells, self.grid_cells = self.grid_cells, None
+                self.adjacency.grid_cells = None
+                for agent, cell in zip(self.adjacency.agents, cells.tolist()):
+                    agent.cell = self._grid[divmod(cell, self.width)]
+        return self._grid
+
+    def _index_agents(self):
+        """Índices sobre los agentes ya creados."""
+        # Índice CSR de usuarios vecinos, construido una sola vez (se actualiza si un agente se mueve)
+        self.adjacency = UserAdjacency(
+            self,
+            users=list(self.agents_by_type[Skeptic]) + list(self.agents_by_type[Susceptible]),
+            sources=list(self.agents_by_type[BOT]) + list(self.agents_by_type[NewsReel]),
+            graph=self.graph,
+            graph_nodes=self.graph_nodes,
+            grid_cells=self.grid_cells,
         )
 
-        # Inicialización: bots crean y envían noticias
-        print(f"\n{'='*60}")
-        print("INICIALIZACIÓN DEL MODELO")
-        print(f"{'='*60}")
-        print(f"Grid: {self.width}x{self.height}")
-        print(f"Skeptics: {n_skeptic}")
-        print(f"Susceptibles: {n_susceptible}")
-        print(f"BOTs: {n_bots}")
-        print(f"NewsReels: {n_newsreel}")
-
-        for bot in self.agents_by_type[BOT]:
-            bot.create_news()
-            for news in list(bot.initialnews):
-                bot.sendNews(news, radius=1)
-
-        for newsreel in self.agents_by_type[NewsReel]:
-            newsreel.create_news()
-            for news in list(newsreel.initialnews):
-                newsreel.sendNews(news, radius=1)
-
-        # Colecta inicial
-        self.datacollector.collect(self)
-
-    def step(self):
-        """Ejecuta un paso de la simulación: cada usuario decide si compartir sus noticias."""
-        # Limpiar propagaciones del step ANTERIOR al INICIO del nuevo step
-        self.news_propagation.clear()
-
-        user_agents = list(self.agents_by_type[Skeptic]) + list(self.agents_by_type[Susceptible])
-
-        news_shared_this_step = 0
+        # Tipo actual de cada usuario y usuarios de cada tipo, por nodo (convertTo los mantiene al día)
+        self.kinds = KindIndex([agent.kind for agent in self.adjacency.agents[: self.adjacency.n_users]])
 
-        for agent in user_agents:
-            for news in list(agent.newsReceived):
-                if agent.shareDecision(news):
-                    self.countNewsbyType(news)
-                    agent.sendNews(news, radius=1)
-                    news_shared_this_step += 1
-
-        # Verificar si hubo conversiones en este step
-        total_conversions = self.conversions_to_skeptic + self.conversions_to_susceptible
-        if total_conversions > self.previous_conversions:
-            if self.converted_agents:
-                self.converted_agents.clear()
-            self.previous_conversions = total_conversions
+        # Guardar todos los agentes en una sola lista
+        self.total_agents = list(self.agents_by_type[BOT]) + list(self.agents_by_type[NewsReel]) + list(self.agents_by_type[Skeptic]) + list(self.agents_by_type[Susceptible])
 
+    def _setup_collector(self):
+        #  DATA COLLECTOR
+        model_reporters = {
+            # Percepción promedio hacia A y cantidad por tipo, leídas en O(1) de perception_stats
+            "AvgPerception_Skeptic": lambda m: m.perception_stats.mean(Skeptic, "A"),
+            "AvgPerception_Susceptible": lambda m: m.perception_stats.mean(Susceptible, "A"),
+            "TrueNewsShared": lambda m: m.true_news_shared,
+            "FalseNewsShared": lambda m: m.false_news_shared,
+            "NumSkeptics": lambda m: m.perception_stats.count[Skeptic],
+            "NumSusceptibles": lambda m: m.perception_stats.count[Susceptible],
+            "ConversionsToSkeptic": lambda m: m.conversions_to_skeptic,
+            "ConversionsToSusceptible": lambda m: m.conversions_to_susceptible,
+            "CascadeDepth": lambda m: m.cascade.depth,
+            "CascadeSize": lambda m: m.cascade.size,
+        }
+        if self.retention is not None:
+            model_reporters["LiveNews"] = lambda m: m.news_table.live
+        if self.cascade_index is not None:
+            # Distribución de tamaños de las cascadas por noticia y alcance de las noticias falsas
+            model_reporters["CascadeSizeMedian"] = lambda m: m.cascade_index.size_quantile(50)
+            model_reporters["CascadeSizeP90"] = lambda m: m.cascade_index.size_quantile(90)
+            model_reporters["CascadeSizeMax"] = lambda m: m.cascade_index.size_quantile(100)
+            model_reporters["FalseNewsReach"] = lambda m: m.cascade_index.false_reach(m.adjacency.n_users)
+        if self.instrumentation is not None:
+            model_reporters.update(self.instrumentation.reporters())
+        self.datacollector = make_collector(model_reporters, self._recorder_options)
+
+    def collect(self):
+        """Colecta los reporters del step; con instrumentación mide la colecta y cierra el registro del step."""
+        inst = self.instrumentation
+        if inst is None:
+            self.datacollector.collect(self)
+            return
+        start = inst.clock()
         self.datacollector.collect(self)
-
-        # NO limpiar aquí - las propagaciones deben persistir para visualización
-        # Se limpian al INICIO del próximo step
+        inst.add_time("collect", inst.clock() - start)
+        inst.end_step()
+
+    def pending_shares(self) -> int:
+        """Decisiones del próximo step que pueden terminar en un envío, más los envíos postergados por la cascada."""
+        pending = len(self.cascade.deferred)
+        if self.injector is not None:
+            pending += self.injector.pending(self.steps)
+        if self.active is not None:
+            return pending + sum(len(news) for news in self.active.pending.values())
+        # Barrido: cada usuario vuelve a decidir sobre toda noticia recibida; los Skeptic nunca comparten las falsas
+        users = self.adjacency.agents[: self.adjacency.n_users]
+        received = self.exposure.received[[agent.slot for agent in users]]
+        table = self.news_table
+        true_bits = np.zeros(self.exposure.row_bytes, dtype=np.uint8)
+        packed = np.packbits(table.veracity[: table.size], bitorder="little")
+        true_bits[: len(packed)] = packed
+        skeptic = self.kinds.kinds() == SKEPTIC
+        received[skeptic] &= true_bits
+        return pending + int(np.unpackbits(received).sum())
+
+    def agent_state(self) -> dict:
+        """Percepción, credibilidad y tipo (0 = Skeptic, 1 = Susceptible) de los usuarios, en orden de nodo."""
+        users = self.adjacency.agents[: self.adjacency.n_users]
+        n = len(users)
+        return {
+            "ids": np.fromiter((agent.unique_id for agent in users), dtype=np.int64, count=n),
+            "perception_a": np.fromiter((agent.perception["A"] for agent in users), dtype=np.float64, count=n),
+            "perception_b": np.fromiter((agent.perception["B"] for agent in users), dtype=np.float64, count=n),
+            "credibility": np.fromiter((agent.credibility for agent in users), dtype=np.float64, count=n),
+            "kind": self.kinds.kinds(),
+        }
+
+    def perception_totals(self) -> tuple:
+        """Sumas de percepción por tipo y partido (cambian si algún usuario movió su percepción)."""
+        return tuple(value for sums in self.perception_stats.sum.values() for value in sums.values())
+
+    @property
+    def converted_agents(self) -> list:
+        """Conversiones desde la última que detectó step como lista de dicts (vista de compatibilidad, se construye al leerla)."""
+        return self.conversions.records(self.adjacency.agents)
+
+    @property
+    def news_propagation(self):
+        """Propagaciones del step actual como lista de dicts (vista de compatibilidad, se construye al leerla)."""
+        return self.propagation_log.records(self.adjacency.agents)
 
     def countNewsbyType(self, news):
         """Incrementa los contadores globales de noticias según su veracidad."""
@@ -0,0 +1,288 @@
+"""
+Almacenamiento compacto de noticias y del estado de exposición de los usuarios.
+
+NewsTable guarda los atributos de cada noticia en arreglos indexados por id
+(partido A=+1/B=-1, polaridad, veracidad, credibilidad y step de creación). Los ids
+de noticias liberadas (vencidas, ver retention.py) se reutilizan y sus objetos News
+quedan en `spare`, el conjunto de registros que reutiliza la inyección continua
+(injection.py), que también lo llena por adelantado. ExposureState guarda,
+para cada usuario, las noticias recibidas y compartidas como bitsets (matrices de
+bits empaquetados) y los conteos de exposición en una matriz de enteros.
+Los atributos newsReceived, newsReceivedIds, newsShared, newsSharedIds y
+newsExposureCount de User son vistas de solo lectura sobre este estado.
+"""
+import heapq
+from array import array
+from collections.abc import Mapping, Set
+
+import numpy as np
+
+# Tope de los conteos de exposición (uint16)
+MAX_EXPOSURES = np.iinfo(np.uint16).max
+
+
+class NewsTable:
+    """Tabla de noticias del modelo indexada por id de noticia."""
+
+    def __init__(self, capacity: int = 16):
+        capacity = max(capacity, 1)
+        self.size = 0  # filas usadas (ids 0..size-1, vivas o libres)
+        self.issued = 0  # noticias registradas en el modelo (contador por modelo)
+        self.items = []  # id -> News (None si el id está libre)
+        self.free = []  # heap de ids liberados, reutilizables
+        self.spare = []  # objetos News liberados o preasignados, reutilizables
+        self.party = np.zeros(capacity, dtype=np.int8)
+        self.polarity = np.zeros(capacity, dtype=np.int8)
+        self.veracity = np.zeros(capacity, dtype=bool)
+        self.credibility = np.zeros(capacity, dtype=np.float64)
+        self.born = np.zeros(capacity, dtype=np.int64)
+        self.alive = np.zeros(capacity, dtype=bool)
+
+    def add(self, news, born: int = 0):
+        """Registra una noticia creada en el step `born`. Su id pasa a ser su fila en la tabla (el menor id libre, si hay)."""
+        if news.id is not None and news.id < self.size and self.items[news.id] is news:
+            return news
+
+        if self.free:
+            news.id = heapq.heappop(self.free)
+            self.items[news.id] = news
+        else:
+            if self.size == len(self.party):
+                self._grow(2 * self.size)
+            news.id = self.size
+            self.items.append(news)
+            self.size += 1
+
+        self.party[news.id] = 1 if news.party == "A" else -1
+        self.polarity[news.id] = news.polarity
+        self.veracity[news.id] = news.veracity
+        self.credibility[news.id] = news.credibility
+        self.born[news.id] = born
+        self.alive[news.id] = True
+        self.issued += 1
+        return news
+
+    def add_batch(self, items: list, party: np.ndarray, polarity: np.ndarray, veracity: np.ndarray, credibility: np.ndarray, born: int = 0) -> np.ndarray:
+        """
+        Registra varias noticias nuevas de una vez con sus atributos en arreglos (partido
+        A=+1/B=-1). Los ids se asignan como con add() en el mismo orden: primero los libres,
+        de menor a mayor, y luego filas nuevas. Retorna los ids.
+        """
+        n = len(items)
+        reused = [heapq.heappop(self.free) for _ in range(min(n, len(self.free)))]
+        new = n - len(reused)
+        if self.size + new > len(self.party):
+            self._grow(max(2 * len(self.party), self.size + new))
+        ids = np.concatenate([np.array(reused, dtype=np.int64), np.arange(self.size, self.size + new, dtype=np.int64)])
+        self.items.extend([None] * new)
+        self.size += new
+
+        self.party[ids] = party
+        self.polarity[ids] = polarity
+        self.veracity[ids] = veracity
+        self.credibility[ids] = credibility
+        self.born[ids] = born
+        self.alive[ids] = True
+        self.issued += n
+        for news, news_id in zip(items, ids.tolist()):
+            news.id = news_id
+            self.items[news_id] = news
+        return ids
+
+    def reserve(self, capacity: int):
+        """Preasigna filas para `capacity` noticias."""
+        if capacity > len(self.party):
+            self._grow(capacity)
+
+    def release(self, news_ids):
+        """Libera los ids dados para que los reutilicen noticias nuevas."""
+        for news_id in news_ids:
+            if self.items[news_id] is not None:
+                self.spare.append(self.items[news_id])
+            self.items[news_id] = None
+            self.alive[news_id] = False
+            heapq.heappush(self.free, int(news_id))
+
+    @property
+    def live(self) -> int:
+        """Noticias registradas y aún no liberadas."""
+        return self.size - len(self.free)
+
+    def __getitem__(self, news_id: int):
+        return self.items[news_id]
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self, capacity):
+        for name in ("party", "polarity", "veracity", "credibility", "born", "alive"):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[: len(column)] = column
+            setattr(self, name, grown)
+
+
+class ExposureState:
+    """
+    Noticias recibidas/compartidas por usuario como bitsets y conteos de exposición.
+
+    Cada usuario ocupa una fila (`user.slot`) y la columna de una noticia es su id.
+    Los datos viven en buffers planos (bytearray/array) para que las consultas por
+    elemento del camino caliente sean baratas; `received`, `shared` y `exposures`
+    exponen los mismos buffers como matrices NumPy sin copiarlos.
+    """
+
+    def __init__(self, table: NewsTable, users: int = 64, news: int = 64):
+        self.table = table
+        self.n_users = 0
+        self.capacity = max(users, 1)
+        self.row_bytes = _bytes_for(news)
+        self._received = bytearray(self.capacity * self.row_bytes)
+        self._shared = bytearray(self.capacity * self.row_bytes)
+        self._exposures = array("H", bytes(2 * self.capacity * 8 * self.row_bytes))
+
+    @property
+    def received(self) -> np.ndarray:
+        """Matriz de bits empaquetados (usuarios x bytes) de noticias recibidas."""
+        return np.frombuffer(self._received, dtype=np.uint8).reshape(self.capacity, self.row_bytes)
+
+    @property
+    def shared(self) -> np.ndarray:
+        """Matriz de bits empaquetados (usuarios x bytes) de noticias compartidas."""
+        return np.frombuffer(self._shared, dtype=np.uint8).reshape(self.capacity, self.row_bytes)
+
+    @property
+    def exposures(self) -> np.ndarray:
+        """Matriz (usuarios x noticias) de conteos de exposición."""
+        return np.frombuffer(self._exposures, dtype=np.uint16).reshape(self.capacity, 8 * self.row_bytes)
+
+    def add_user(self) -> int:
+        """Reserva una fila para un usuario nuevo y retorna su slot."""
+        if self.n_users == self.capacity:
+            self._reserve(2 * self.capacity, self.row_bytes)
+        slot = self.n_users
+        self.n_users += 1
+        return slot
+
+    def reserve_news(self, n_news: int):
+        """Preasigna columnas para `n_news` noticias en todas las filas."""
+        if _bytes_for(n_news) > self.row_bytes:
+            self._reserve(self.capacity, _bytes_for(n_news))
+
+    def has_received(self, slot: int, news_id: int) -> bool:
+        byte = news_id >> 3
+        return byte < self.row_bytes and (self._received[slot * self.row_bytes + byte] >> (news_id & 7)) & 1 == 1
+
+    def has_shared(self, slot: int, news_id: int) -> bool:
+        byte = news_id >> 3
+        return byte < self.row_bytes and (self._shared[slot * self.row_bytes + byte] >> (news_id & 7)) & 1 == 1
+
+    def mark_received(self, slot: int, news_id: int):
+        """Primera exposición a la noticia."""
+        if news_id >> 3 >= self.row_bytes:
+            self._reserve(self.capacity, max(2 * self.row_bytes, (news_id >> 3) + 1))
+        self._received[slot * self.row_bytes + (news_id >> 3)] |= 1 << (news_id & 7)
+        self._exposures[slot * 8 * self.row_bytes + news_id] = 1
+
+    def mark_shared(self, slot: int, news_id: int):
+        if news_id >> 3 >= self.row_bytes:
+            self._reserve(self.capacity, max(2 * self.row_bytes, (news_id >> 3) + 1))
+        self._shared[slot * self.row_bytes + (news_id >> 3)] |= 1 << (news_id & 7)
+
+    def add_exposure(self, slot: int, news_id: int):
+        """Exposición repetida a una noticia ya recibida (satura en MAX_EXPOSURES)."""
+        index = slot * 8 * self.row_bytes + news_id
+        if self._exposures[index] < MAX_EXPOSURES:
+            self._exposures[index] += 1
+
+    def exposure_count(self, slot: int, news_id: int) -> int:
+        return self._exposures[slot * 8 * self.row_bytes + news_id]
+
+    def forget(self, slot: int, news_id: int):
+        """Olvida una noticia del usuario (recibida, compartida y exposiciones); si vuelve a llegarle, cuenta como nueva."""
+        index = slot * self.row_bytes + (news_id >> 3)
+        mask = 0xFF ^ (1 << (news_id & 7))
+        self._received[index] &= mask
+        self._shared[index] &= mask
+        self._exposures[slot * 8 * self.row_bytes + news_id] = 0
+
+    def clear_news(self, news_ids):
+        """Borra las noticias dadas de las filas de todos los usuarios."""
+        news_ids = np.asarray(news_ids, dtype=np.int64)
+        news_ids = news_ids[(news_ids >> 3) < self.row_bytes]
+        if not len(news_ids):
+            return
+        keep = np.full(self.row_bytes, 0xFF, dtype=np.uint8)
+        np.bitwise_and.at(keep, news_ids >> 3, (0xFF ^ (1 << (news_ids & 7))).astype(np.uint8))
+        self.received[:] &= keep
+        self.shared[:] &= keep
+        self.exposures[:, news_ids] = 0
+
+    def ids(self, bits: np.ndarray, slot: int) -> np.ndarray:
+        """Ids de las noticias marcadas en la fila `slot` de una matriz de bits."""
+        return np.flatnonzero(np.unpackbits(bits[slot], bitorder="little"))
+
+    def news(self, bits: np.ndarray, slot: int) -> tuple:
+        items = self.table.items
+        return tuple(items[news_id] for news_id in self.ids(bits, slot).tolist())
+
+    def _reserve(self, users: int, row_bytes: int):
+        """Agranda los buffers a `users` filas y `row_bytes` bytes por fila, copiando el contenido."""
+        received = np.zeros((users, row_bytes), dtype=np.uint8)
+        shared = np.zeros_like(received)
+        exposures = np.zeros((users, 8 * row_bytes), dtype=np.uint16)
+        received[: self.capacity, : self.row_bytes] = self.received
+        shared[: self.capacity, : self.row_bytes] = self.shared
+        exposures[: self.capacity, : 8 * self.row_bytes] = self.exposures
+
+        self.capacity, self.row_bytes = users, row_bytes
+        self._received = bytearray(received.tobytes())
+        self._shared = bytearray(shared.tobytes())
+        self._exposures = array("H", exposures.tobytes())
+
+
+def _bytes_for(n_news: int) -> int:
+    return max((n_news + 7) // 8, 1)
+
+
+class NewsIdsView(Set):
+    """Vista de solo lectura de los ids marcados en un bitset de usuario."""
+
+    __slots__ = ("_state", "_name", "_slot")
+
+    def __init__(self, state: ExposureState, name: str, slot: int):
+        self._state = state
+        self._name = name
+        self._slot = slot
+
+    def __contains__(self, news_id):
+        if self._name == "received":
+            return self._state.has_received(self._slot, news_id)
+        return self._state.has_shared(self._slot, news_id)
+
+    def __iter__(self):
+        return iter(self._state.ids(getattr(self._state, self._name), self._slot).tolist())
+
+    def __len__(self):
+        return int(np.unpackbits(getattr(self._state, self._name)[self._slot]).sum())
+
+
+class ExposureCountView(Mapping):
+    """Vista de solo lectura {id de noticia: exposiciones} de un usuario."""
+
+    __slots__ = ("_state", "_slot")
+
+    def __init__(self, state: ExposureState, slot: int):
+        self._state = state
+        self._slot = slot
+
+    def __getitem__(self, news_id):
+        if not self._state.has_received(self._slot, news_id):
+            raise KeyError(news_id)
+        return self._state.exposure_count(self._slot, news_id)
+
+    def __iter__(self):
+        return iter(self._state.ids(self._state.received, self._slot).tolist())
+
+    def __len__(self):
+        return int(np.unpackbits(self._state.received[self._slot]).sum())
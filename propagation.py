@@ -0,0 +1,116 @@
+"""
+Registro columnar de propagaciones de noticias.
+
+Cada entrega exitosa de User.deliverNews se guarda como una fila de columnas
+enteras (emisor, receptor, noticia, step, flags) en un buffer circular
+preasignado, en lugar de un dict por entrega. El buffer mantiene en memoria una
+ventana acotada de eventos; opcionalmente, los eventos se vuelcan en orden a un
+archivo binario de solo anexado que se lee después como memoria mapeada
+(np.memmap) para analizar el historial completo de corridas largas.
+
+Emisor y receptor se identifican por su nodo del índice de adyacencia
+(model.adjacency.agents[nodo]).
+"""
+from array import array
+
+import numpy as np
+
+# Bits de la columna flags
+FLAG_TRUE = 1  # la noticia es verdadera
+FLAG_PARTY_A = 2  # la noticia es del partido A
+FLAG_SENDER_SUSCEPTIBLE = 4  # el emisor es Susceptible (si no, Skeptic)
+FLAG_RECEIVER_SUSCEPTIBLE = 8  # el receptor es Susceptible (si no, Skeptic)
+
+COLUMNS = ("sender", "receiver", "news_id", "step", "flags")
+
+# Formato de cada evento en el archivo de volcado
+EVENT_DTYPE = np.dtype([("sender", np.int32), ("receiver", np.int32), ("news_id", np.int32), ("step", np.int32), ("flags", np.int32)])
+
+
+class PropagationLog:
+    """Buffer circular columnar de eventos de propagación con volcado opcional a disco."""
+
+    def __init__(self, capacity: int = 100_000, spill_path: str = None):
+        self.capacity = max(capacity, 1)
+        self.spill_path = spill_path
+        self.columns = {name: array("i", bytes(4 * self.capacity)) for name in COLUMNS}
+        self.total = 0  # eventos registrados desde el inicio
+        self.spilled = 0  # eventos ya escritos en el archivo de volcado
+        self.step = 0
+        self.step_start = 0  # primer evento del step actual
+        if spill_path is not None:
+            # Archivo nuevo por corrida
+            open(spill_path, "wb").close()
+
+    def begin_step(self, step: int):
+        """Marca el inicio de un step: los eventos siguientes forman su tramo."""
+        self.step = step
+        self.step_start = self.total
+
+    def append(self, sender: int, receiver: int, news_id: int, flags: int):
+        if self.spill_path is not None and self.total - self.spilled == self.capacity:
+            self.flush()
+        i = self.total % self.capacity
+        columns = self.columns
+        columns["sender"][i] = sender
+        columns["receiver"][i] = receiver
+        columns["news_id"][i] = news_id
+        columns["step"][i] = self.step
+        columns["flags"][i] = flags
+        self.total += 1
+
+    def window(self, start: int) -> dict:
+        """Eventos desde el índice global `start` (o desde el más antiguo aún en memoria) hasta el último."""
+        start = max(start, self.total - self.capacity, 0)
+        positions = np.arange(start, self.total) % self.capacity
+        return {name: np.frombuffer(column, dtype=np.int32)[positions] for name, column in self.columns.items()}
+
+    def current_step(self) -> dict:
+        """Columnas de los eventos del step actual."""
+        return self.window(self.step_start)
+
+    def __len__(self):
+        """Eventos disponibles en memoria."""
+        return min(self.total, self.capacity)
+
+    def flush(self):
+        """Anexa al archivo de volcado los eventos que aún no se escribieron."""
+        if self.spill_path is None or self.spilled == self.total:
+            return
+        pending = self.window(self.spilled)
+        records = np.empty(len(pending["sender"]), dtype=EVENT_DTYPE)
+        for name in COLUMNS:
+            records[name] = pending[name]
+        with open(self.spill_path, "ab") as f:
+            records.tofile(f)
+        self.spilled = self.total
+
+    def history(self) -> np.memmap:
+        """Historial completo del archivo de volcado como arreglo estructurado mapeado en memoria."""
+        if self.spill_path is None:
+            raise ValueError("El registro no tiene archivo de volcado (spill_path)")
+        self.flush()
+        if self.spilled == 0:
+            return np.empty(0, dtype=EVENT_DTYPE)
+        return np.memmap(self.spill_path, dtype=EVENT_DTYPE, mode="r")
+
+    def records(self, agents, columns: dict = None) -> list:
+        """
+        Eventos (por defecto los del step actual) como lista de dicts con las claves del
+        antiguo model.news_propagation. `agents` es la lista de agentes por nodo.
+        """
+        columns = columns if columns is not None else self.current_step()
+        result = []
+        for sender, receiver, news_id, flags in zip(columns["sender"].tolist(), columns["receiver"].tolist(), columns["news_id"].tolist(), columns["flags"].tolist()):
+            result.append(
+                {
+                    "sender_id": agents[sender].id,
+                    "sender_type": "Susceptible" if flags & FLAG_SENDER_SUSCEPTIBLE else "Skeptic",
+                    "receiver_id": agents[receiver].id,
+                    "receiver_type": "Susceptible" if flags & FLAG_RECEIVER_SUSCEPTIBLE else "Skeptic",
+                    "news_id": news_id,
+                    "news_party": "A" if flags & FLAG_PARTY_A else "B",
+                    "news_veracity": bool(flags & FLAG_TRUE),
+                }
+            )
+        return result
@@ -0,0 +1,266 @@
+"""
+Registro columnar de las corridas, en memoria o en archivos .npy mapeados a memoria.
+
+Reemplaza al DataCollector de los modelos cuando se pasa `recorder` (True o un dict
+con las opciones de Recorder). Los reporters del modelo se guardan en columnas NumPy
+preasignadas, una por reporter, en lugar de listas de filas de Python; las columnas
+crecen al doble cuando se llenan. `every` controla el muestreo: solo se registran los
+steps múltiplos de `every` (el step 0 es la colecta de la inicialización).
+
+Con `agent_every` se guardan además snapshots por usuario cada `agent_every` steps:
+percepción hacia A y B, credibilidad y tipo (0 = Skeptic, 1 = Susceptible), en
+matrices (snapshots x usuarios). Con `path` todas las columnas son archivos .npy en
+ese directorio, abiertos con np.lib.format.open_memmap, así que las trayectorias
+completas de corridas largas viven en disco y no en RAM. close() escribe el índice
+recorder.json y Recorder.open(path) vuelve a abrir un registro para leerlo.
+
+Recorder expone la misma interfaz de lectura que DataCollector (model_vars,
+get_model_vars_dataframe, get_agent_vars_dataframe), con el step registrado como índice.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from mesa.datacollection import DataCollector
+
+# Campos de los snapshots por usuario
+AGENT_FIELDS = {"perception_a": np.float64, "perception_b": np.float64, "credibility": np.float64, "kind": np.int8}
+KIND_NAMES = ("Skeptic", "Susceptible")
+
+INDEX_FILE = "recorder.json"
+
+
+class Column:
+    """Arreglo de filas que crece al doble al llenarse, en memoria o en un .npy mapeado."""
+
+    def __init__(self, dtype, shape=(), capacity: int = 1024, path: str = None):
+        self.dtype = np.dtype(dtype)
+        self.shape = tuple(shape)
+        self.path = path
+        self.size = 0
+        self.data = self._allocate(max(capacity, 1))
+
+    @classmethod
+    def load(cls, path: str, size: int):
+        """Abre un .npy escrito por Column en modo de solo lectura."""
+        column = cls.__new__(cls)
+        column.path = path
+        column.data = np.load(path, mmap_mode="r")
+        column.dtype, column.shape, column.size = column.data.dtype, column.data.shape[1:], size
+        return column
+
+    def append(self, value):
+        if self.size == len(self.data):
+            self._grow(2 * len(self.data))
+        self.data[self.size] = value
+        self.size += 1
+
+    def extend(self, values):
+        """Agrega varias filas de una vez."""
+        n = len(values)
+        if self.size + n > len(self.data):
+            self._grow(max(2 * len(self.data), self.size + n))
+        self.data[self.size : self.size + n] = values
+        self.size += n
+
+    def view(self) -> np.ndarray:
+        """Filas escritas (vista, sin copiar)."""
+        return self.data[: self.size]
+
+    def flush(self):
+        if isinstance(self.data, np.memmap):
+            self.data.flush()
+
+    def _allocate(self, capacity: int, path: str = None):
+        path = path or self.path
+        if path is None:
+            return np.zeros((capacity,) + self.shape, dtype=self.dtype)
+        return np.lib.format.open_memmap(path, mode="w+", dtype=self.dtype, shape=(capacity,) + self.shape)
+
+    def _grow(self, capacity: int):
+        if self.path is None:
+            data = self._allocate(capacity)
+            data[: self.size] = self.data[: self.size]
+            self.data = data
+            return
+        # En disco: archivo nuevo más grande que reemplaza al anterior
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        data = self._allocate(capacity, tmp_path)
+        data[: self.size] = self.data[: self.size]
+        data.flush()
+        del data
+        self.data = None
+        os.replace(tmp_path, self.path)
+        self.data = np.lib.format.open_memmap(self.path, mode="r+")
+
+
+class Recorder:
+    """
+    Registro columnar de los reporters del modelo y, opcionalmente, de snapshots por
+    usuario. `capacity` es el número de filas preasignadas (se duplica si hace falta).
+    """
+
+    def __init__(self, model_reporters: dict, path: str = None, every: int = 1, agent_every: int = None, capacity: int = 1024):
+        self.model_reporters = dict(model_reporters)
+        self.path = path
+        self.every = max(every, 1)
+        self.agent_every = agent_every
+        self.capacity = capacity
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+        self.steps = Column(np.int64, capacity=capacity, path=self._file("steps"))
+        self.columns = {}  # se crean en la primera colecta, con el dtype del primer valor
+        self.agent_steps = Column(np.int64, capacity=self._agent_capacity(), path=self._file("agent_steps")) if agent_every else None
+        self.agent_columns = {}
+        self.agent_ids = None
+
+    @classmethod
+    def open(cls, path: str):
+        """Abre para lectura un registro escrito con `path` (después de close())."""
+        with open(os.path.join(path, INDEX_FILE)) as f:
+            index = json.load(f)
+        recorder = cls.__new__(cls)
+        recorder.model_reporters = {name: None for name in index["columns"]}
+        recorder.path, recorder.every, recorder.agent_every, recorder.capacity = path, index["every"], index["agent_every"], None
+        recorder.steps = Column.load(recorder._file("steps"), index["rows"])
+        recorder.columns = {name: Column.load(recorder._file(f"model_{name}"), index["rows"]) for name in index["columns"]}
+        recorder.agent_steps = Column.load(recorder._file("agent_steps"), index["snapshots"]) if index["agent_every"] else None
+        recorder.agent_columns = {name: Column.load(recorder._file(f"agent_{name}"), index["snapshots"]) for name in index["agent_fields"]}
+        recorder.agent_ids = np.load(recorder._file("agent_ids")) if index["agent_fields"] else None
+        return recorder
+
+    def collect(self, model):
+        step = model.steps
+        if step % self.every == 0:
+            self._append_row(step, {name: reporter(model) for name, reporter in self.model_reporters.items()})
+        if self.agent_every and step % self.agent_every == 0:
+            self._append_agents(step, model.agent_state())
+
+    def repeat_last(self, model):
+        """Registra en el step actual los mismos valores de la última fila (modelo ya convergido)."""
+        if model.steps % self.every == 0 and self.steps.size:
+            self._append_row(model.steps, {name: column.view()[-1] for name, column in self.columns.items()})
+
+    @property
+    def model_vars(self) -> dict:
+        """Columnas registradas por reporter (vistas, sin copiar)."""
+        return {name: column.view() for name, column in self.columns.items()}
+
+    @property
+    def agent_vars(self) -> dict:
+        """Matrices (snapshots x usuarios) de cada campo por usuario (vistas, sin copiar)."""
+        return {name: column.view() for name, column in self.agent_columns.items()}
+
+    def get_model_vars_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(self.model_vars, index=pd.Index(self.steps.view()))
+
+    def get_agent_vars_dataframe(self) -> pd.DataFrame:
+        """Snapshots por usuario en formato largo, índice (Step, AgentID). Copia todo a memoria."""
+        if not self.agent_columns:
+            return pd.DataFrame(columns=["Perception_A", "Perception_B", "Credibility", "Type"])
+        agent_vars = self.agent_vars
+        steps = self.agent_steps.view()
+        index = pd.MultiIndex.from_arrays([np.repeat(steps, len(self.agent_ids)), np.tile(self.agent_ids, len(steps))], names=["Step", "AgentID"])
+        return pd.DataFrame(
+            {
+                "Perception_A": agent_vars["perception_a"].ravel(),
+                "Perception_B": agent_vars["perception_b"].ravel(),
+                "Credibility": agent_vars["credibility"].ravel(),
+                "Type": pd.Categorical.from_codes(agent_vars["kind"].ravel(), KIND_NAMES),
+            },
+            index=index,
+        )
+
+    def agent_trajectory(self, agent: int) -> pd.DataFrame:
+        """Trayectoria de un usuario (columna `agent` de los snapshots) por step."""
+        agent_vars = self.agent_vars
+        return pd.DataFrame(
+            {
+                "Perception_A": agent_vars["perception_a"][:, agent],
+                "Perception_B": agent_vars["perception_b"][:, agent],
+                "Credibility": agent_vars["credibility"][:, agent],
+                "Type": pd.Categorical.from_codes(agent_vars["kind"][:, agent], KIND_NAMES),
+            },
+            index=pd.Index(self.agent_steps.view(), name="Step"),
+        )
+
+    def capture(self) -> dict:
+        """Filas registradas (copias en memoria) para los snapshots del modelo."""
+        return {
+            "steps": self.steps.view().copy(),
+            "columns": {name: column.view().copy() for name, column in self.columns.items()},
+            "agent_steps": self.agent_steps.view().copy() if self.agent_steps is not None else None,
+            "agent_columns": {name: column.view().copy() for name, column in self.agent_columns.items()},
+            "agent_ids": self.agent_ids,
+        }
+
+    def load(self, data: dict):
+        """Vuelve a escribir las filas de capture() en un registro recién creado (restauración de snapshots)."""
+        self.steps.extend(data["steps"])
+        for name, values in data["columns"].items():
+            self.columns[name] = Column(values.dtype, capacity=max(self.capacity, len(values)), path=self._file(f"model_{name}"))
+            self.columns[name].extend(values)
+        if self.agent_steps is None or data["agent_steps"] is None:
+            return
+        self.agent_steps.extend(data["agent_steps"])
+        for name, values in data["agent_columns"].items():
+            self.agent_columns[name] = Column(values.dtype, shape=values.shape[1:], capacity=max(self._agent_capacity(), len(values)), path=self._file(f"agent_{name}"))
+            self.agent_columns[name].extend(values)
+        self.agent_ids = data["agent_ids"]
+        if self.path is not None and self.agent_ids is not None:
+            np.save(self._file("agent_ids"), self.agent_ids)
+
+    def flush(self):
+        for column in [self.steps, self.agent_steps, *self.columns.values(), *self.agent_columns.values()]:
+            if column is not None:
+                column.flush()
+
+    def close(self):
+        """Vuelca las columnas a disco y escribe el índice del registro (solo con `path`)."""
+        if self.path is None:
+            return
+        self.flush()
+        index = {
+            "rows": self.steps.size,
+            "snapshots": self.agent_steps.size if self.agent_steps is not None else 0,
+            "every": self.every,
+            "agent_every": self.agent_every,
+            "columns": list(self.columns),
+            "agent_fields": list(self.agent_columns),
+        }
+        with open(os.path.join(self.path, INDEX_FILE), "w") as f:
+            json.dump(index, f)
+
+    def _append_row(self, step: int, row: dict):
+        if not self.columns:
+            for name, value in row.items():
+                self.columns[name] = Column(np.asarray(value).dtype, capacity=self.capacity, path=self._file(f"model_{name}"))
+        self.steps.append(step)
+        for name, value in row.items():
+            self.columns[name].append(value)
+
+    def _append_agents(self, step: int, state: dict):
+        if not self.agent_columns:
+            n_agents = len(state["kind"])
+            for name, dtype in AGENT_FIELDS.items():
+                self.agent_columns[name] = Column(dtype, shape=(n_agents,), capacity=self._agent_capacity(), path=self._file(f"agent_{name}"))
+            self.agent_ids = np.asarray(state["ids"], dtype=np.int64)
+            if self.path is not None:
+                np.save(self._file("agent_ids"), self.agent_ids)
+        self.agent_steps.append(step)
+        for name in AGENT_FIELDS:
+            self.agent_columns[name].append(state[name])
+
+    def _agent_capacity(self) -> int:
+        return max(self.capacity // max(self.agent_every or 1, 1), 1)
+
+    def _file(self, name: str):
+        return None if self.path is None else os.path.join(self.path, f"{name}.npy")
+
+
+def make_collector(model_reporters: dict, recorder):
+    """DataCollector o Recorder según el parámetro `recorder` de los modelos (None, True o dict de opciones)."""
+    if recorder is None or recorder is False:
+        return DataCollector(model_reporters=model_reporters)
+    return Recorder(model_reporters, **({} if recorder is True else recorder))
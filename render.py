@@ -0,0 +1,133 @@
+"""
+Renderizador incremental del espacio con flechas de propagación.
+
+En lugar de crear una Figure por step con un scatter por agente y un annotate por
+propagación, NetworkRenderer crea la figura una sola vez con artistas persistentes:
+una colección de puntos (un punto por nodo del índice de adyacencia) cuyos colores
+se actualizan en su lugar cuando un agente cambia de tipo, y una LineCollection con
+todas las flechas del step. Si el step tiene más de `max_arrows` propagaciones, se
+agrupan las repetidas (mismo emisor, receptor y color) y, si aún sobran, se dibuja
+una muestra uniforme; el costo de cada cuadro queda acotado por `max_arrows`.
+"""
+import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba
+from matplotlib.figure import Figure
+
+from propagation import FLAG_TRUE
+
+TRUE_COLOR = to_rgba("green", 0.7)
+FALSE_COLOR = to_rgba("red", 0.7)
+
+
+class NetworkRenderer:
+    """
+    Figura persistente de un modelo. `portrayal(agent)` debe retornar un estilo con
+    `color` (y opcionalmente `size`); el color se resuelve una vez por clase de agente
+    y tipo de usuario (`kind`).
+    """
+
+    def __init__(self, model, portrayal, max_arrows: int = 500, figsize=(8, 8)):
+        self.model = model
+        self.portrayal = portrayal
+        self.max_arrows = max_arrows
+        self._class_colors = {}
+
+        self.fig = Figure(figsize=figsize)
+        ax = self.ax = self.fig.add_subplot(111)
+
+        # Grid (se dibuja una sola vez)
+        ax.set_aspect("equal")
+        ax.set_xlim(-0.5, model.width - 0.5)
+        ax.set_ylim(-0.5, model.height - 0.5)
+        ax.set_xticks([x + 0.5 for x in range(model.width)])
+        ax.set_yticks([y + 0.5 for y in range(model.height)])
+        ax.grid(True, which="both", color="lightgray", linewidth=0.5)
+        ax.tick_params(left=False, bottom=False, labelleft=False, labelbottom=False)
+
+        nodes = model.adjacency.agents
+        self._types = [None] * len(nodes)
+        self._colors = np.zeros((len(nodes), 4))
+        sizes = [getattr(portrayal(agent), "size", None) or 50 for agent in nodes]
+        self.points = ax.scatter(np.zeros(len(nodes)), np.zeros(len(nodes)), s=sizes, marker="o", edgecolors="black", zorder=2)
+        self.arrows = LineCollection([], linewidths=2.5, zorder=1)
+        ax.add_collection(self.arrows)
+        # Extremo receptor de cada flecha (indica el sentido de la propagación)
+        self.heads = ax.scatter([], [], s=12, marker="o", zorder=3)
+        self.caption = ax.text(0.01, 0.99, "", transform=ax.transAxes, va="top", fontsize=8)
+
+        self._version = None
+        self._positions = None
+        self.update()
+
+    def _class_color(self, agent, key):
+        color = self._class_colors.get(key)
+        if color is None:
+            portrayal = self.portrayal(agent)
+            color = self._class_colors[key] = to_rgba(getattr(portrayal, "color", None) or "gray")
+        return color
+
+    def _update_positions(self):
+        """Posiciones de los nodos; solo se recalculan si algún agente se movió."""
+        adjacency = self.model.adjacency
+        if adjacency.version == self._version:
+            return
+        if adjacency.grid_cells is not None:
+            # Construcción masiva sin la grilla de Mesa: coordenadas desde las celdas planas (fila * ancho + columna)
+            cells = np.asarray(adjacency.grid_cells, dtype=np.int64)
+            self._positions = np.column_stack(np.divmod(cells, self.model.width)).astype(float)
+            self._positions[cells < 0] = np.nan
+        else:
+            self._positions = np.array([agent.cell.coordinate if agent.cell is not None else (np.nan, np.nan) for agent in adjacency.agents], dtype=float).reshape(-1, 2)
+        self.points.set_offsets(self._positions)
+        self._version = adjacency.version
+
+    def _update_colors(self):
+        """Reescribe solo los colores de los agentes cuyo tipo cambió desde el último cuadro."""
+        changed = False
+        types = self._types
+        for node, agent in enumerate(self.model.adjacency.agents):
+            # Los usuarios cambian de tipo en `kind` sin cambiar de clase
+            key = (type(agent), getattr(agent, "kind", None))
+            if key != types[node]:
+                types[node] = key
+                self._colors[node] = self._class_color(agent, key)
+                changed = True
+        if changed:
+            self.points.set_facecolors(self._colors)
+
+    def _select_arrows(self, sender, receiver, true):
+        """Agrupa y, si hace falta, muestrea las propagaciones para no superar `max_arrows`."""
+        total = len(sender)
+        if total <= self.max_arrows:
+            return sender, receiver, true, total
+        # Agrupar repetidas: una flecha por (emisor, receptor, veracidad)
+        n = len(self._types)
+        keys = np.unique((sender.astype(np.int64) * n + receiver) * 2 + true)
+        sender, receiver, true = keys // 2 // n, keys // 2 % n, (keys % 2).astype(bool)
+        if len(keys) > self.max_arrows:
+            # Muestra uniforme y determinista
+            chosen = np.linspace(0, len(keys) - 1, self.max_arrows).astype(np.int64)
+            sender, receiver, true = sender[chosen], receiver[chosen], true[chosen]
+        return sender, receiver, true, total
+
+    def _update_arrows(self):
+        events = self.model.propagation_log.current_step()
+        sender, receiver, true, total = self._select_arrows(events["sender"], events["receiver"], (events["flags"] & FLAG_TRUE) > 0)
+        start = self._positions[sender]
+        end = self._positions[receiver]
+        # Acortar cada flecha hacia ambos extremos para no tapar los puntos
+        offset = (end - start) * 0.15
+        colors = np.where(true[:, None], TRUE_COLOR, FALSE_COLOR).reshape(-1, 4)
+        self.arrows.set_segments(np.stack([start + offset, end - offset], axis=1))
+        self.arrows.set_color(colors)
+        self.heads.set_offsets(end - offset)
+        self.heads.set_facecolors(colors)
+        self.caption.set_text(f"mostrando {len(sender)} de {total} propagaciones" if len(sender) < total else "")
+
+    def update(self) -> Figure:
+        """Actualiza los artistas al estado actual del modelo y retorna la figura."""
+        self._update_positions()
+        self._update_colors()
+        self._update_arrows()
+        return self.fig
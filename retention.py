@@ -0,0 +1,105 @@
+"""
+Envejecimiento de noticias y memoria acotada por usuario para corridas largas.
+
+Con inyección continua de noticias, los bitsets de recibidas y compartidas, los
+conteos de exposición y la tabla de noticias crecen sin límite. NewsRetention los
+acota de dos formas, aplicadas al compactar (cada `compact_every` steps, al empezar
+el step):
+
+- ttl: una noticia vence `ttl` steps después de creada. La compactación la borra de
+  las filas de todos los usuarios, de las pendientes del modo por eventos, de los
+  envíos postergados de la cascada y de las fuentes, y libera su id. Las noticias
+  nuevas reutilizan esos ids, así que el ancho de las matrices de exposición queda
+  acotado por las noticias vivas.
+- memory: cada usuario recuerda a lo sumo `memory` noticias; los que tienen más
+  olvidan las sobrantes según `eviction`: "oldest" (las creadas antes) o
+  "least_exposed" (las de menos exposiciones). Las olvidadas también salen de sus
+  pendientes del modo por eventos y de sus envíos postergados, así que el usuario no
+  decide ni reenvía lo que ya olvidó. Una noticia olvidada que vuelve a llegarle
+  cuenta como nueva. El tope se aplica entre steps y no durante la cascada:
+  olvidar en medio de ella permitiría que una noticia circule sin fin en el mismo step.
+
+Como los ids se reutilizan, en el registro de propagaciones un id se refiere a la
+noticia que lo ocupaba en ese step.
+"""
+from collections import deque
+
+import numpy as np
+
+EVICTION = ("oldest", "least_exposed")
+
+
+class NewsRetention:
+    """Vencimiento (ttl) y tope de memoria por usuario de las noticias de SocialNetworkModel."""
+
+    def __init__(self, ttl: int = None, memory: int = None, eviction: str = "oldest", compact_every: int = 1):
+        if eviction not in EVICTION:
+            raise ValueError(f"Política de olvido desconocida: {eviction!r} (opciones: {', '.join(EVICTION)})")
+        self.ttl = ttl
+        self.memory = memory
+        self.eviction = eviction
+        self.compact_every = max(compact_every, 1)
+        self.expired = 0  # noticias vencidas y compactadas
+        self.evicted = 0  # noticias olvidadas por el tope de memoria
+
+    def due(self, step: int) -> bool:
+        return step % self.compact_every == 0
+
+    def compact(self, model):
+        """Vence las noticias con ttl cumplido y aplica el tope de memoria de los usuarios."""
+        if self.ttl is not None:
+            self.expire(model)
+        if self.memory is not None:
+            self.evict(model)
+
+    def evict(self, model) -> int:
+        """Cada usuario con más de `memory` noticias olvida las sobrantes. Retorna cuántas se olvidaron."""
+        exposure = model.exposure
+        held = np.unpackbits(exposure.received[: exposure.n_users], axis=1).sum(axis=1)
+        evicted = 0
+        forgotten = {}  # slot -> ids olvidados
+        for slot in np.flatnonzero(held > self.memory).tolist():
+            ids = exposure.ids(exposure.received, slot)
+            if self.eviction == "oldest":
+                order = np.argsort(model.news_table.born[ids], kind="stable")
+            else:
+                order = np.argsort(exposure.exposures[slot, ids], kind="stable")
+            forgotten[slot] = set(ids[order[: len(ids) - self.memory]].tolist())
+            for news_id in forgotten[slot]:
+                exposure.forget(slot, news_id)
+            evicted += len(ids) - self.memory
+        if forgotten:
+            _purge(model, lambda agent, news: news.id in forgotten.get(getattr(agent, "slot", -1), ()))
+        self.evicted += evicted
+        return evicted
+
+    def expire(self, model) -> int:
+        """Quita las noticias vencidas de todas las estructuras del modelo y libera sus ids. Retorna cuántas."""
+        table = model.news_table
+        expired = np.flatnonzero(table.alive[: table.size] & (model.steps - table.born[: table.size] >= self.ttl))
+        if not len(expired):
+            return 0
+
+        model.exposure.clear_news(expired)
+        gone = set(expired.tolist())
+        _purge(model, lambda agent, news: news.id in gone)
+        for source in model.adjacency.agents[model.adjacency.n_users :]:
+            source.initialnews = [news for news in source.initialnews if news.id not in gone]
+
+        if model.cascade_index is not None:
+            model.cascade_index.release(expired)
+        table.release(expired)
+        self.expired += len(expired)
+        return len(expired)
+
+
+def _purge(model, dropped):
+    """Quita de las pendientes del modo por eventos y de los envíos postergados los pares (agente, noticia) con dropped(agent, news)."""
+    if model.active is not None:
+        pending = {}
+        for agent, news_list in model.active.pending.items():
+            kept = [news for news in news_list if not dropped(agent, news)]
+            if kept:
+                pending[agent] = kept
+        model.active.pending = pending
+    model.cascade.deferred = deque(item for item in model.cascade.deferred if not dropped(item[0], item[1]))
@@ -0,0 +1,40 @@
+"""
+Conjunto activo para el modo de activación por eventos de SocialNetworkModel.
+
+En el modo por barrido (el original), cada step recorre a todos los usuarios y
+vuelve a evaluar shareDecision para toda noticia que recibieron alguna vez, así que
+el costo del step crece con la población por el historial. En el modo por eventos,
+cada recepción nueva que el usuario no compartió al recibirla queda pendiente en
+este conjunto; el step siguiente activa solo a los usuarios con noticias
+pendientes, decide una vez por noticia y las descarta. Las regiones sin noticias
+nuevas no cuestan nada y el costo del step sigue a la actividad.
+"""
+
+
+class ActiveSet:
+    """Usuarios con noticias pendientes de decidir, en orden de llegada."""
+
+    def __init__(self):
+        self.pending = {}  # agente -> lista de noticias sin decidir
+
+    def add(self, agent, news):
+        pending = self.pending.get(agent)
+        if pending is None:
+            self.pending[agent] = [news]
+        else:
+            pending.append(news)
+
+    def pop_all(self) -> list:
+        """
+        Retorna los pares (agente, noticias) pendientes y vacía el conjunto. Lo que se
+        reciba mientras se procesan queda para la próxima activación.
+        """
+        items = list(self.pending.items())
+        self.pending = {}
+        return items
+
+    def __len__(self):
+        return len(self.pending)
+
+    def __contains__(self, agent):
+        return agent in self.pending
@@ -0,0 +1,231 @@
+"""
+Pool de modelos por sesión y avance en segundo plano para la interfaz de Solara.
+
+Cada sesión del navegador (kernel de Solara) obtiene del pool su propio ModelSession:
+un modelo con su ABMSimulator y un hilo que lo avanza mientras está en reproducción,
+sin pasar por el hilo de la interfaz. El hilo publica un cuadro como máximo `max_fps`
+veces por segundo; entre cuadros avanza sin dibujar. Después de publicar un cuadro
+queda en pausa hasta que la interfaz lo dibuja (frame_rendered), así la interfaz
+nunca lee un modelo a mitad de un step; una pestaña lenta solo frena su propia
+sesión, y una cerrada la libera. Con `render_timeout` el hilo sigue tras ese número
+de segundos aunque el cuadro no se haya dibujado (para usos sin interfaz), y la
+garantía anterior deja de valer.
+
+El pool construye el modelo de una sesión nueva fuera de su lock: una construcción
+pesada no demora a las demás pestañas.
+
+ModelPool limita el número de sesiones vivas (`max_sessions`): al crear una sesión
+se cierran las que llevan más de `idle_timeout` segundos sin uso y, si el pool sigue
+lleno, acquire retorna None (la interfaz muestra el aviso) en lugar de cerrar la
+sesión de otra pestaña. Una sesión solo se cierra por inactividad o al liberarla, y
+una vez cerrada ignora play, step y reset. Este módulo no depende de Solara.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class ModelSession:
+    """
+    Modelo de una sesión con un hilo de avance. `factory(**params)` debe retornar
+    (model, simulator); los steps se ejecutan con simulator.run_for(1).
+    """
+
+    def __init__(self, factory, params: dict = None, max_fps: float = 10.0, play_interval: float = 0.0, render_timeout: float = None):
+        self.factory = factory
+        self.params = dict(params or {})
+        self.max_fps = max_fps
+        self.play_interval = play_interval  # segundos de espera entre steps en reproducción
+        self.render_timeout = render_timeout  # None: esperar siempre a que se dibuje el cuadro
+        self.lock = threading.RLock()  # se toma durante cada step y cada reset
+        self.error = None
+        self.last_used = time.monotonic()
+
+        self.frame = 0
+        self._frame_changed = threading.Condition()
+        self._rendered = threading.Event()
+        self._rendered.set()
+        self._published_at = 0.0
+
+        self._playing = threading.Event()
+        self._closed = threading.Event()
+        self._thread = None
+        self.model, self.simulator = factory(**self.params)
+
+    @property
+    def playing(self) -> bool:
+        return self._playing.is_set()
+
+    def play(self):
+        """Empieza a avanzar el modelo en segundo plano (crea el hilo la primera vez)."""
+        self.touch()
+        if self.closed or not self.model.running:
+            return
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=f"ModelSession-{id(self):x}", daemon=True)
+            self._thread.start()
+        self._playing.set()
+
+    def pause(self):
+        self.touch()
+        self._playing.clear()
+
+    def step(self, n: int = 1):
+        """Avanza `n` steps en el hilo que llama (botón Step, con la sesión en pausa) y publica un cuadro."""
+        self.touch()
+        if self.closed:
+            return
+        with self.lock:
+            for _ in range(n):
+                if not self.model.running:
+                    break
+                self.simulator.run_for(1)
+        self._publish()
+
+    def reset(self, params: dict = None):
+        """Reemplaza el modelo por uno nuevo con `params` (o los últimos usados) y publica un cuadro."""
+        self.pause()
+        if self.closed:
+            return
+        with self.lock:
+            if params is not None:
+                self.params = dict(params)
+            self.model, self.simulator = self.factory(**self.params)
+            self.error = None
+        self._publish()
+
+    def wait_frame(self, last: int, timeout: float = None) -> int:
+        """Espera un cuadro posterior a `last` (o `timeout` segundos) y retorna el último publicado."""
+        with self._frame_changed:
+            self._frame_changed.wait_for(lambda: self.frame != last or self._closed.is_set(), timeout)
+            return self.frame
+
+    def frame_rendered(self):
+        """La interfaz terminó de dibujar el último cuadro: el hilo puede seguir avanzando."""
+        self.touch()
+        self._rendered.set()
+
+    def touch(self):
+        self.last_used = time.monotonic()
+
+    def close(self):
+        """Detiene el hilo de avance y despierta a quien espere cuadros."""
+        self._closed.set()
+        self._playing.set()  # despierta al hilo para que termine
+        self._rendered.set()
+        with self._frame_changed:
+            self._frame_changed.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5.0)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed.is_set()
+
+    def _run(self):
+        while True:
+            self._playing.wait()
+            # No avanzar mientras la interfaz dibuja el último cuadro (también los de step y reset)
+            self._rendered.wait(self.render_timeout)
+            if self._closed.is_set():
+                return
+            if not self._playing.is_set():
+                continue
+            try:
+                with self.lock:
+                    self.simulator.run_for(1)
+                    finished = not self.model.running
+            except Exception as e:  # se muestra en la interfaz en lugar de matar el hilo en silencio
+                self.error = f"Error en el step: {e}"
+                finished = True
+            if finished:
+                self._playing.clear()
+            # Cuadro al terminar o si pasó 1 / max_fps desde el anterior
+            if finished or time.monotonic() - self._published_at >= 1.0 / self.max_fps:
+                self._publish()
+            if self.play_interval > 0:
+                self._closed.wait(self.play_interval)
+
+    def _publish(self):
+        self._rendered.clear()
+        self._published_at = time.monotonic()
+        with self._frame_changed:
+            self.frame += 1
+            self._frame_changed.notify_all()
+
+
+class ModelPool:
+    """Sesiones vivas por clave (el id del kernel de Solara), con tope y expiración por inactividad."""
+
+    def __init__(self, factory, max_sessions: int = 8, idle_timeout: float = 1800.0, **session_options):
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.session_options = session_options
+        self.sessions = OrderedDict()  # de la menos a la más usada
+        self.lock = threading.Lock()
+
+    def acquire(self, key, params: dict = None):
+        """
+        Sesión de `key`; la crea (con `params`) si no existe o fue cerrada. Retorna None
+        si el pool está lleno de sesiones en uso (ninguna venció por inactividad).
+        """
+        with self.lock:
+            session = self._alive(key)
+            if session is not None:
+                return session
+            expired = self._expire()
+            full = len(self.sessions) >= self.max_sessions
+        # Los hilos de las sesiones cerradas se esperan fuera del lock del pool
+        for old in expired:
+            old.close()
+        if full:
+            return None
+
+        # El modelo se construye sin el lock; si otro hilo creó la sesión de `key` o llenó el pool, se descarta
+        created = ModelSession(self.factory, params, **self.session_options)
+        with self.lock:
+            session = self._alive(key)
+            if session is None and len(self.sessions) < self.max_sessions:
+                session = self.sessions[key] = created
+        if session is not created:
+            created.close()
+        return session
+
+    def release(self, key):
+        """Cierra y descarta la sesión de `key` (al cerrarse su kernel)."""
+        with self.lock:
+            session = self.sessions.pop(key, None)
+        if session is not None:
+            session.close()
+
+    def evict_idle(self):
+        with self.lock:
+            expired = self._expire()
+        for session in expired:
+            session.close()
+
+    def close(self):
+        with self.lock:
+            sessions, self.sessions = list(self.sessions.values()), OrderedDict()
+        for session in sessions:
+            session.close()
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def _alive(self, key):
+        """Sesión abierta de `key` (marcada como la más usada) o None; descarta la de `key` si está cerrada."""
+        session = self.sessions.get(key)
+        if session is not None and not session.closed:
+            self.sessions.move_to_end(key)
+            session.touch()
+            return session
+        self.sessions.pop(key, None)
+        return None
+
+    def _expire(self) -> list:
+        """Saca del pool (sin cerrarlas) las sesiones cerradas o sin uso por más de `idle_timeout` segundos."""
+        now = time.monotonic()
+        expired = [key for key, session in self.sessions.items() if session.closed or now - session.last_used > self.idle_timeout]
+        return [self.sessions.pop(key) for key in expired]
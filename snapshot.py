@@ -0,0 +1,278 @@
+"""
+Snapshots binarios, restauración y bifurcación (fork) de SocialNetworkModel.
+
+Un snapshot guarda el estado completo del modelo en arreglos: ubicación en la
+grilla (o grafo y nodos del modo de red, o celdas de la construcción masiva), tipo
+actual y clase con que se registró cada agente, partido, percepción y credibilidad,
+la tabla de noticias, los bitsets de exposición, contadores, conversiones
+registradas, envíos postergados de la cascada, noticias pendientes del modo por
+eventos, el historial del DataCollector o del Recorder (con sus opciones), los
+criterios de convergencia y de vencimiento de noticias, el índice de cascadas, los
+calendarios de inyección y el estado de ambos generadores aleatorios (model.random y
+model.rng). Restaurar reconstruye los agentes desde esos arreglos sin repetir la
+inicialización ni los sorteos, así que continuar desde un snapshot da los mismos
+resultados que continuar el modelo original.
+
+fork(model) clona un modelo en ejecución sin deep-copy de sus agentes: captura el
+estado en arreglos y reconstruye un modelo nuevo e independiente a partir de ellos.
+
+No se incluyen el registro de propagaciones (el clon empieza con uno vacío) ni la
+instrumentación acumulada. Los snapshots usan pickle: restaurar solo datos confiables.
+"""
+import copy
+import pickle
+from collections import deque
+
+import numpy as np
+from mesa import Model
+
+from agents import BOT, KIND_OF, USER_TYPES, News, NewsReel, Skeptic, Susceptible
+from instrumentation import LEVELS
+from model import SocialNetworkModel
+from recorder import Recorder
+
+SNAPSHOT_VERSION = 1
+
+# Código de cada clase de agente en los arreglos del snapshot
+TYPES = (Skeptic, Susceptible, BOT, NewsReel)
+TYPE_CODES = {cls: code for code, cls in enumerate(TYPES)}
+
+
+def capture(model: SocialNetworkModel) -> dict:
+    """Estado del modelo como dict de arreglos y escalares (copias, independientes del modelo)."""
+    nodes = model.adjacency.agents
+    n = len(nodes)
+    table = model.news_table
+    exposure = model.exposure
+
+    coords = np.full((n, 2), -1, dtype=np.int32)
+    partido = np.zeros(n, dtype=np.int8)
+    credibility = np.full(n, np.nan)
+    perception = np.zeros((n, 2))
+    slot = np.full(n, -1, dtype=np.int64)
+    initialnews = []
+    for node, agent in enumerate(nodes):
+        if agent.cell is not None:
+            coords[node] = agent.cell.coordinate
+        if isinstance(agent, USER_TYPES):
+            partido[node] = 1 if agent.partido == "A" else -1
+            credibility[node] = agent.credibility
+            perception[node] = (agent.perception["A"], agent.perception["B"])
+            slot[node] = agent.slot
+        else:
+            initialnews.append([news.id for news in agent.initialnews])
+
+    return {
+        "version": SNAPSHOT_VERSION,
+        "config": {
+            "width": model.width,
+            "height": model.height,
+            "max_hops": model.cascade.max_hops,
+            "propagation_window": model.propagation_log.capacity,
+            "instrument": model.instrumentation is not None,
+            "log_level": next(name for name, value in LEVELS.items() if value == model.events.level),
+            "event_driven": model.active is not None,
+            # Criterio de convergencia con su estado (copia: el clon lo sigue por su cuenta)
+            "convergence": copy.deepcopy(model.convergence),
+            "retention": copy.deepcopy(model.retention),
+            # Árboles de las cascadas (copia: el clon los sigue extendiendo por su cuenta)
+            "cascade_index": copy.deepcopy(model.cascade_index),
+            # Calendarios de inyección con sus fases (el inyector solo guarda nodos, no agentes)
+            "injector": copy.deepcopy(model.injector),
+            # Opciones del registro columnar (None: DataCollector de Mesa)
+            "recorder": copy.deepcopy(model._recorder_options),
+        },
+        "converged_at": model.converged_at,
+        "seed": model._seed,
+        "steps": model.steps,
+        "running": model.running,
+        "counters": {
+            name: getattr(model, name)
+            for name in ("true_news_shared", "false_news_shared", "conversions_to_skeptic", "conversions_to_susceptible", "previous_conversions")
+        },
+        # Conversiones registradas desde la última que detectó step (model.converted_agents)
+        "conversions": model.conversions.view(),
+        "random": model.random.getstate(),
+        "rng": model.rng.bit_generator.state,
+        # Agentes por nodo del índice de adyacencia (usuarios primero, luego fuentes)
+        "n_users": model.adjacency.n_users,
+        "kind": np.array([TYPE_CODES[USER_TYPES[agent.kind] if node < model.adjacency.n_users else type(agent)] for node, agent in enumerate(nodes)], dtype=np.int8),
+        # La clase de un agente es la de su registro (las conversiones solo cambian `kind`)
+        "registered": np.array([TYPE_CODES[type(agent)] for agent in nodes], dtype=np.int8),
+        "ids": np.array([agent.id for agent in nodes], dtype=np.int64),
+        "coords": coords,
+        "partido": partido,
+        "credibility": credibility,
+        "perception": perception,
+        "slot": slot,
+        "initialnews": initialnews,
+        # Modo de red: grafo CSR (se comparte entre el modelo y sus forks, no se modifica)
+        "graph": model.graph,
+        "graph_nodes": model.graph_nodes,
+        # Construcción masiva: celdas planas de los agentes mientras no exista la grilla de Mesa
+        "grid_cells": None if model.grid_cells is None else model.grid_cells.copy(),
+        # Tabla de noticias
+        "news_party": table.party[: table.size].copy(),
+        "news_polarity": table.polarity[: table.size].copy(),
+        "news_veracity": table.veracity[: table.size].copy(),
+        "news_credibility": table.credibility[: table.size].copy(),
+        "news_born": table.born[: table.size].copy(),
+        "news_free": list(table.free),
+        "news_issued": table.issued,
+        # Estado de exposición
+        "exposure": {
+            "n_users": exposure.n_users,
+            "capacity": exposure.capacity,
+            "row_bytes": exposure.row_bytes,
+            "received": bytes(exposure._received),
+            "shared": bytes(exposure._shared),
+            "exposures": exposure._exposures.tobytes(),
+        },
+        "perception_stats": {
+            "count": {cls.__name__: value for cls, value in model.perception_stats.count.items()},
+            "sum": {cls.__name__: dict(value) for cls, value in model.perception_stats.sum.items()},
+        },
+        "deferred": [(agent.node, news.id, sender) for agent, news, sender in model.cascade.deferred],
+        "active": [] if model.active is None else [(agent.node, [news.id for news in pending]) for agent, pending in model.active.pending.items()],
+        # Historial de reporters: filas del Recorder (con sus snapshots por usuario) o listas del DataCollector
+        "recorder": model.datacollector.capture() if isinstance(model.datacollector, Recorder) else None,
+        "model_vars": None if isinstance(model.datacollector, Recorder) else {name: list(values) for name, values in model.datacollector.model_vars.items()},
+    }
+
+
+def snapshot(model: SocialNetworkModel) -> bytes:
+    """Snapshot binario compacto del modelo."""
+    return pickle.dumps(capture(model), protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def restore(data: bytes, simulator=None, recorder=None) -> SocialNetworkModel:
+    """Reconstruye un modelo a partir de un snapshot de `snapshot()`."""
+    return build(pickle.loads(data), simulator=simulator, recorder=recorder)
+
+
+def fork(model: SocialNetworkModel, simulator=None, recorder=None) -> SocialNetworkModel:
+    """Clon independiente de un modelo en ejecución, listo para seguir con otra intervención."""
+    return build(capture(model), simulator=simulator, recorder=recorder)
+
+
+def build(state: dict, simulator=None, recorder=None) -> SocialNetworkModel:
+    """
+    Construye un modelo desde el estado capturado por `capture()`. `recorder` reemplaza
+    las opciones guardadas del registro; sin él, un Recorder con `path` se reconstruye en
+    memoria (volver a abrir los .npy del original los truncaría mientras este los usa).
+    """
+    if state["version"] != SNAPSHOT_VERSION:
+        raise ValueError(f"Versión de snapshot no soportada: {state['version']}")
+    config = state["config"]
+    n_news = len(state["news_party"])
+    n_users = state["n_users"]
+
+    model = SocialNetworkModel.__new__(SocialNetworkModel)
+    Model.__init__(model, seed=state["seed"])
+    model._setup(
+        simulator,
+        config["width"],
+        config["height"],
+        n_users,
+        n_news,
+        config["max_hops"],
+        config["propagation_window"],
+        None,
+        config["instrument"],
+        config["log_level"],
+        config["event_driven"],
+        convergence=copy.deepcopy(config.get("convergence")),
+        retention=copy.deepcopy(config.get("retention")),
+        recorder=recorder if recorder is not None else _in_memory(config.get("recorder")),
+        cascade_index=copy.deepcopy(config.get("cascade_index")),
+        injector=copy.deepcopy(config.get("injector")),
+    )
+
+    # Noticias con los mismos ids (filas de la tabla)
+    for news_id in range(n_news):
+        model.news_table.add(
+            News(
+                id=news_id,
+                party="A" if state["news_party"][news_id] > 0 else "B",
+                polarity=int(state["news_polarity"][news_id]),
+                veracity=bool(state["news_veracity"][news_id]),
+                credibility=float(state["news_credibility"][news_id]),
+            ),
+            born=int(state["news_born"][news_id]) if "news_born" in state else 0,
+        )
+    # Ids libres (noticias vencidas): se liberan igual que en el original
+    model.news_table.release(state.get("news_free", []))
+    model.news_table.issued = state.get("news_issued", n_news)
+    items = model.news_table.items
+
+    # Agentes en orden de nodo, registrados con su clase original (conserva el orden de
+    # agents_by_type y los unique_id); los usuarios toman luego su tipo actual (kind)
+    initialnews = iter(state["initialnews"])
+    for node in range(len(state["kind"])):
+        registered = TYPES[state["registered"][node]]
+        x, y = state["coords"][node].tolist()
+        cell = model.grid[(x, y)] if x >= 0 else None
+        agent_id = int(state["ids"][node])
+        if node < n_users:
+            agent = registered(
+                model,
+                agent_id,
+                partido="A" if state["partido"][node] > 0 else "B",
+                credibility=float(state["credibility"][node]),
+                perception={"A": float(state["perception"][node, 0]), "B": float(state["perception"][node, 1])},
+                cell=cell,
+            )
+            agent.slot = int(state["slot"][node])
+        else:
+            agent = registered(model, id=agent_id, initialnews=[items[news_id] for news_id in next(initialnews)], cell=cell)
+        if node < n_users:
+            agent.kind = KIND_OF[TYPES[state["kind"][node]]]
+
+    model.graph, model.graph_nodes = state["graph"], state["graph_nodes"]
+    model.grid_cells = state.get("grid_cells")
+    model._index_agents()
+    model._setup_collector()
+    if isinstance(model.datacollector, Recorder):
+        if state.get("recorder") is not None:
+            model.datacollector.load(state["recorder"])
+    elif state["model_vars"] is not None:
+        model.datacollector.model_vars = {name: list(values) for name, values in state["model_vars"].items()}
+
+    # Estado de exposición, estadísticas y contadores
+    exposure = model.exposure
+    saved = state["exposure"]
+    exposure.n_users, exposure.capacity, exposure.row_bytes = saved["n_users"], saved["capacity"], saved["row_bytes"]
+    exposure._received = bytearray(saved["received"])
+    exposure._shared = bytearray(saved["shared"])
+    exposure._exposures = type(exposure._exposures)("H", saved["exposures"])
+
+    by_name = {cls.__name__: cls for cls in USER_TYPES}
+    model.perception_stats.count = {by_name[name]: value for name, value in state["perception_stats"]["count"].items()}
+    model.perception_stats.sum = {by_name[name]: dict(value) for name, value in state["perception_stats"]["sum"].items()}
+
+    for name, value in state["counters"].items():
+        setattr(model, name, value)
+    for node, kind, perception, credibility, step in zip(*(state.get("conversions", {}).get(name, ()) for name in ("node", "kind", "perception", "credibility", "step"))):
+        model.conversions.append(int(step), int(node), int(kind), float(perception), float(credibility))
+    model.steps = state["steps"]
+    model.running = state["running"]
+    model.converged_at = state.get("converged_at")
+
+    nodes = model.adjacency.agents
+    model.cascade.deferred = deque((nodes[node], items[news_id], sender) for node, news_id, sender in state["deferred"])
+    if model.active is not None:
+        for node, pending in state["active"]:
+            for news_id in pending:
+                model.active.add(nodes[node], items[news_id])
+
+    # Generadores aleatorios al final: la reconstrucción no debe consumir sorteos
+    model.random.setstate(state["random"])
+    model.rng.bit_generator.state = state["rng"]
+    return model
+
+
+def _in_memory(options):
+    """Opciones del Recorder sin `path` (True, None y dicts sin `path` quedan igual)."""
+    if isinstance(options, dict) and options.get("path") is not None:
+        return {**options, "path": None}
+    return copy.deepcopy(options)
@@ -0,0 +1,36 @@
+class PerceptionStats:
+    """
+    Sumas y conteos de percepción por tipo de usuario (Skeptic/Susceptible),
+    mantenidos incrementalmente en updatePerception y convertTo.
+    Permite que los reporters del DataCollector respondan en O(1).
+    """
+
+    def __init__(self, types, parties=("A", "B")):
+        self.count = {user_type: 0 for user_type in types}
+        self.sum = {user_type: {party: 0.0 for party in parties} for user_type in types}
+
+    def add(self, user_type, perception: dict):
+        """Registra un usuario nuevo del tipo dado con su percepción actual."""
+        self.count[user_type] += 1
+        sums = self.sum[user_type]
+        for party, value in perception.items():
+            sums[party] += value
+
+    def remove(self, user_type, perception: dict):
+        self.count[user_type] -= 1
+        sums = self.sum[user_type]
+        for party, value in perception.items():
+            sums[party] -= value
+
+    def move(self, old_type, new_type, perception: dict):
+        """Traspasa un usuario convertido de un tipo a otro."""
+        self.remove(old_type, perception)
+        self.add(new_type, perception)
+
+    def update(self, user_type, party: str, old: float, new: float):
+        """Registra el cambio de percepción de un usuario hacia un partido."""
+        self.sum[user_type][party] += new - old
+
+    def mean(self, user_type, party: str) -> float:
+        count = self.count[user_type]
+        return self.sum[user_type][party] / count if count else 0.0
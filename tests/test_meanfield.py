@@ -0,0 +1,40 @@
+import numpy as np
+
+from benchmark import scenario_params
+from meanfield import MeanFieldSocialNetworkModel
+from vectorized import VectorizedSocialNetworkModel
+
+
+def _shared(engine, params, seeds, steps):
+    """TrueNewsShared y FalseNewsShared al final de la corrida, promediados sobre las semillas."""
+    rows = []
+    for seed in seeds:
+        model = engine(seed=seed, log_level="warning", **params)
+        for _ in range(steps):
+            model.step()
+        rows.append((model.true_news_shared, model.false_news_shared))
+    return np.mean(rows, axis=0)
+
+
+def test_shares_follow_vectorized_below_percolation():
+    # Grilla por defecto: densidad 0.35, debajo del umbral de percolación de Moore (~0.41)
+    exact = _shared(VectorizedSocialNetworkModel, {}, range(20), 15)
+    approx = _shared(MeanFieldSocialNetworkModel, {}, range(20), 15)
+    np.testing.assert_allclose(approx, exact, rtol=0.15)
+
+
+def test_true_news_shares_follow_vectorized_above_percolation():
+    params = scenario_params(30, 0.7, "susceptible")
+    exact = _shared(VectorizedSocialNetworkModel, params, range(5), 8)
+    approx = _shared(MeanFieldSocialNetworkModel, params, range(5), 8)
+    np.testing.assert_allclose(approx[0], exact[0], rtol=0.1)
+
+
+def test_state_does_not_grow_with_grid():
+    # 200x200 con 1000 fuentes: el estado es por (cohorte, noticia) y por (cohorte, bin de percepción)
+    model = MeanFieldSocialNetworkModel(seed=0, log_level="warning", **dict(scenario_params(200, 0.35, "susceptible"), n_bots=500, n_newsreel=500))
+    model.step()
+    model.step()
+    assert model.received.shape == (len(model.mass), 1000)
+    assert max(value.nbytes for value in vars(model).values() if isinstance(value, np.ndarray)) < 4 * 2**20
+    assert model.true_news_shared > 0
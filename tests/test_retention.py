@@ -0,0 +1,31 @@
+from agents import User
+from model import SocialNetworkModel
+
+
+def _queued(model):
+    """Pares (usuario, noticia) pendientes del modo por eventos y postergados por la cascada."""
+    pairs = [(agent, news) for agent, news_list in model.active.pending.items() for news in news_list]
+    pairs += [(agent, news) for agent, news, _ in model.cascade.deferred if isinstance(agent, User)]
+    return pairs
+
+
+def test_memory_cap_purges_forgotten_news_in_event_driven_mode():
+    model = SocialNetworkModel(
+        seed=3,
+        log_level="warning",
+        event_driven=True,
+        max_hops=2,
+        news_memory=2,
+        n_bots=10,
+        n_newsreel=10,
+        injection={"bots": {"rate": 0.5}, "newsreels": {"rate": 0.5}},
+    )
+    exposure = model.exposure
+    evicted = 0
+    for _ in range(15):
+        evicted += model.retention.evict(model)
+        # Nada de lo que un usuario olvidó queda por decidir o por reenviar
+        for agent, news in _queued(model):
+            assert exposure.has_received(agent.slot, news.id)
+        model.step()
+    assert evicted > 0
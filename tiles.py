@@ -0,0 +1,405 @@
+"""
+Descomposición espacial del motor vectorizado entre procesos para toros muy grandes.
+
+La grilla se divide en tiles (bandas de filas por bandas de columnas) y cada tile
+pertenece a un proceso trabajador. El trabajador guarda el estado de los usuarios de
+sus celdas en un TileModel, que es un VectorizedSocialNetworkModel restringido a esas
+filas. Las vecindades que cruzan el borde del tile apuntan a usuarios fantasma (halo)
+de otros tiles.
+
+Una cascada puede cruzar bordes varias veces en un mismo step, así que el halo se
+intercambia al final de cada ola. Cada trabajador escribe en su buzón de memoria
+compartida las entregas dirigidas a usuarios de otros tiles. Después todos esperan en
+una barrera y cada uno lee lo que le enviaron. Las olas avanzan en sincronía y la
+cascada termina cuando ningún tile tiene emisores. El proceso principal reparte las
+órdenes y reduce los reporters parciales (sumas, conteos y máximos) para el DataCollector.
+
+Los sorteos usan rng_mode="counter" (ver vectorized.counter_uniform). Cada tile procesa
+los pares de una ola en el mismo orden canónico que un solo proceso. Por eso, con la
+misma semilla, TiledVectorizedModel reproduce a
+VectorizedSocialNetworkModel(rng_mode="counter"): mismos tipos, percepciones y
+contadores. Los promedios de percepción pueden diferir en el último bit por el orden
+de la suma.
+"""
+import multiprocessing
+import traceback
+import weakref
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+from mesa import Model
+from mesa.datacollection import DataCollector
+from mesa.experimental.devs import ABMSimulator
+
+from adjacency import expand_neighbours
+from instrumentation import EventSink
+from vectorized import PERCEPTION_A, SKEPTIC, SUSCEPTIBLE, VectorizedSocialNetworkModel, counter_uniform, draw_population
+
+# Reporters parciales de cada tile, en este orden
+PARTIALS = (
+    "skeptics",
+    "skeptic_perception",
+    "susceptibles",
+    "susceptible_perception",
+    "true_news_shared",
+    "false_news_shared",
+    "conversions_to_skeptic",
+    "conversions_to_susceptible",
+    "cascade_size",
+    "cascade_depth",
+)
+
+
+def tile_owner(cells, width: int, height: int, tiles) -> np.ndarray:
+    """Tile dueño de cada celda: `tiles` = (bandas de filas, bandas de columnas)."""
+    tiles_y, tiles_x = tiles
+    rows, cols = np.divmod(np.asarray(cells, dtype=np.int64), width)
+    return (rows * tiles_y // height) * tiles_x + cols * tiles_x // width
+
+
+def split_population(population: dict, owner: np.ndarray, n_tiles: int) -> list:
+    """
+    Reparte una población de `draw_population` entre tiles. En cada tile los usuarios
+    quedan en orden de índice global y los vecinos de otros tiles pasan a ser
+    fantasmas con índice local >= número de usuarios del tile.
+    """
+    members = [np.flatnonzero(owner == tile) for tile in range(n_tiles)]
+    local_index = np.empty(len(owner), dtype=np.int64)
+    for users in members:
+        local_index[users] = np.arange(len(users))
+
+    parts = []
+    for tile, users in enumerate(members):
+        pos, neighbours = expand_neighbours(population["indptr"], population["indices"], users)
+        remote = owner[neighbours] != tile
+        ghosts = np.unique(neighbours[remote])
+        indptr = np.zeros(len(users) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pos, minlength=len(users)), out=indptr[1:])
+        part = {name: population[name][users] for name in ("kind", "party", "credibility")}
+        part.update({name: population[name] for name in ("news_veracity", "news_party", "news_polarity", "news_credibility", "news_columns")})
+        part.update(
+            indptr=indptr,
+            indices=np.where(remote, len(users) + np.searchsorted(ghosts, neighbours), local_index[neighbours]),
+            source_indptr=np.zeros(1, dtype=np.int64),
+            source_indices=np.empty(0, dtype=np.int64),
+            users=users,
+            ghost_owner=owner[ghosts],
+            ghost_local=local_index[ghosts],
+            halo_edges=np.bincount(owner[neighbours[remote]], minlength=n_tiles),
+        )
+        parts.append(part)
+    return parts
+
+
+class Halo:
+    """
+    Buzones de memoria compartida entre tiles. El buzón de cada tile empieza con un
+    conteo por tile destino, seguido de una región (receptores locales del destino y
+    noticias) por destino. Su capacidad es el número de aristas hacia ese tile por las
+    columnas de noticias, con un factor 2 porque un envío postergado puede coincidir con
+    una nueva decisión del mismo par.
+    """
+
+    def __init__(self, index: int, names: list, layout: list, control: str, barrier):
+        self.index = index
+        self.barrier = barrier
+        self.layout = layout  # layout[origen][destino] = (inicio, capacidad)
+        self._blocks = [SharedMemory(name=name) for name in names + [control]]
+        self.boxes = [np.ndarray(block.size // 8, dtype=np.int64, buffer=block.buf) for block in self._blocks[:-1]]
+        self.control = np.ndarray(len(names), dtype=np.int64, buffer=self._blocks[-1].buf)
+
+    def total(self, count: int) -> int:
+        """Suma entre tiles de `count` (todos los tiles deben llamarla en la misma ola)."""
+        self.control[self.index] = count
+        self.barrier.wait()
+        return int(self.control.sum())
+
+    def exchange(self, owners, receivers, news):
+        """Envía a cada tile `owners[i]` el par (receivers[i], news[i]) y retorna los pares recibidos."""
+        n_tiles = len(self.boxes)
+        box = self.boxes[self.index]
+        order = np.argsort(owners, kind="stable")
+        receivers, news = receivers[order], news[order]
+        counts = np.bincount(owners, minlength=n_tiles)
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        for tile in np.flatnonzero(counts).tolist():
+            start, capacity = self.layout[self.index][tile]
+            if counts[tile] > capacity:
+                raise RuntimeError(f"Buzón del tile {self.index} hacia {tile} desbordado ({counts[tile]} > {capacity})")
+            segment = slice(offsets[tile], offsets[tile + 1])
+            box[start : start + counts[tile]] = receivers[segment]
+            box[start + capacity : start + capacity + counts[tile]] = news[segment]
+        box[:n_tiles] = counts
+        self.barrier.wait()
+
+        inbound_receivers, inbound_news = [], []
+        for tile, other in enumerate(self.boxes):
+            count = int(other[self.index])
+            if tile == self.index or not count:
+                continue
+            start, capacity = self.layout[tile][self.index]
+            inbound_receivers.append(other[start : start + count].copy())
+            inbound_news.append(other[start + capacity : start + capacity + count].copy())
+        if not inbound_receivers:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(inbound_receivers), np.concatenate(inbound_news)
+
+    def close(self):
+        self.boxes = self.control = None
+        for block in self._blocks:
+            block.close()
+
+
+class TileModel(VectorizedSocialNetworkModel):
+    """Usuarios de un tile. Las olas de la cascada se sincronizan con los demás tiles a través del halo."""
+
+    def __init__(self, part: dict, counter_key: int, max_hops, halo: Halo):
+        Model.__init__(self, seed=0)
+        self._setup(None, 0, 0, max_hops, "quiet", False)
+        self._load(part)
+        self.counter_key = counter_key
+        self.users = part["users"]  # índice global de cada usuario local
+        self.ghost_owner = part["ghost_owner"]
+        self.ghost_local = part["ghost_local"]
+        self.halo = halo
+
+    def collect(self):
+        # Los reporters se reducen en el proceso principal
+        pass
+
+    def _random(self, users, news):
+        return counter_uniform(self.counter_key, self.steps, self.users[users], news)
+
+    def seed_sources(self, receivers, news):
+        """Primera ola de la inicialización: pares (receptor local, noticia) que entregan las fuentes vecinas."""
+        self._count_wave(receivers, 1)
+        senders, shared = self._receive(receivers, news)
+        self._propagate(senders, shared, depth=1)
+
+    def _propagate(self, senders, news, depth=0):
+        while self.halo.total(len(senders)):
+            if self.max_hops is not None and depth >= self.max_hops:
+                self._deferred = (senders, news)
+                return
+            depth += 1
+            senders, news = self._wave(senders, news, depth)
+
+    def _wave(self, senders, news, depth):
+        pos, receivers = expand_neighbours(self.indptr, self.indices, senders)
+        news_sent = news[pos]
+        n_users, n_columns = self.received.shape
+
+        # Entregas a fantasmas: van al buzón de su tile; llegan las de otros tiles a usuarios propios
+        ghost = receivers >= n_users
+        ghosts = receivers[ghost] - n_users
+        inbound_receivers, inbound_news = self.halo.exchange(self.ghost_owner[ghosts], self.ghost_local[ghosts], news_sent[ghost])
+        receivers = np.concatenate([receivers[~ghost], inbound_receivers])
+        news_sent = np.concatenate([news_sent[~ghost], inbound_news])
+
+        # Mismo orden canónico (receptor, noticia) y misma deduplicación que en un solo proceso
+        fresh = ~self.received[receivers, news_sent]
+        receivers, news_sent = np.divmod(np.unique(receivers[fresh] * n_columns + news_sent[fresh]), n_columns)
+        self._count_wave(receivers, depth)
+        return self._receive(receivers, news_sent)
+
+    def partials(self) -> list:
+        skeptic = self.kind == SKEPTIC
+        susceptible = self.kind == SUSCEPTIBLE
+        return [
+            int(skeptic.sum()),
+            float(self.perception[skeptic, PERCEPTION_A].sum()),
+            int(susceptible.sum()),
+            float(self.perception[susceptible, PERCEPTION_A].sum()),
+            self.true_news_shared,
+            self.false_news_shared,
+            self.conversions_to_skeptic,
+            self.conversions_to_susceptible,
+            self.cascade_size,
+            self.cascade_depth,
+        ]
+
+    def state(self) -> dict:
+        return {"users": self.users, "kind": self.kind, "credibility": self.credibility, "perception": self.perception, "received": self.received, "shared": self.shared}
+
+
+def _serve(conn, part, index, counter_key, max_hops, names, layout, control, barrier):
+    """Bucle del proceso trabajador de un tile: ejecuta las órdenes del proceso principal."""
+    halo = Halo(index, names, layout, control, barrier)
+    try:
+        model = TileModel(part, counter_key, max_hops, halo)
+        del part
+        while True:
+            command, payload = conn.recv()
+            if command == "close":
+                break
+            if command == "seed":
+                model.seed_sources(*payload)
+            elif command == "step":
+                model.step()
+            conn.send(("state", model.state()) if command == "state" else ("ok", model.partials()))
+    except Exception:
+        # Libera a los demás tiles si quedaron esperando en la barrera
+        barrier.abort()
+        conn.send(("error", traceback.format_exc()))
+    finally:
+        halo.close()
+        conn.close()
+
+
+def _shutdown(pipes, workers, blocks):
+    for pipe in pipes:
+        try:
+            pipe.send(("close", None))
+        except (BrokenPipeError, OSError):
+            pass
+    for worker in workers:
+        worker.join(timeout=5)
+        if worker.is_alive():
+            worker.terminate()
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+
+class TiledVectorizedModel(Model):
+    """
+    Motor vectorizado repartido en tiles de la grilla, un proceso por tile. Reporta las
+    mismas columnas del DataCollector que VectorizedSocialNetworkModel. `tiles` es un
+    entero (bandas de filas) o un par (bandas de filas, bandas de columnas). Los
+    procesos se cierran con close(), al salir de un bloque `with` o al liberar el modelo.
+    """
+
+    def __init__(
+        self,
+        width=20,
+        height=20,
+        n_susceptible=70,
+        n_skeptic=70,
+        n_bots=5,
+        n_newsreel=5,
+        seed=None,
+        simulator: ABMSimulator = None,
+        max_hops=None,
+        log_level="info",
+        tiles=(2, 2),
+    ):
+        super().__init__(seed=seed)
+        # Si no se proporciona simulador, crear uno nuevo
+        if simulator is None:
+            simulator = ABMSimulator()
+        self.simulator = simulator
+        self.simulator.setup(self)
+
+        self.height = height
+        self.width = width
+        self.running = True
+        self.events = EventSink(log_level)
+        # Misma clave y mismos sorteos iniciales que VectorizedSocialNetworkModel(rng_mode="counter")
+        self.counter_key = self.random.getrandbits(64)
+        population = draw_population(self.rng, width, height, n_susceptible, n_skeptic, n_bots, n_newsreel)
+
+        self.tiles = (tiles, 1) if isinstance(tiles, int) else tuple(tiles)
+        if self.tiles[0] > height or self.tiles[1] > width:
+            raise ValueError(f"No se puede dividir una grilla de {width}x{height} en {self.tiles[0]}x{self.tiles[1]} tiles")
+        n_tiles = self.tiles[0] * self.tiles[1]
+        self.owner = tile_owner(population["user_nodes"], width, height, self.tiles)
+        parts = split_population(population, self.owner, n_tiles)
+        self.tile_users = [part["users"] for part in parts]
+
+        # Buzones de halo en memoria compartida: conteos por destino y una región por destino
+        n_columns = population["news_columns"]
+        layout, blocks = [], []
+        for part in parts:
+            capacity = 2 * part["halo_edges"] * n_columns
+            starts = n_tiles + np.concatenate([[0], np.cumsum(2 * capacity)[:-1]])
+            layout.append([(int(start), int(cap)) for start, cap in zip(starts, capacity)])
+            blocks.append(SharedMemory(create=True, size=8 * int(n_tiles + 2 * capacity.sum())))
+        blocks.append(SharedMemory(create=True, size=8 * n_tiles))
+
+        context = multiprocessing.get_context()
+        barrier = context.Barrier(n_tiles)
+        self._pipes, self._workers = [], []
+        names = [block.name for block in blocks[:-1]]
+        for index, part in enumerate(parts):
+            parent, child = context.Pipe()
+            worker = context.Process(target=_serve, args=(child, part, index, self.counter_key, max_hops, names, layout, blocks[-1].name, barrier), daemon=True)
+            worker.start()
+            child.close()
+            self._pipes.append(parent)
+            self._workers.append(worker)
+        self._finalizer = weakref.finalize(self, _shutdown, self._pipes, self._workers, blocks)
+
+        self.datacollector = DataCollector(
+            model_reporters={
+                "AvgPerception_Skeptic": lambda m: m.skeptic_perception / m.skeptics if m.skeptics else 0.0,
+                "AvgPerception_Susceptible": lambda m: m.susceptible_perception / m.susceptibles if m.susceptibles else 0.0,
+                "TrueNewsShared": lambda m: m.true_news_shared,
+                "FalseNewsShared": lambda m: m.false_news_shared,
+                "NumSkeptics": lambda m: m.skeptics,
+                "NumSusceptibles": lambda m: m.susceptibles,
+                "ConversionsToSkeptic": lambda m: m.conversions_to_skeptic,
+                "ConversionsToSusceptible": lambda m: m.conversions_to_susceptible,
+                "CascadeDepth": lambda m: m.cascade_depth,
+                "CascadeSize": lambda m: m.cascade_size,
+            }
+        )
+
+        self.events.emit("info", f"\n{'='*60}")
+        self.events.emit("info", f"INICIALIZACIÓN DEL MODELO (motor vectorizado en {n_tiles} tiles)")
+        self.events.emit("info", f"{'='*60}")
+        self.events.emit("info", population["layout"])
+        self.events.emit("info", f"Skeptics: {n_skeptic}")
+        self.events.emit("info", f"Susceptibles: {n_susceptible}")
+        self.events.emit("info", f"BOTs: {n_bots}")
+        self.events.emit("info", f"NewsReels: {n_newsreel}")
+
+        # Inicialización: cada fuente entrega su noticia a sus usuarios vecinos, repartidos por tile
+        news, receivers = expand_neighbours(population["source_indptr"], population["source_indices"], np.arange(n_columns))
+        receiver_tile = self.owner[receivers]
+        payloads = []
+        for tile, users in enumerate(self.tile_users):
+            mine = receiver_tile == tile
+            payloads.append((np.searchsorted(users, receivers[mine]), news[mine]))
+        self._reduce(self._broadcast("seed", payloads))
+        self.datacollector.collect(self)
+
+    def step(self):
+        """Un step en todos los tiles a la vez; luego se reducen los reporters."""
+        self._reduce(self._broadcast("step"))
+        self.datacollector.collect(self)
+
+    def gather(self) -> dict:
+        """Estado de todos los usuarios en orden global (kind, credibility, perception, received, shared)."""
+        states = self._broadcast("state")
+        n_users = len(self.owner)
+        merged = {}
+        for name in ("kind", "credibility", "perception", "received", "shared"):
+            sample = states[0][name]
+            merged[name] = np.empty((n_users,) + sample.shape[1:], dtype=sample.dtype)
+            for state in states:
+                merged[name][state["users"]] = state[name]
+        return merged
+
+    def close(self):
+        """Detiene los procesos de los tiles y libera la memoria compartida."""
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _broadcast(self, command, payloads=None) -> list:
+        for index, pipe in enumerate(self._pipes):
+            pipe.send((command, None if payloads is None else payloads[index]))
+        replies = [pipe.recv() for pipe in self._pipes]
+        errors = [payload for status, payload in replies if status == "error"]
+        if errors:
+            self.close()
+            raise RuntimeError("Falló un proceso de tile:\n" + errors[0])
+        return [payload for _, payload in replies]
+
+    def _reduce(self, partials):
+        for name, values in zip(PARTIALS, zip(*partials)):
+            setattr(self, name, max(values) if name == "cascade_depth" else sum(values))
@@ -0,0 +1,480 @@
+"""
+Motor vectorizado (NumPy) para SocialNetworkModel.
+
+El estado de los usuarios se guarda en arreglos en lugar de un objeto por agente:
+partido (A=+1, B=-1), credibilidad, percepción hacia A y B y el tipo
+(Skeptic/Susceptible). Las reglas de agents.py (computeShareProbability,
+shareDecision, updatePerception y checkConversion) se evalúan en lote sobre todos
+los pares (agente, noticia) pendientes, y la propagación avanza por olas sobre una
+adyacencia CSR de vecinos de Moore en el toro o, con `topology`, de un grafo
+disperso (lista de aristas, mundo pequeño o libre de escala; ver topology.py).
+
+El modelo reporta las mismas columnas del DataCollector que SocialNetworkModel.
+
+Con rng_mode="counter" los sorteos de compartir no salen del generador secuencial
+sino de counter_uniform: cada par (usuario, noticia) sortea un valor que depende solo
+de la clave de la corrida, el step, el usuario y la noticia, no del orden en que se
+evalúan los pares. Así el modelo repartido entre procesos (tiles.py) reproduce
+exactamente al modelo en un solo proceso.
+"""
+import numpy as np
+from mesa import Model
+from mesa.experimental.devs import ABMSimulator
+
+from adjacency import expand_neighbours, graph_neighbours, grid_neighbours
+from convergence import ConvergenceMixin, make_criterion
+from agents import ALPHA, THRESHOLD_TO_SKEPTIC, THRESHOLD_TO_SUSCEPTIBLE, SHARE_WEIGHTS_SKEPTIC, SHARE_WEIGHTS_SUSCEPTIBLE
+from instrumentation import EventSink
+from recorder import make_collector
+from topology import make_topology
+
+# Códigos de tipo de usuario
+SKEPTIC = 0
+SUSCEPTIBLE = 1
+
+# Columnas de la matriz de percepción
+PERCEPTION_A = 0
+PERCEPTION_B = 1
+
+# Tamaño máximo de los lotes temporales (pares de decisión o envíos de una ola)
+CHUNK_SIZE = 1 << 22
+
+# Constantes del mezclador splitmix64 de counter_uniform
+MASK64 = (1 << 64) - 1
+GOLDEN64 = 0x9E3779B97F4A7C15
+
+
+def _mix64(x):
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def counter_uniform(key: int, step: int, users, news) -> np.ndarray:
+    """Uniformes en [0, 1), uno por par (users[i], news[i]), que dependen solo de (key, step, usuario, noticia)."""
+    base = np.uint64((key + step * GOLDEN64) & MASK64)
+    x = _mix64(np.asarray(users, dtype=np.uint64) ^ base)
+    x = _mix64(x ^ (np.asarray(news, dtype=np.uint64) * np.uint64(GOLDEN64)))
+    return (x >> np.uint64(11)).astype(np.float64) * (1.0 / (1 << 53))
+
+
+def draw_population(rng, width, height, n_susceptible, n_skeptic, n_bots, n_newsreel, topology=None, degree=8, rewire=0.1) -> dict:
+    """
+    Sorteos iniciales de una corrida: ubicación de los agentes (celdas de la grilla o
+    nodos del grafo), partido y credibilidad de los usuarios, adyacencias CSR y
+    atributos de las noticias iniciales (una falsa por BOT y una verdadera por NewsReel).
+    """
+    n_users = n_skeptic + n_susceptible
+    total_agents = n_users + n_bots + n_newsreel
+    population = {}
+    if topology is None:
+        n_cells = width * height
+        if total_agents > n_cells:
+            raise ValueError(f"No hay suficientes celdas ({n_cells}) para {total_agents} agentes")
+
+        # Celdas únicas al azar: primero Skeptics, luego Susceptibles, BOTs y NewsReels
+        cells = rng.permutation(n_cells)[:total_agents]
+        population["layout"] = f"Grid: {width}x{height}"
+    else:
+        # Modo de red: los agentes ocupan nodos al azar de un grafo CSR
+        graph = population["graph"] = make_topology(topology, total_agents, rng, degree, rewire)
+        n_cells = len(graph[0]) - 1
+        if total_agents > n_cells:
+            raise ValueError(f"No hay suficientes nodos ({n_cells}) para {total_agents} agentes")
+        cells = rng.permutation(n_cells)[:total_agents]
+        population["layout"] = f"Red: {n_cells} nodos, {len(graph[1]) // 2} aristas"
+    user_cells, source_cells = cells[:n_users], cells[n_users:]
+    population["user_nodes"] = user_cells
+
+    # Estado de los usuarios
+    kind = population["kind"] = np.full(n_users, SUSCEPTIBLE, dtype=np.int8)
+    kind[:n_skeptic] = SKEPTIC
+    population["party"] = rng.choice(np.array([1, -1], dtype=np.int8), n_users)
+    population["credibility"] = np.where(kind == SUSCEPTIBLE, rng.uniform(0.6, 0.9, n_users), rng.uniform(0.1, 0.3, n_users))
+
+    # Adyacencia usuario -> usuarios vecinos y fuente (BOT/NewsReel) -> usuarios vecinos
+    occupant = np.full(n_cells, -1, dtype=np.int64)
+    occupant[user_cells] = np.arange(n_users)
+    if topology is None:
+        population["indptr"], population["indices"] = grid_neighbours(user_cells, occupant, width, height)
+        population["source_indptr"], population["source_indices"] = grid_neighbours(source_cells, occupant, width, height)
+    else:
+        population["indptr"], population["indices"] = graph_neighbours(*graph, user_cells, occupant)
+        population["source_indptr"], population["source_indices"] = graph_neighbours(*graph, source_cells, occupant)
+
+    population.update(draw_news(rng, n_bots, n_newsreel))
+    return population
+
+
+def draw_news(rng, n_bots, n_newsreel) -> dict:
+    """Noticias iniciales: una falsa por BOT y una verdadera por NewsReel (partido A=+1, B=-1)."""
+    n_news = n_bots + n_newsreel
+    veracity = np.arange(n_news) >= n_bots
+    return {
+        "news_columns": n_news,
+        "news_veracity": veracity,
+        "news_party": rng.choice(np.array([1, -1], dtype=np.int8), n_news),
+        "news_polarity": rng.choice(np.array([-1, 1], dtype=np.int8), n_news),
+        "news_credibility": np.where(veracity, rng.uniform(0.7, 0.9, n_news), rng.uniform(0.1, 0.3, n_news)),
+    }
+
+
+class VectorizedSocialNetworkModel(ConvergenceMixin, Model):
+    def __init__(
+        self,
+        width=20,
+        height=20,
+        n_susceptible=70,
+        n_skeptic=70,
+        n_bots=5,
+        n_newsreel=5,
+        seed=None,
+        simulator: ABMSimulator = None,
+        max_hops=None,
+        log_level="info",
+        topology=None,
+        degree=8,
+        rewire=0.1,
+        record_deliveries=True,
+        convergence=None,
+        rng_mode="stream",
+        recorder=None,
+    ):
+        super().__init__(seed=seed)
+        self._setup(simulator, width, height, max_hops, log_level, record_deliveries, convergence, recorder)
+        if rng_mode == "counter":
+            # Clave de los sorteos por contador (de model.random, que el motor no usa para nada más)
+            self.counter_key = self.random.getrandbits(64)
+        elif rng_mode != "stream":
+            raise ValueError(f"rng_mode desconocido: {rng_mode!r} (opciones: stream, counter)")
+
+        population = draw_population(self.rng, width, height, n_susceptible, n_skeptic, n_bots, n_newsreel, topology, degree, rewire)
+        self.topology = topology
+        if topology is None:
+            self.user_cells = population["user_nodes"]
+        else:
+            self.graph = population["graph"]
+            self.user_nodes = population["user_nodes"]
+        self._load(population)
+        self._setup_collector()
+
+        self.events.emit("info", f"\n{'='*60}")
+        self.events.emit("info", "INICIALIZACIÓN DEL MODELO (motor vectorizado)")
+        self.events.emit("info", f"{'='*60}")
+        self.events.emit("info", population["layout"])
+        self.events.emit("info", f"Skeptics: {n_skeptic}")
+        self.events.emit("info", f"Susceptibles: {n_susceptible}")
+        self.events.emit("info", f"BOTs: {n_bots}")
+        self.events.emit("info", f"NewsReels: {n_newsreel}")
+
+        self._seed_sources()
+
+        # Colecta inicial
+        self.collect()
+
+    def collect(self):
+        self.datacollector.collect(self)
+
+    def pending_shares(self) -> int:
+        """Pares (usuario, noticia recibida) que pueden terminar en un envío, más los envíos postergados."""
+        users, columns = np.nonzero(self.received)
+        shareable = (self.kind[users] == SUSCEPTIBLE) | self.news_veracity[self._news_ids(users, columns)]
+        return len(self._deferred[0]) + int(np.count_nonzero(shareable))
+
+    def agent_state(self) -> dict:
+        """Percepción, credibilidad y tipo (0 = Skeptic, 1 = Susceptible) de los usuarios, por fila."""
+        return {
+            "ids": np.arange(len(self.kind)),
+            "perception_a": self.perception[:, PERCEPTION_A],
+            "perception_b": self.perception[:, PERCEPTION_B],
+            "credibility": self.credibility,
+            "kind": self.kind,
+        }
+
+    def perception_totals(self):
+        return self.perception.sum(axis=0)
+
+    def _setup(self, simulator, width, height, max_hops, log_level, record_deliveries, convergence=None, recorder=None):
+        """Atributos del modelo previos a la población (también los usa el ensamble)."""
+        # Si no se proporciona simulador, crear uno nuevo
+        if simulator is None:
+            simulator = ABMSimulator()
+
+        self.simulator = simulator
+        self.simulator.setup(self)
+
+        self.height = height
+        self.width = width
+        self.running = True
+        self.true_news_shared = 0
+        self.false_news_shared = 0
+        self.conversions_to_skeptic = 0
+        self.conversions_to_susceptible = 0
+        self.previous_conversions = 0
+        self.events = EventSink(log_level)
+        # Clave de counter_uniform con rng_mode="counter"; None: sorteos del generador secuencial
+        self.counter_key = None
+        # Criterio de terminación anticipada (ver convergence.py) y step en que se cumplió
+        self.convergence = make_criterion(convergence)
+        self.converged_at = None
+        # Opciones del registro columnar (recorder.py); None: DataCollector de Mesa
+        self._recorder_options = recorder
+
+        # Métricas de cascada del step y envíos postergados por el límite de saltos
+        self.max_hops = max_hops
+        self.cascade_depth = 0
+        self.cascade_size = 0
+        self._deferred = (np.empty(0, np.int64), np.empty(0, np.int64))
+        # Guardar las entregas del step en self.deliveries (en redes grandes puede desactivarse para ahorrar memoria)
+        self.record_deliveries = record_deliveries
+
+    def _load(self, population: dict):
+        """Toma los arreglos de `draw_population` y crea el estado de exposición."""
+        self.kind = population["kind"]
+        self.party = population["party"]
+        self.credibility = population["credibility"]
+        self.perception = np.zeros((len(self.kind), 2))
+
+        # Adyacencia usuario -> usuarios vecinos y fuente (BOT/NewsReel) -> usuarios vecinos
+        self.indptr, self.indices = population["indptr"], population["indices"]
+        self._source_indptr, self._source_indices = population["source_indptr"], population["source_indices"]
+
+        self.news_veracity = population["news_veracity"]
+        self.news_party = population["news_party"]
+        self.news_polarity = population["news_polarity"]
+        self.news_credibility = population["news_credibility"]
+
+        # Estado de exposición por (usuario, columna de noticia)
+        n_users, n_columns = len(self.kind), population["news_columns"]
+        self.received = np.zeros((n_users, n_columns), dtype=bool)
+        self.shared = np.zeros((n_users, n_columns), dtype=bool)
+        self.exposures = np.zeros((n_users, n_columns), dtype=np.int32)
+
+        # Entregas del step actual: (emisor, receptor, noticia)
+        self.deliveries = (np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.int64))
+
+    def _setup_collector(self):
+        self.datacollector = make_collector(
+            {
+                "AvgPerception_Skeptic": lambda m: m.avg_perception(SKEPTIC, PERCEPTION_A),
+                "AvgPerception_Susceptible": lambda m: m.avg_perception(SUSCEPTIBLE, PERCEPTION_A),
+                "TrueNewsShared": lambda m: m.true_news_shared,
+                "FalseNewsShared": lambda m: m.false_news_shared,
+                "NumSkeptics": lambda m: int(np.count_nonzero(m.kind == SKEPTIC)),
+                "NumSusceptibles": lambda m: int(np.count_nonzero(m.kind == SUSCEPTIBLE)),
+                "ConversionsToSkeptic": lambda m: m.conversions_to_skeptic,
+                "ConversionsToSusceptible": lambda m: m.conversions_to_susceptible,
+                "CascadeDepth": lambda m: m.cascade_depth,
+                "CascadeSize": lambda m: m.cascade_size,
+            },
+            self._recorder_options,
+        )
+
+    def _seed_sources(self):
+        """Inicialización: cada fuente envía su noticia a todos sus usuarios vecinos."""
+        news, receivers = expand_neighbours(self._source_indptr, self._source_indices, np.arange(len(self.news_veracity)))
+        self._deliveries = []
+        self._count_wave(receivers, 1)
+        seen = self.received[receivers, self._column(news)]
+        np.add.at(self.exposures, (receivers[seen], self._column(news[seen])), 1)
+        senders, shared = self._receive(receivers[~seen], news[~seen])
+        self._propagate(senders, shared, depth=1)
+        self._flush_deliveries()
+
+    # Puntos de extensión para el ensamble (ensemble.py), que apila réplicas en los mismos arreglos
+
+    def _column(self, news):
+        """Columna de las matrices de exposición que corresponde a cada noticia."""
+        return news
+
+    def _news_ids(self, users, columns):
+        """Noticias que corresponden a las columnas `columns` de las filas `users`."""
+        return columns
+
+    def _random(self, users, news):
+        """Un sorteo uniforme por par (usuario, noticia)."""
+        if self.counter_key is None:
+            return self.rng.random(len(users))
+        return counter_uniform(self.counter_key, self.steps, users, news)
+
+    def _tally(self, users):
+        """Conteo de los usuarios dados para los contadores del modelo."""
+        return len(users)
+
+    def _count_wave(self, receivers, depth):
+        reached = self._tally(receivers)
+        self.cascade_size += reached
+        self.cascade_depth = np.maximum(self.cascade_depth, np.where(reached > 0, depth, 0))
+
+    def step(self):
+        """Ejecuta un paso: todos los pares (usuario, noticia recibida) deciden en lote si compartir."""
+        if self.converged_at is not None:
+            # Ya convergió: se repite la última fila en lugar de simular
+            self._repeat_collect()
+            return
+
+        self._deliveries = []
+        # (escalares, o arreglos por réplica en el ensamble)
+        self.cascade_depth *= 0
+        self.cascade_size *= 0
+
+        # Por bloques de usuarios para acotar la memoria temporal (mismo orden y mismos sorteos que en un solo lote)
+        n_users, n_news = self.received.shape
+        block = max(1, CHUNK_SIZE // max(n_news, 1))
+        senders, shared = [], []
+        for start in range(0, n_users, block):
+            users, columns = np.nonzero(self.received[start : start + block])
+            users += start
+            news = self._news_ids(users, columns)
+            share = self.shareDecision(users, news)
+            senders.append(users[share])
+            shared.append(news[share])
+        senders, shared = np.concatenate(senders), np.concatenate(shared)
+
+        n_true = self._tally(senders[self.news_veracity[shared]])
+        self.true_news_shared += n_true
+        self.false_news_shared += self._tally(senders) - n_true
+
+        # Los envíos postergados en el step anterior salen junto con los nuevos
+        deferred_senders, deferred_news = self._deferred
+        self._deferred = (np.empty(0, np.int64), np.empty(0, np.int64))
+        self._propagate(np.concatenate([deferred_senders, senders]), np.concatenate([deferred_news, shared]))
+        self._flush_deliveries()
+
+        total_conversions = self.conversions_to_skeptic + self.conversions_to_susceptible
+        self.previous_conversions = np.maximum(self.previous_conversions, total_conversions)
+
+        self.collect()
+        self._check_convergence()
+
+    def avg_perception(self, kind, column):
+        """Promedio de percepción (columna A o B) de los usuarios del tipo dado."""
+        mask = self.kind == kind
+        if not mask.any():
+            return 0.0
+        return float(self.perception[mask, column].mean())
+
+    def computeShareProbability(self, users, news):
+        """
+        P_C = clamp(w_m·m_{i,j} + w_f·f_k + w_c·c_i, 0, 1) evaluado para cada par (users[i], news[i]),
+        con los pesos del tipo actual de cada usuario.
+        """
+        susceptible = self.kind[users] == SUSCEPTIBLE
+        w_m = np.where(susceptible, SHARE_WEIGHTS_SUSCEPTIBLE[0], SHARE_WEIGHTS_SKEPTIC[0])
+        w_f = np.where(susceptible, SHARE_WEIGHTS_SUSCEPTIBLE[1], SHARE_WEIGHTS_SKEPTIC[1])
+        w_c = np.where(susceptible, SHARE_WEIGHTS_SUSCEPTIBLE[2], SHARE_WEIGHTS_SKEPTIC[2])
+
+        m_ij = (1 + self.news_polarity[news] * self.news_party[news] * self.party[users]) / 2.0
+        return np.clip(w_m * m_ij + w_f * self.news_credibility[news] + w_c * self.credibility[users], 0.0, 1.0)
+
+    def shareDecision(self, users, news):
+        """Decisión de compartir en lote. Los Skeptics nunca comparten noticias falsas."""
+        pc = self.computeShareProbability(users, news)
+        pc[(self.kind[users] == SKEPTIC) & ~self.news_veracity[news]] = 0.0
+        return self._random(users, news) < pc
+
+    def updatePerception(self, users, news):
+        """
+        P_{i,t} = clamp(P_{i,t-1} + x_j·α·polarity·c_i, -1, 1) en lote.
+        Los Skeptics solo actualizan con noticias verdaderas. Cada usuario debe aparecer una sola vez.
+        """
+        news_party = self.news_party[news]
+        column = np.where(news_party > 0, PERCEPTION_A, PERCEPTION_B)
+        x_j = news_party != self.party[users]
+        active = (self.kind[users] == SUSCEPTIBLE) | self.news_veracity[news]
+
+        delta = np.where(x_j & active, ALPHA * self.news_polarity[news] * self.credibility[users], 0.0)
+        self.perception[users, column] = np.round(np.clip(self.perception[users, column] + delta, -1.0, 1.0), 2)
+
+    def checkConversion(self, users):
+        """Convierte en lote a los usuarios que cruzan los umbrales de percepción hacia el partido contrario."""
+        other = np.where(self.party[users] > 0, PERCEPTION_B, PERCEPTION_A)
+        perception_to_other = self.perception[users, other]
+        kind = self.kind[users]
+
+        to_skeptic = users[(kind == SUSCEPTIBLE) & (perception_to_other <= THRESHOLD_TO_SKEPTIC)]
+        to_susceptible = users[(kind == SKEPTIC) & (perception_to_other >= THRESHOLD_TO_SUSCEPTIBLE)]
+
+        if len(to_skeptic):
+            self.credibility[to_skeptic] = np.clip(self.credibility[to_skeptic] * 0.5, 0.1, 0.3)
+            self.kind[to_skeptic] = SKEPTIC
+            self.conversions_to_skeptic += self._tally(to_skeptic)
+        if len(to_susceptible):
+            self.credibility[to_susceptible] = np.clip(self.credibility[to_susceptible] * 2.0, 0.6, 0.9)
+            self.kind[to_susceptible] = SUSCEPTIBLE
+            self.conversions_to_susceptible += self._tally(to_susceptible)
+
+    def _receive(self, users, news):
+        """
+        Procesa pares (usuario, noticia) recibidos por primera vez (sin repetir).
+        Un usuario que recibe varias noticias en la misma ola las procesa en rondas
+        sucesivas, para respetar el orden percepción -> conversión -> decisión de User.receiveNews.
+        Devuelve los pares que deciden compartir.
+        """
+        columns = self._column(news)
+        self.received[users, columns] = True
+        self.exposures[users, columns] = 1
+        if len(users) == 0:
+            return users, news
+
+        order = np.argsort(users, kind="stable")
+        users, news = users[order], news[order]
+        index = np.arange(len(users))
+        group_start = np.maximum.accumulate(np.where(np.r_[True, users[1:] != users[:-1]], index, 0))
+        rank = index - group_start
+
+        share = np.zeros(len(users), dtype=bool)
+        for r in range(int(rank.max()) + 1):
+            sel = rank == r
+            u, n = users[sel], news[sel]
+            self.updatePerception(u, n)
+            self.checkConversion(u)
+            share[sel] = self.shareDecision(u, n)
+
+        self.shared[users[share], self._column(news[share])] = True
+        return users[share], news[share]
+
+    def _propagate(self, senders, news, depth=0):
+        """
+        Propaga por olas: cada emisor envía la noticia a los vecinos que aún no la recibieron.
+        Las olas que superan `max_hops` se postergan al próximo step.
+        """
+        while len(senders):
+            if self.max_hops is not None and depth >= self.max_hops:
+                self._deferred = (senders, news)
+                return
+            depth += 1
+
+            # Las olas con más de CHUNK_SIZE envíos se procesan por tramos de emisores
+            counts = self.indptr[senders + 1] - self.indptr[senders]
+            bounds = np.searchsorted(np.cumsum(counts), np.arange(CHUNK_SIZE, int(counts.sum()), CHUNK_SIZE), side="right")
+            next_senders, next_news = [], []
+            for chunk in np.split(np.arange(len(senders)), bounds):
+                shared_by, shared = self._wave(senders[chunk], news[chunk], depth)
+                next_senders.append(shared_by)
+                next_news.append(shared)
+            senders, news = np.concatenate(next_senders), np.concatenate(next_news)
+
+    def _wave(self, senders, news, depth):
+        """Un salto: entrega a los vecinos que aún no recibieron la noticia. Devuelve los pares que la comparten."""
+        pos, receivers = expand_neighbours(self.indptr, self.indices, senders)
+        news_sent = news[pos]
+        fresh = ~self.received[receivers, self._column(news_sent)]
+        senders_sent, receivers, news_sent = senders[pos][fresh], receivers[fresh], news_sent[fresh]
+
+        # Una noticia puede llegar al mismo receptor desde varios emisores en la misma ola
+        _, first = np.unique(receivers * self.received.shape[1] + self._column(news_sent), return_index=True)
+        senders_sent, receivers, news_sent = senders_sent[first], receivers[first], news_sent[first]
+
+        if self.record_deliveries:
+            self._deliveries.append((senders_sent, receivers, news_sent))
+        self._count_wave(receivers, depth)
+        return self._receive(receivers, news_sent)
+
+    def _flush_deliveries(self):
+        if self._deliveries:
+            self.deliveries = tuple(np.concatenate(column) for column in zip(*self._deliveries))
+        else:
+            self.deliveries = (np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.int64))